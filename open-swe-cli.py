@@ -3,50 +3,89 @@
 Simple CLI interface for the Python Open SWE agent.
 """
 
+import argparse
+import asyncio
+import os
 import sys
-import json
-from src.enhanced_graph import run_enhanced_agent
+from pathlib import Path
+from src.config import config
+from src.enhanced_graph import run_agent
+from src.profiling import RunProfiler
 from visuals import print_welcome_message
 
 
-def main():
+def parse_args(argv=None):
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(
+        description="Run the Open-SWE agent on a coding request.",
+        epilog="Example: python open-swe-cli.py 'Create a Python function to calculate fibonacci numbers'\n"
+               "Run statistics: python open-swe-cli.py stats --help",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument("request", nargs="+", help="The coding request")
+    parser.add_argument("--repo", help="Existing repository to use as context")
+    parser.add_argument("--profile", action="store_true",
+                        help="Write a per-node CPU and memory profile next to the run output")
+    parser.add_argument("--profile-interval", type=float, default=5.0, metavar="MS",
+                        help="CPU sampling interval in milliseconds (default: 5)")
+    return parser.parse_args(argv)
+
+
+def output_directory(files_created) -> Path:
+    """The folder the run wrote its files to, or the default output root."""
+    if not files_created:
+        return Path(config.output_dir)
+    return Path(os.path.commonpath([str(Path(f).parent) for f in files_created]))
+
+
+def main(argv=None):
     """Main CLI interface."""
-    if len(sys.argv) < 2:
-        print("Usage: python cli.py 'Your coding request here'")
-        print("Example: python cli.py 'Create a Python function to calculate fibonacci numbers'")
-        sys.exit(1)
+    argv = sys.argv[1:] if argv is None else argv
+    if argv[:1] == ["stats"]:
+        # Aggregates telemetry logs; see src/analytics.py
+        from src.analytics import main as stats_main
+        return stats_main(argv[1:])
     
-    request = " ".join(sys.argv[1:])
+    args = parse_args(argv)
+    request = " ".join(args.request)
     print(f"🤖 Processing request: {request}")
     print("=" * 60)
     
+    profiler = RunProfiler(interval=args.profile_interval / 1000) if args.profile else None
+    
     # Run the agent
-    result = run_enhanced_agent(request)
+    if profiler:
+        profiler.start()
+    try:
+        result = asyncio.run(run_agent(request, repo_path=args.repo, profiler=profiler))
+    finally:
+        if profiler:
+            profiler.stop()
     
     # Display results
-    print(f"\n📊 Status: {result['status']}")
-    
-    if result.get('error_message'):
-        print(f"❌ Error: {result['error_message']}")
-    
     if result.get('plan'):
         print(f"\n📋 Plan:")
         print("-" * 40)
         print(result['plan'])
     
-    if result.get('code_changes'):
-        print(f"\n💻 Code Implementation:")
-        print("-" * 40)
-        for i, code in enumerate(result['code_changes'], 1):
-            print(f"\n--- Implementation {i} ---")
-            print(code)
+    files_created = result.get('files_created') or []
+    print(f"\n💻 Files created ({len(files_created)}):")
+    print("-" * 40)
+    for file_path in files_created:
+        print(f"  {file_path}")
+    
+    if profiler:
+        reports = profiler.write_report(output_directory(files_created))
+        print(f"\n⏱️  Profile written to: {', '.join(str(p) for p in reports)}")
     
-    print(f"\n🔄 Total iterations: {result.get('iteration_count', 0)}")
+    print(f"\n🔄 Total iterations: {result.get('iterations', 0)}")
     print("=" * 60)
     print("✅ Complete!")
 
 
 if __name__ == "__main__":
-    print_welcome_message()
+    # Keep stats output (e.g. CSV on stdout) clean
+    if sys.argv[1:2] != ["stats"]:
+        print_welcome_message()
 
-    main()
\ No newline at end of file
+    sys.exit(main())
@@ -1,9 +1,48 @@
 """Example usage of the Python Open SWE agent."""
 
+import asyncio
+import sys
+from typing import Optional
 from mcp.server.fastmcp import FastMCP, Context  
+from src.coalesce import RunCoalescer
+from src.config import config
+from src.deadline import Deadline
+from src.enhanced_graph import run_agent
+from src.events import EventBus, FileWritten, NodeStarted, PlanReady
+from src.sessions import SessionManager
 
 mcp = FastMCP('langchain-coder-mcp')
 
+# Identical requests that arrive while one is running share that run
+coalescer = RunCoalescer(run_agent)
+
+# In-process runs, isolated per session and bounded in number
+sessions = SessionManager(
+    coalescer.run if config.mcp_coalesce_requests else run_agent,
+    max_concurrent=config.mcp_max_concurrent_runs,
+    cancel_timeout=config.mcp_cancel_timeout,
+)
+
+
+def _keep_stdout_for_protocol():
+    """Send agent console output to stderr; stdout carries the MCP stdio protocol.
+
+    The stdio transport has already wrapped the original stdout buffer by the time
+    a tool runs, so rebinding `sys.stdout` only affects prints and rich output.
+    """
+    if sys.stdout is not sys.stderr:
+        sys.stdout = sys.stderr
+
+async def _report_progress(subscription, ctx: Context):
+    """Forward a run's progress events to the MCP client as log messages."""
+    async for event in subscription:
+        if isinstance(event, NodeStarted):
+            await ctx.info(f"{event.node.title()} agent started")
+        elif isinstance(event, PlanReady):
+            await ctx.info(f"Plan ready ({len(event.plan)} chars)")
+        elif isinstance(event, FileWritten):
+            await ctx.info(f"Wrote {event.path}")
+
 @mcp.tool()
 def run_code_agent(request: str) -> dict:
     """Given a coding request, this tool runs the Python Open SWE agent.
@@ -20,6 +59,49 @@ def run_code_agent(request: str) -> dict:
     except Exception as e:
         print(f"❌ Error running example: {e}")
 
+@mcp.tool()
+async def run_code_agent_in_process(request: str, ctx: Context, deadline_seconds: Optional[float] = None) -> dict:
+    """Given a coding request, run the Python Open SWE agent inside this server
+    and return the files it created. Runs are isolated per session, and cancelling
+    the request stops the agent and removes partially written files. With
+    `deadline_seconds`, the agent answers within that time, trading output quality
+    for speed as needed; `degraded` then lists what it gave up."""
+    
+    _keep_stdout_for_protocol()
+    await ctx.info(f"Queued request ({sessions.status()['active']} runs active)")
+    
+    # Counted from now, so time spent queued for a session is part of it
+    run_kwargs = {"deadline": Deadline.after(deadline_seconds)} if deadline_seconds else {}
+    events = EventBus()
+    progress = asyncio.create_task(
+        _report_progress(events.subscribe(types=(NodeStarted, PlanReady, FileWritten)), ctx)
+    )
+    try:
+        session = await sessions.run(request, events=events, **run_kwargs)
+    except asyncio.CancelledError:
+        progress.cancel()
+        raise
+    finally:
+        events.close()
+    await progress
+    result = session.result or {}
+    
+    return {
+        **session.summary(),
+        "plan": result.get("plan"),
+        "files_created": result.get("files_created", []),
+        "route": result.get("route"),
+        "stop_reason": result.get("stop_reason"),
+        "degraded": list(result.get("degraded") or ()),
+    }
+
+
+@mcp.tool()
+def agent_sessions() -> dict:
+    """Show how many Open SWE agent runs are active and queued in this server."""
+    return {**sessions.status(), "coalescing": coalescer.status()}
+
+
 @mcp.prompt()
 def create_repo(location: str = "folder") -> str:
     """Generate a prompt for creating a Github repository from new projects"""
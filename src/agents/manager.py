@@ -1,27 +1,11 @@
 """Manager agent - routes requests and coordinates workflow."""
 
-from langchain_core.messages import HumanMessage, SystemMessage
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
 from ..state import AgentState
-from ..llm import manager_llm
+from ..llm import manager_llm, stream_rate_limited
 from ..utils import clean_llm_response
 
-# Helper function to strip thinking tokens
-def strip_thinking_tokens(text: str):
-    """
-    Extract the content between <think> and </think> tags and remove them from the text.
-    """
-    thoughts = ""
-    while "<think>" in text and "</think>" in text:
-        start = text.find("<think>")
-        end = text.find("</think>")
-        # Extract the content between tags (excluding the tags themselves)
-        thoughts += text[start + len("<think>"):end].strip() + "\n\n"
-        # Remove the tags and their content from the original text
-        text = text[:start] + text[end + len("</think>"):]
-    return thoughts.strip(), text.strip()
-
-
-def manager_agent(state: AgentState) -> AgentState:
+def manager_agent(state: AgentState) -> dict:
     """
     Manager agent that routes requests and coordinates the overall workflow.
     
@@ -58,10 +42,7 @@ def manager_agent(state: AgentState) -> AgentState:
 
     print("🚀 Running Manager Agent")
     
-    response = manager_llm.invoke(messages, model_name="DeepSeek-R1-0528")
-    
-    # Clean response by removing thinking tokens
-    thoughts, text = strip_thinking_tokens(response)
+    text = stream_rate_limited(manager_llm, messages, "manager", model_name="DeepSeek-R1-0528")
 
     # Determine next agent based on cleaned response
     next_agent = text.strip().lower()
@@ -75,17 +56,16 @@ def manager_agent(state: AgentState) -> AgentState:
         else:
             next_agent = "complete"
     
-    # Update state
-    new_state = state.copy()
-    new_state["next_agent"] = next_agent
+    # Return only the changed fields; the graph appends the message
+    update = {
+        "next_agent": next_agent,
+        "iteration_count": state.get("iteration_count", 0) + 1,
+    }
     
-    # Create a cleaned response object for storing in messages
-    # Store the cleaned content back in the response object
-    if hasattr(response, 'content'):
-        response.content = text
-    new_state["messages"].append(response)
+    # Keep only the cleaned text, not the full response object and its metadata
+    update["messages"] = [AIMessage(content=text, name="manager")]
     
     if next_agent == "complete":
-        new_state["status"] = "complete"
+        update["status"] = "complete"
     
-    return new_state
+    return update
@@ -1,27 +1,11 @@
 """Planner agent - analyzes requirements and creates execution plans."""
 
-from langchain_core.messages import HumanMessage, SystemMessage
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
 from ..state import AgentState
-from ..llm import planner_llm
+from ..llm import planner_llm, stream_rate_limited
 from ..utils import clean_llm_response
 
-# Helper function to strip thinking tokens
-def strip_thinking_tokens(text: str):
-    """
-    Extract the content between <think> and </think> tags and remove them from the text.
-    """
-    thoughts = ""
-    while "<think>" in text and "</think>" in text:
-        start = text.find("<think>")
-        end = text.find("</think>")
-        # Extract the content between tags (excluding the tags themselves)
-        thoughts += text[start + len("<think>"):end].strip() + "\n\n"
-        # Remove the tags and their content from the original text
-        text = text[:start] + text[end + len("</think>"):]
-    return thoughts.strip(), text.strip()
-
-
-def planner_agent(state: AgentState) -> AgentState:
+def planner_agent(state: AgentState) -> dict:
     """
     Planner agent that analyzes requirements and creates detailed execution plans.
     
@@ -52,19 +36,12 @@ def planner_agent(state: AgentState) -> AgentState:
 
     print("🚀 Running Planner Agent")
 
-    response = planner_llm.invoke(messages, model_name="DeepSeek-R1-0528")
+    text = stream_rate_limited(planner_llm, messages, "planner", model_name="DeepSeek-R1-0528")
 
-    thoughts, text = strip_thinking_tokens(response)
-    
-    # Update state with the cleaned plan
-    new_state = state.copy()
-    new_state["plan"] = text
-    new_state["status"] = "planning"
-    
-    # Store the cleaned content back in the response object
-    if hasattr(response, 'content'):
-        response.content = text
-    new_state["messages"].append(response)
-    new_state["next_agent"] = "programmer"
-    
-    return new_state
+    # Return only the changed fields; the graph appends a slim message with the cleaned text
+    return {
+        "plan": text,
+        "status": "planning",
+        "messages": [AIMessage(content=text, name="planner")],
+        "next_agent": "programmer",
+    }
@@ -1,25 +1,10 @@
 """Programmer agent - implements plans by making code changes."""
 
-from langchain_core.messages import HumanMessage, SystemMessage
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
 from ..state import AgentState
-from ..llm import programmer_llm
+from ..llm import programmer_llm, stream_rate_limited
 from ..utils import clean_llm_response
 
-# Helper function to strip thinking tokens
-def strip_thinking_tokens(text: str):
-    """
-    Extract the content between <think> and </think> tags and remove them from the text.
-    """
-    thoughts = ""
-    while "<think>" in text and "</think>" in text:
-        start = text.find("<think>")
-        end = text.find("</think>")
-        # Extract the content between tags (excluding the tags themselves)
-        thoughts += text[start + len("<think>"):end].strip() + "\n\n"
-        # Remove the tags and their content from the original text
-        text = text[:start] + text[end + len("</think>"):]
-    return thoughts.strip(), text.strip()
-
 # # Step 1: Generate a query to search the web for the latest info
 # async def generate_query(state: SummaryState):
 #     # Format the prompt
@@ -59,7 +44,7 @@ def strip_thinking_tokens(text: str):
 #     return {"search_query": search_query, "rationale": rationale}
 
 
-def programmer_agent(state: AgentState) -> AgentState:
+def programmer_agent(state: AgentState) -> dict:
     """
     Programmer agent that implements the plans by generating actual code.
     
@@ -96,20 +81,12 @@ def programmer_agent(state: AgentState) -> AgentState:
 
     print("🚀 Running Programmer Agent")
 
-    response = programmer_llm.invoke(messages, model_name="DeepSeek-R1-0528")
-
-    thoughts, text = strip_thinking_tokens(response)
+    text = stream_rate_limited(programmer_llm, messages, "programmer", model_name="DeepSeek-R1-0528")
 
-
-    # Update state with the cleaned code implementation
-    new_state = state.copy()
-    new_state["code_changes"].append(text)
-    new_state["status"] = "programming"
-    
-    # Store the cleaned content back in the response object
-    if hasattr(response, 'content'):
-        response.content = text
-    new_state["messages"].append(response)
-    new_state["next_agent"] = "complete"
-    
-    return new_state
+    # Return only the changed fields; the graph appends to code_changes and messages (cleaned text only)
+    return {
+        "code_changes": [text],
+        "status": "programming",
+        "messages": [AIMessage(content=text, name="programmer")],
+        "next_agent": "complete",
+    }
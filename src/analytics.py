@@ -0,0 +1,372 @@
+"""Run analytics over telemetry logs (see `src.telemetry`).
+
+Loads the JSONL logs into DataFrames and aggregates them, vectorized, per
+agent and model and per time window:
+
+- calls: latency and time-to-first-token percentiles, output tokens per
+  second, prompt cache hit rate, truncation rate and estimated cost,
+- runs: failure, stop and degradation rates, duration percentiles, tokens
+  and cost per run,
+- budget: the requests that use the most tokens or exhaust the token budget.
+
+    python open-swe-cli.py stats logs/telemetry.jsonl --since 7d --window 1D
+    python open-swe-cli.py stats logs/ --report calls --format parquet --output stats.parquet
+
+Costs are estimates from per-model prices in USD per million input/output
+tokens (`DEFAULT_PRICES`, `OPEN_SWE_PRICES="model=in/out,..."` or `--price`).
+"""
+
+import argparse
+import glob
+import gzip
+import hashlib
+import io
+import os
+import re
+import sys
+from contextlib import suppress
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import pandas as pd
+
+from .coalesce import normalize_request
+
+# USD per million (input, output) tokens
+DEFAULT_PRICES: Dict[str, Tuple[float, float]] = {
+    "DeepSeek-R1-0528": (1.35, 5.40),
+    "Phi-4": (0.125, 0.50),
+}
+
+PERCENTILES = (0.5, 0.9, 0.95, 0.99)
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "open-swe", "stats")
+REPORTS = ("calls", "runs", "budget")
+
+# Only these records are parsed; the rest of a log is skipped before JSON decoding
+_WANTED = ("run_started", "request_classified", "llm_call_finished", "run_finished")
+_RECORD = re.compile(rb'^\{"time": [0-9.e+-]+, "type": "(?:' + "|".join(_WANTED).encode() + rb')".*\n', re.MULTILINE)
+_COLUMNS = ("time", "type", "run_id", "t", "request", "route", "agent", "model", "ttft", "seconds", "input_tokens",
+            "output_tokens", "cached_tokens", "finish_reason", "status", "stop_reason", "tokens_used", "iterations",
+            "scaffold_tokens_saved")
+_CATEGORIES = ("type", "route", "agent", "model", "finish_reason", "status")
+_CHUNK = 32 * 1024 * 1024
+_CACHE_VERSION = 1
+
+
+def log_files(paths: Iterable[str]) -> List[str]:
+    """The log files among `paths`; directories contribute their *.jsonl and *.jsonl.gz files."""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files += sorted(glob.glob(os.path.join(path, "**", "*.jsonl"), recursive=True)
+                            + glob.glob(os.path.join(path, "**", "*.jsonl.gz"), recursive=True))
+        else:
+            files.append(path)
+    return files
+
+
+def _open(path: str):
+    return gzip.open(path, "rb") if path.endswith(".gz") else open(path, "rb")
+
+
+def _wanted_lines(path: str, offset: int = 0) -> Tuple[bytes, int]:
+    """The wanted records after `offset`, and the offset after the last complete line."""
+    parts, rest = [], b""
+    with _open(path) as f:
+        f.seek(offset)
+        while chunk := f.read(_CHUNK):
+            chunk = rest + chunk
+            cut = chunk.rfind(b"\n") + 1
+            parts += _RECORD.findall(chunk, 0, cut)
+            rest = chunk[cut:]
+            offset += cut
+    return b"".join(parts), offset  # a line still being written is left for next time
+
+
+def parse_records(data: bytes) -> pd.DataFrame:
+    if not data:
+        return pd.DataFrame(columns=list(_COLUMNS)).assign(time=pd.to_datetime([], utc=True))
+    try:
+        frame = pd.read_json(io.BytesIO(data), lines=True, dtype=False, engine="pyarrow")
+    except ImportError:
+        frame = pd.read_json(io.BytesIO(data), lines=True, dtype=False)
+    frame = frame.reindex(columns=list(_COLUMNS))
+    # Through integer milliseconds, much faster than converting float seconds
+    frame["time"] = pd.to_datetime((frame["time"].astype(float) * 1000).round().astype("int64"), unit="ms", utc=True)
+    return frame.astype({column: "category" for column in _CATEGORIES})
+
+
+def _log_head(path: str) -> bytes:
+    with _open(path) as f:
+        return f.read(4096)
+
+
+def _cache_path(cache_dir: str, path: str) -> str:
+    return os.path.join(cache_dir, hashlib.sha1(os.path.abspath(path).encode()).hexdigest()[:16] + ".pkl")
+
+
+def read_log(path: str, cache_dir: Optional[str] = None) -> pd.DataFrame:
+    """The wanted records of one log.
+
+    Logs are append-only, so with a `cache_dir` the parsed records are kept
+    there and a later call only parses what was appended since; a log that was
+    rotated or rewritten is parsed again from the start.
+    """
+    cached, offset, head = None, 0, _log_head(path)
+    cache = _cache_path(cache_dir, path) if cache_dir else None
+    if cache and os.path.exists(cache):
+        with suppress(Exception):
+            entry = pd.read_pickle(cache)
+            if entry["version"] == _CACHE_VERSION and entry["head"] == head[:len(entry["head"])]:
+                cached, offset = entry["frame"], entry["offset"]
+    data, end = _wanted_lines(path, offset)
+    if cached is not None and end == offset:
+        return cached
+    frame = parse_records(data)
+    if cached is not None:
+        # Categories differ between the two parts; merge them as strings
+        as_object = {column: object for column in _CATEGORIES}
+        frame = pd.concat([cached.astype(as_object), frame.astype(as_object)], ignore_index=True).astype(
+            {column: "category" for column in _CATEGORIES})
+    if cache:
+        with suppress(OSError):
+            os.makedirs(cache_dir, exist_ok=True)
+            pd.to_pickle({"version": _CACHE_VERSION, "head": head, "offset": end, "frame": frame}, cache)
+    return frame
+
+
+def load_events(paths: Iterable[str], since: Optional[pd.Timestamp] = None,
+                cache_dir: Optional[str] = None) -> pd.DataFrame:
+    """All run, classification and LLM call records of the logs, with `time` as UTC timestamps."""
+    frames = [read_log(path, cache_dir) for path in log_files(paths)]
+    frames = [frame for frame in frames if not frame.empty]
+    if not frames:
+        return parse_records(b"")
+    events = pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0]
+    if since is not None:
+        events = events[events["time"] >= since]
+    return events
+
+
+def _numeric(frame: pd.DataFrame, columns: Sequence[str]) -> pd.DataFrame:
+    for column in columns:
+        frame[column] = pd.to_numeric(frame[column], errors="coerce").fillna(0) if column in frame else 0
+    return frame
+
+
+def _column(frame: pd.DataFrame, column: str, default=None) -> pd.Series:
+    return frame[column] if column in frame else pd.Series(default, index=frame.index, dtype=object)
+
+
+def _labels(frame: pd.DataFrame, column: str) -> pd.Series:
+    """A label column with "unknown" for missing values, still categorical if it was."""
+    series = _column(frame, column)
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        series = series.cat.remove_unused_categories()
+        if "unknown" not in series.cat.categories:
+            series = series.cat.add_categories("unknown")
+    return series.fillna("unknown")
+
+
+def calls_table(events: pd.DataFrame, prices: Optional[Dict[str, Tuple[float, float]]] = None) -> pd.DataFrame:
+    """One row per LLM call, with generation time and estimated cost."""
+    calls = events[events["type"] == "llm_call_finished"].copy()
+    calls = _numeric(calls, ["seconds", "tokens", "input_tokens", "output_tokens", "cached_tokens"])
+    calls["ttft"] = pd.to_numeric(_column(calls, "ttft"), errors="coerce")
+    calls["agent"] = _labels(calls, "agent")
+    calls["model"] = _labels(calls, "model")
+    calls["finish_reason"] = _column(calls, "finish_reason")
+    calls["generation_seconds"] = (calls["seconds"] - calls["ttft"].fillna(0)).clip(lower=0)
+    prices = DEFAULT_PRICES if prices is None else prices
+    input_price = calls["model"].map({model: price[0] for model, price in prices.items()}).astype(float).fillna(0)
+    output_price = calls["model"].map({model: price[1] for model, price in prices.items()}).astype(float).fillna(0)
+    calls["cost"] = (calls["input_tokens"] * input_price + calls["output_tokens"] * output_price) / 1e6
+    return calls.reset_index(drop=True)
+
+
+_RUN_COLUMNS = ("time", "run_id", "t", "status", "stop_reason", "tokens_used", "iterations", "scaffold_tokens_saved")
+
+
+def runs_table(events: pd.DataFrame, calls: Optional[pd.DataFrame] = None) -> pd.DataFrame:
+    """One row per finished run with its request, route, duration, tokens and cost."""
+    runs = events.loc[events["type"] == "run_finished",
+                      [column for column in _RUN_COLUMNS if column in events]].copy()
+    runs = _numeric(runs, ["t", "tokens_used", "iterations"]).rename(columns={"t": "seconds"})
+    runs["status"] = _labels(runs, "status")
+    runs["stop_reason"] = _column(runs, "stop_reason")
+    runs = runs.drop_duplicates("run_id", keep="last")
+    for kind, column in (("run_started", "request"), ("request_classified", "route")):
+        attached = events.loc[events["type"] == kind, ["run_id", column]] if column in events else None
+        if attached is not None:
+            runs = runs.merge(attached.drop_duplicates("run_id", keep="last"), on="run_id", how="left")
+        else:
+            runs[column] = None
+    if calls is not None and not calls.empty:
+        runs = runs.merge(calls.groupby("run_id")["cost"].sum().rename("cost"), on="run_id", how="left")
+    runs["cost"] = _column(runs, "cost", 0.0).astype(float).fillna(0.0)
+    runs["budget_exhausted"] = runs["stop_reason"].fillna("").astype(str).str.startswith("token budget")
+    return runs.reset_index(drop=True)
+
+
+def _keys(frame: pd.DataFrame, by: Sequence[str], window: Optional[str]) -> list:
+    return ([pd.Grouper(key="time", freq=window)] if window else []) + [key for key in by if key in frame]
+
+
+def _percentiles(grouped, column: str, prefix: str, percentiles: Sequence[float] = PERCENTILES) -> pd.DataFrame:
+    table = grouped[column].quantile(list(percentiles)).unstack()
+    table.columns = [f"{prefix}_p{round(q * 100):d}" for q in table.columns]
+    return table
+
+
+def call_stats(calls: pd.DataFrame, by: Sequence[str] = ("agent", "model"),
+               window: Optional[str] = None) -> pd.DataFrame:
+    """Latency, throughput, cache and cost per group of LLM calls."""
+    if calls.empty:
+        return pd.DataFrame()
+    calls = calls.assign(truncated=calls["finish_reason"].isin(["length", "deadline"]))
+    grouped = calls.groupby(_keys(calls, by, window), observed=True)
+    sums = grouped[["output_tokens", "generation_seconds", "cached_tokens", "input_tokens", "cost"]].sum()
+    table = pd.concat([
+        grouped.size().rename("calls"),
+        _percentiles(grouped, "seconds", "latency"),
+        _percentiles(grouped, "ttft", "ttft", (0.5, 0.95)),
+        (sums["output_tokens"] / sums["generation_seconds"].where(sums["generation_seconds"] > 0)).rename(
+            "tokens_per_second"),
+        (sums["cached_tokens"] / sums["input_tokens"].where(sums["input_tokens"] > 0)).rename("cache_hit_rate"),
+        grouped["truncated"].mean().rename("truncation_rate"),
+        sums["cost"].rename("cost"),
+    ], axis=1)
+    return table.round(4)
+
+
+def run_stats(runs: pd.DataFrame, by: Sequence[str] = ("route",), window: Optional[str] = None) -> pd.DataFrame:
+    """Failure rates, duration, tokens and cost per group of runs."""
+    if runs.empty:
+        return pd.DataFrame()
+    runs = runs.assign(**{f"{status}_rate": runs["status"] == status
+                          for status in ("error", "stopped", "degraded")})
+    runs["route"] = _labels(runs, "route")
+    grouped = runs.groupby(_keys(runs, by, window), observed=True)
+    table = pd.concat([
+        grouped.size().rename("runs"),
+        grouped[["error_rate", "stopped_rate", "degraded_rate", "budget_exhausted"]].mean().rename(
+            columns={"budget_exhausted": "budget_exhausted_rate"}),
+        _percentiles(grouped, "seconds", "duration", (0.5, 0.95)),
+        grouped["tokens_used"].mean().rename("tokens_mean"),
+        grouped["tokens_used"].sum().rename("tokens_total"),
+        grouped["cost"].mean().rename("cost_mean"),
+        grouped["cost"].sum().rename("cost_total"),
+    ], axis=1)
+    return table.round(4)
+
+
+def budget_report(runs: pd.DataFrame, top: int = 20) -> pd.DataFrame:
+    """The requests that exhaust the token budget most often, then the most expensive ones."""
+    if runs.empty:
+        return pd.DataFrame()
+    # Normalized once per distinct request, not per run
+    codes, requests = pd.factorize(runs["request"].fillna(""))
+    normalized = pd.Series([normalize_request(str(request))[:120] for request in requests])
+    grouped = runs.assign(request=normalized.to_numpy()[codes] if len(requests) else "").groupby("request")
+    table = pd.concat([
+        grouped.size().rename("runs"),
+        grouped["budget_exhausted"].sum().rename("budget_exhausted"),
+        grouped["tokens_used"].mean().rename("tokens_mean"),
+        grouped["tokens_used"].max().rename("tokens_max"),
+        grouped["cost"].sum().rename("cost_total"),
+    ], axis=1)
+    return table.sort_values(["budget_exhausted", "tokens_mean"], ascending=False).head(top).round(4)
+
+
+def parse_prices(spec: str) -> Dict[str, Tuple[float, float]]:
+    """Prices from "model=input/output,..." (USD per million tokens)."""
+    prices = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        model, _, price = item.rpartition("=")
+        input_price, _, output_price = price.partition("/")
+        prices[model] = (float(input_price), float(output_price or input_price))
+    return prices
+
+
+def since_timestamp(since: Optional[str]) -> Optional[pd.Timestamp]:
+    """"7d", "12h" etc. before now, or an ISO date."""
+    if not since:
+        return None
+    try:
+        return pd.Timestamp.now(tz="UTC") - pd.Timedelta(since)
+    except ValueError:
+        timestamp = pd.Timestamp(since)
+        return timestamp.tz_localize("UTC") if timestamp.tzinfo is None else timestamp
+
+
+def build_reports(events: pd.DataFrame, reports: Sequence[str] = REPORTS, window: Optional[str] = None,
+                  by: Sequence[str] = ("agent", "model"), prices: Optional[Dict[str, Tuple[float, float]]] = None,
+                  top: int = 20) -> Dict[str, pd.DataFrame]:
+    calls = calls_table(events, prices)
+    runs = runs_table(events, calls)
+    builders = {
+        "calls": lambda: call_stats(calls, by, window),
+        "runs": lambda: run_stats(runs, window=window),
+        "budget": lambda: budget_report(runs, top),
+    }
+    return {name: builders[name]() for name in reports}
+
+
+def write_report(name: str, table: pd.DataFrame, fmt: str, output: Optional[str], several: bool) -> None:
+    if fmt == "table":
+        text = table.to_string() if not table.empty else "(no data)"
+        print(f"\n== {name} ==\n{text}" if several else text, file=sys.stdout)
+        return
+    if several and output:
+        root, ext = os.path.splitext(output)
+        output = f"{root}.{name}{ext}"
+    table = table.reset_index()
+    if fmt == "csv":
+        table.to_csv(output or sys.stdout, index=False)
+    else:
+        table.to_parquet(output, index=False)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(prog="open-swe-cli.py stats",
+                                     description="Aggregate Open SWE telemetry logs.")
+    parser.add_argument("logs", nargs="*", help="Telemetry log files or directories (default: OPEN_SWE_TELEMETRY_LOG)")
+    parser.add_argument("--report", choices=REPORTS + ("all",), default="all")
+    parser.add_argument("--since", help="Only records newer than this: a duration (7d, 12h) or an ISO date")
+    parser.add_argument("--window", help="Group by time window as well, e.g. 1h, 1D, 1W")
+    parser.add_argument("--by", default="agent,model", help="Grouping of the calls report (default: agent,model)")
+    parser.add_argument("--price", action="append", default=[], metavar="MODEL=IN/OUT",
+                        help="USD per million input/output tokens of a model (repeatable)")
+    parser.add_argument("--top", type=int, default=20, help="Requests in the budget report (default: 20)")
+    parser.add_argument("--format", choices=("table", "csv", "parquet"), default="table")
+    parser.add_argument("--output", help="File to write csv/parquet to (default for csv: stdout)")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR,
+                        help=f"Where parsed logs are cached between runs (default: {DEFAULT_CACHE_DIR})")
+    parser.add_argument("--no-cache", action="store_true", help="Parse every log from the start")
+    args = parser.parse_args(argv)
+    if args.format == "parquet" and not args.output:
+        parser.error("--format parquet needs --output")
+    return args
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    logs = args.logs
+    if not logs:
+        from .config import config
+        if not config.telemetry_log:
+            print("No logs given and OPEN_SWE_TELEMETRY_LOG is not set", file=sys.stderr)
+            return 2
+        logs = [config.telemetry_log]
+    prices = {**DEFAULT_PRICES, **parse_prices(os.getenv("OPEN_SWE_PRICES", "")),
+              **parse_prices(",".join(args.price))}
+
+    events = load_events(logs, since_timestamp(args.since), None if args.no_cache else args.cache_dir)
+    reports = REPORTS if args.report == "all" else (args.report,)
+    tables = build_reports(events, reports, args.window, [key for key in args.by.split(",") if key], prices, args.top)
+    for name, table in tables.items():
+        write_report(name, table, args.format, args.output, len(tables) > 1)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,51 @@
+"""Storage for large run artifacts that state refers to by reference.
+
+Graph state carries only a short content-addressed reference (e.g. for the raw
+programmer response), so state updates and copies stay small no matter how big
+the artifact is, and identical artifacts are stored once. Artifacts of
+`COMPRESS_MIN_CHARS` or more are kept zlib-compressed: plans and code shrink to
+a third or less, and a run reads them back only a few times.
+"""
+
+import hashlib
+import sys
+import zlib
+from typing import Dict, Union
+
+COMPRESS_MIN_CHARS = 1024
+
+
+def artifact_ref(text: str) -> str:
+    """Content-addressed reference for `text`."""
+    # Interned, so the store and every state referring to the artifact share one string
+    return sys.intern("sha256:" + hashlib.sha256(text.encode("utf-8")).hexdigest())
+
+
+class ArtifactStore:
+    """In-memory content-addressed store for one run's large artifacts."""
+
+    __slots__ = ("_blobs",)
+
+    def __init__(self):
+        self._blobs: Dict[str, Union[str, bytes]] = {}
+
+    def put(self, text: str) -> str:
+        ref = artifact_ref(text)
+        if ref not in self._blobs:
+            self._blobs[ref] = zlib.compress(text.encode("utf-8")) if len(text) >= COMPRESS_MIN_CHARS else text
+        return ref
+
+    def get(self, ref: str) -> str:
+        blob = self._blobs[ref]
+        return zlib.decompress(blob).decode("utf-8") if isinstance(blob, bytes) else blob
+
+    def __contains__(self, ref: str) -> bool:
+        return ref in self._blobs
+
+    def __len__(self) -> int:
+        return len(self._blobs)
+
+    @property
+    def nbytes(self) -> int:
+        """Size of what is stored, compressed where it is."""
+        return sum(len(blob) for blob in self._blobs.values())
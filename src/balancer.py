@@ -0,0 +1,325 @@
+"""Load balancing across equivalent Azure AI endpoints of a model.
+
+With `AZURE_AI_ENDPOINTS` set, every model can be served by several
+deployments (regions, endpoints, capacity pools). `src.llm` then builds a
+`BalancedLLM` per agent, and every call picks one of them:
+
+- weighted least outstanding requests: the endpoint with the fewest calls in
+  flight per unit of weight, ties broken at random;
+- health tracking: an endpoint failing `failure_threshold` times in a row
+  (5xx, timeouts, connection errors) is taken out of rotation for a cooldown
+  that doubles with every further trip. After the cooldown a single probe
+  call is let through: success closes the circuit, failure opens it again.
+  429s are not failures, they only steer calls elsewhere for the
+  `retry-after` period. Client errors (400, 401, ...) and errors raised by
+  our own code leave health alone;
+- sticky routing: the calls of one run (see `bind`) stay on the endpoint its
+  first call went to, so its repeated prompt prefixes hit that deployment's
+  prompt cache, unless that endpoint is unhealthy or more than
+  `sticky_slack` requests busier than the least loaded one.
+
+Every endpoint has its own client and therefore its own rate limiter (see
+`src.ratelimit`), so aggregate throughput grows with the deployments listed.
+
+`AZURE_AI_ENDPOINTS` takes a JSON object mapping model names to endpoint
+lists (inline, or as a path to a `.json` file):
+
+    {"DeepSeek-R1-0528": [
+        {"endpoint": "https://east.services.ai.azure.com/models", "weight": 2},
+        {"endpoint": "https://west.services.ai.azure.com/models",
+         "deployment": "r1-west", "api_key_env": "AZURE_AI_WEST_KEY"}]}
+
+or, for the same endpoints for every model, a comma-separated list of URLs
+with optional `*weight`: `https://east.../models*2,https://west.../models`.
+"""
+
+import contextvars
+import json
+import os
+import random
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from .ratelimit import is_rate_limit_error, retry_after_seconds
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+
+@dataclass(frozen=True)
+class EndpointSpec:
+    """Where one deployment of a model is served."""
+
+    endpoint: str
+    deployment: str = ""  # model name on this endpoint, if it differs
+    api_key: str = ""  # empty: `AZURE_AI_API_KEY`
+    weight: float = 1.0
+
+
+def parse_endpoints(spec: str) -> Dict[str, List[EndpointSpec]]:
+    """Parse `AZURE_AI_ENDPOINTS`; the key "*" holds endpoints serving every model."""
+    spec = spec.strip()
+    if not spec:
+        return {}
+    if not spec.startswith("{") and spec.endswith(".json"):
+        with open(spec, encoding="utf-8") as f:
+            spec = f.read()
+    if not spec.startswith("{"):
+        endpoints = []
+        for item in filter(None, (part.strip() for part in spec.split(","))):
+            url, _, weight = item.rpartition("*") if "*" in item else (item, "", "")
+            endpoints.append(EndpointSpec(url, weight=float(weight or 1)))
+        return {"*": endpoints}
+    result = {}
+    for model, entries in json.loads(spec).items():
+        result[model] = []
+        for entry in entries:
+            if isinstance(entry, str):
+                entry = {"endpoint": entry}
+            api_key = entry.get("api_key") or os.getenv(entry.get("api_key_env", ""), "")
+            result[model].append(EndpointSpec(entry["endpoint"], entry.get("deployment", ""), api_key,
+                                              float(entry.get("weight", 1))))
+    return result
+
+
+@lru_cache(maxsize=None)
+def transport_errors() -> Tuple[type, ...]:
+    """Exceptions raised when an endpoint could not be reached or stopped answering."""
+    errors: List[type] = [ConnectionError, TimeoutError]
+    try:
+        from azure.core.exceptions import ServiceRequestError, ServiceResponseError
+        errors += [ServiceRequestError, ServiceResponseError]
+    except ImportError:
+        pass
+    try:
+        import httpx
+        errors.append(httpx.TransportError)
+    except ImportError:
+        pass
+    try:
+        import aiohttp
+        errors += [aiohttp.ClientConnectionError, aiohttp.ClientPayloadError]
+    except ImportError:
+        pass
+    return tuple(errors)
+
+
+def is_endpoint_failure(exc: BaseException) -> bool:
+    """Whether an error says something about the endpoint's health (not the request's, nor our code's)."""
+    if not isinstance(exc, Exception) or is_rate_limit_error(exc):
+        return False
+    status = getattr(exc, "status_code", None)
+    if status is None:
+        status = getattr(getattr(exc, "response", None), "status_code", None)
+    if status is None:
+        # Only connection errors, timeouts and resets; anything else is a bug of ours
+        return isinstance(exc, transport_errors())
+    return status >= 500 or status == 408
+
+
+class Endpoint:
+    """Live load and health of one deployment."""
+
+    def __init__(self, name: str, weight: float = 1.0):
+        self.name = name
+        self.weight = max(weight, 1e-6)
+        self.outstanding = 0
+        self.state = CLOSED
+        self.failures = 0  # consecutive
+        self.open_until = 0.0
+        self.trips = 0  # consecutive openings, for the cooldown backoff
+        self.avoid_until = 0.0  # after a 429
+
+        # Metrics
+        self.requests = 0
+        self.errors = 0
+        self.rate_limited = 0
+        self.opened = 0
+
+    def load(self) -> float:
+        return self.outstanding / self.weight
+
+    def available(self, now: float) -> bool:
+        if self.state == CLOSED:
+            return True
+        return self.state == OPEN and now >= self.open_until
+
+
+class Balancer:
+    """Picks an endpoint per call; callers `release` it with the call's outcome."""
+
+    def __init__(self, name: str, endpoints: Sequence[Endpoint], failure_threshold: int = 3,
+                 cooldown: float = 30.0, max_cooldown: float = 300.0, sticky_slack: float = 2.0,
+                 max_sticky: int = 4096):
+        if not endpoints:
+            raise ValueError(f"No endpoints for {name}")
+        self.name = name
+        self.endpoints = list(endpoints)
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.sticky_slack = sticky_slack
+        self.max_sticky = max_sticky
+        self.pinned: "OrderedDict[str, Endpoint]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def acquire(self, key: Optional[str] = None) -> Endpoint:
+        """Choose the endpoint for a call of the run `key` and count it as outstanding."""
+        with self._lock:
+            now = time.monotonic()
+            candidates = [e for e in self.endpoints if e.available(now)]
+            if not candidates:
+                # Everything is failing: try whichever recovers first rather than refuse
+                candidates = [min(self.endpoints, key=lambda e: e.open_until)]
+            candidates = [e for e in candidates if e.avoid_until <= now] or candidates
+            least = min(e.load() for e in candidates)
+            endpoint = self.pinned.get(key) if key is not None else None
+            if endpoint not in candidates or endpoint.load() > least + self.sticky_slack / endpoint.weight:
+                endpoint = random.choice([e for e in candidates if e.load() == least])
+            if key is not None:
+                self.pinned[key] = endpoint
+                self.pinned.move_to_end(key)
+                while len(self.pinned) > self.max_sticky:
+                    self.pinned.popitem(last=False)
+            if endpoint.state != CLOSED:
+                # The one probe of a half-open circuit
+                endpoint.state = HALF_OPEN
+            endpoint.outstanding += 1
+            endpoint.requests += 1
+            return endpoint
+
+    def release(self, endpoint: Endpoint, error: Optional[BaseException] = None) -> None:
+        """Record how a call on `endpoint` ended (`error` None: it succeeded)."""
+        with self._lock:
+            now = time.monotonic()
+            endpoint.outstanding -= 1
+            if error is not None and is_rate_limit_error(error):
+                endpoint.rate_limited += 1
+                retry_after = retry_after_seconds(error)
+                endpoint.avoid_until = now + (retry_after if retry_after is not None else 1.0)
+                error = None  # it answered, so it is up
+            if error is None:
+                endpoint.failures = 0
+                endpoint.trips = 0
+                endpoint.state = CLOSED
+            elif is_endpoint_failure(error):
+                endpoint.errors += 1
+                endpoint.failures += 1
+                if endpoint.state == HALF_OPEN or endpoint.failures >= self.failure_threshold:
+                    endpoint.state = OPEN
+                    endpoint.open_until = now + min(self.max_cooldown, self.cooldown * 2 ** endpoint.trips)
+                    endpoint.trips += 1
+                    endpoint.opened += 1
+            elif endpoint.state == HALF_OPEN:
+                # Inconclusive probe (bad request, cancelled): let another one through
+                endpoint.state = OPEN
+
+    def healthy(self) -> int:
+        """Number of endpoints currently in rotation."""
+        now = time.monotonic()
+        with self._lock:
+            return sum(e.available(now) for e in self.endpoints)
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [{"name": e.name, "weight": e.weight, "outstanding": e.outstanding, "state": e.state,
+                     "requests": e.requests, "errors": e.errors, "rate_limited": e.rate_limited,
+                     "opened": e.opened} for e in self.endpoints]
+
+
+class Lease:
+    """One call's claim on an endpoint; `llm` is the client to call."""
+
+    def __init__(self, llm, balancer: Optional[Balancer] = None, endpoint: Optional[Endpoint] = None):
+        self.llm = llm
+        self.balancer = balancer
+        self.endpoint = endpoint
+
+    @property
+    def failover(self) -> bool:
+        """Whether a failed call may be retried on another endpoint."""
+        return self.balancer is not None and len(self.balancer.endpoints) > 1
+
+    def release(self, error: Optional[BaseException] = None) -> None:
+        if self.balancer is not None:
+            self.balancer.release(self.endpoint, error)
+            self.balancer = None
+
+
+class BalancedLLM:
+    """Chat model that spreads calls over equivalent LLM clients of a `Balancer`.
+
+    `astream`, `stream` and `invoke` balance transparently; callers that need the
+    chosen client up front (e.g. for its rate limiter) take a `lease`.
+    """
+
+    def __init__(self, balancer: Balancer, llms: Dict[str, Any]):
+        self.balancer = balancer
+        self.llms = llms
+
+    @property
+    def endpoint(self) -> str:
+        return self.balancer.name
+
+    @property
+    def model_name(self) -> Optional[str]:
+        return getattr(next(iter(self.llms.values())), "model_name", None)
+
+    def lease(self, key: Optional[str] = None) -> Lease:
+        endpoint = self.balancer.acquire(key if key is not None else current_key())
+        return Lease(self.llms[endpoint.name], self.balancer, endpoint)
+
+    async def astream(self, messages, **kwargs):
+        lease = self.lease()
+        try:
+            async for chunk in lease.llm.astream(messages, **kwargs):
+                yield chunk
+        except BaseException as e:
+            lease.release(e)
+            raise
+        lease.release()
+
+    def stream(self, messages, **kwargs):
+        lease = self.lease()
+        try:
+            yield from lease.llm.stream(messages, **kwargs)
+        except BaseException as e:
+            lease.release(e)
+            raise
+        lease.release()
+
+    def invoke(self, messages, **kwargs):
+        lease = self.lease()
+        try:
+            response = lease.llm.invoke(messages, **kwargs)
+        except BaseException as e:
+            lease.release(e)
+            raise
+        lease.release()
+        return response
+
+
+def lease(llm, key: Optional[str] = None) -> Lease:
+    """The client to use for one call of `llm`, balanced if it is a `BalancedLLM`."""
+    if isinstance(llm, BalancedLLM):
+        return llm.lease(key)
+    return Lease(llm)
+
+
+_current_key: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("open_swe_sticky_key", default=None)
+
+
+def bind(key: Optional[str]) -> contextvars.Token:
+    """Keep the calls of this task and the tasks it starts on one endpoint where possible."""
+    return _current_key.set(key)
+
+
+def unbind(token: contextvars.Token) -> None:
+    _current_key.reset(token)
+
+
+def current_key() -> Optional[str]:
+    return _current_key.get()
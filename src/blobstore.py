@@ -0,0 +1,245 @@
+"""Content-addressed blob store for generated files, shared across runs.
+
+Many runs generate identical files (`requirements.txt`, `__init__.py`, the
+same templates and scaffolds). `DedupWorkspace` stores every file once in a
+`BlobStore`, by the SHA-256 of its content, and materializes the output tree
+from the blobs:
+
+- "reflink": a copy-on-write clone where the filesystem supports it (btrfs,
+  XFS, ...). The output file is independent and freely editable.
+- "hardlink": a second name for the blob. Blobs are read-only, so an edit in
+  place fails instead of changing the file in every project that shares it;
+  editors that save by replacing the file work as usual. Root ignores file
+  permissions, so for root an in-place edit would change every copy.
+- "copy": a plain copy, where neither is possible (e.g. another filesystem).
+
+"auto" (the default) takes the first of these that works, skipping "hardlink"
+when running as root. A file whose blob already exists costs no write at all.
+
+A blob's references are its hardlinks, so `gc` removes the blobs whose link
+count has dropped to one (only the store's own name) once they are older than
+a grace period, which protects blobs that a concurrent run has just stored.
+Storing a blob again refreshes a marker under `fresh/` rather than the blob's
+own mtime, which every hardlinked output shares.
+Reflinked and copied outputs do not hold a reference; for them the store is a
+cache that `gc` may empty.
+
+    python -m src.blobstore gc [--min-age SECONDS] [STORE]
+    python -m src.blobstore stats [STORE]
+"""
+
+import argparse
+import errno
+import hashlib
+import os
+import shutil
+import stat
+import sys
+import time
+from pathlib import Path
+from typing import Dict, Iterator, Optional, Tuple
+
+from .workspace import LocalWorkspace, temp_suffix
+
+LINK_MODES = ("auto", "reflink", "hardlink", "copy")
+
+FICLONE = 0x40049409  # Linux ioctl: share the source file's extents
+
+# Failures meaning "this filesystem can't do that", not "something is wrong"
+_UNSUPPORTED = {errno.EXDEV, errno.EPERM, errno.EOPNOTSUPP, errno.ENOTTY, errno.EINVAL, errno.EMLINK,
+                getattr(errno, "ENOTSUP", errno.EOPNOTSUPP)}
+
+
+def digest(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def _reflink(source: Path, target: Path) -> None:
+    import fcntl
+    with open(source, "rb") as src, open(target, "wb") as dst:
+        fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+
+
+class BlobStore:
+    """Files stored once by content hash under `root/objects`."""
+
+    def __init__(self, root):
+        self.root = Path(root)
+        self.objects = self.root / "objects"
+        self.tmp = self.root / "tmp"
+        self.fresh = self.root / "fresh"
+        # Link modes found not to work on this filesystem
+        self.unsupported = set()
+
+    def path(self, blob: str) -> Path:
+        return self.objects / blob[:2] / blob[2:]
+
+    def put(self, data: bytes) -> Tuple[str, bool]:
+        """Store `data`; returns its hash and whether it had to be written."""
+        blob = digest(data)
+        path = self.path(blob)
+        if path.exists():
+            # Fresh again, so a concurrent gc leaves it alone
+            self._touch(blob)
+            return blob, False
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.tmp.mkdir(parents=True, exist_ok=True)
+        tmp = self.tmp / f"{blob}.{temp_suffix()}"
+        try:
+            tmp.write_bytes(data)
+            os.chmod(tmp, 0o444)
+            os.replace(tmp, path)
+        finally:
+            tmp.unlink(missing_ok=True)
+        return blob, True
+
+    def _touch(self, blob: str) -> None:
+        marker = self.fresh / blob
+        try:
+            os.utime(marker)
+        except FileNotFoundError:
+            self.fresh.mkdir(parents=True, exist_ok=True)
+            marker.touch()
+
+    def get(self, blob: str) -> bytes:
+        return self.path(blob).read_bytes()
+
+    def __contains__(self, blob: str) -> bool:
+        return self.path(blob).exists()
+
+    def materialize(self, blob: str, target: Path, mode: str = "auto") -> str:
+        """Place the blob at `target` (replacing it); returns the link mode used."""
+        if mode not in LINK_MODES:
+            raise ValueError(f"Unknown link mode: {mode!r}")
+        if mode == "auto":
+            # Read-only blobs don't stop root from editing every project through one link
+            modes = ("reflink", "copy") if _running_as_root() else ("reflink", "hardlink", "copy")
+        else:
+            modes = (mode,)
+        source = self.path(blob)
+        # Unique per call: concurrent runs in one process may write the same path
+        tmp = target.with_name(f".{target.name}.{temp_suffix()}.tmp")
+        for candidate in modes:
+            if candidate in self.unsupported and mode == "auto":
+                continue
+            tmp.unlink(missing_ok=True)
+            try:
+                if candidate == "reflink":
+                    _reflink(source, tmp)
+                elif candidate == "hardlink":
+                    os.link(source, tmp)
+                else:
+                    shutil.copyfile(source, tmp)
+                if candidate != "hardlink":
+                    os.chmod(tmp, 0o644)
+                os.replace(tmp, target)
+                return candidate
+            except OSError as e:
+                tmp.unlink(missing_ok=True)
+                if e.errno not in _UNSUPPORTED or mode != "auto" or isinstance(e, FileNotFoundError):
+                    raise
+                self.unsupported.add(candidate)
+        raise OSError(errno.EOPNOTSUPP, f"Cannot materialize {blob} at {target}")
+
+    def blobs(self) -> Iterator[Tuple[Path, os.stat_result]]:
+        if not self.objects.exists():
+            return
+        for directory in self.objects.iterdir():
+            for path in directory.iterdir():
+                with_stat = _stat(path)
+                if with_stat:
+                    yield path, with_stat
+
+    def gc(self, min_age: float = 3600.0) -> Dict[str, int]:
+        """Remove the blobs nothing links to any more, once they are `min_age` seconds old."""
+        removed = freed = kept = 0
+        cutoff = time.time() - min_age
+        for path, info in self.blobs():
+            marker = _stat(self.fresh / (path.parent.name + path.name))
+            if info.st_nlink > 1 or max(info.st_mtime, marker.st_mtime if marker else 0) > cutoff:
+                kept += 1
+                continue
+            path.unlink(missing_ok=True)
+            removed += 1
+            freed += info.st_size
+        # Stale freshness markers, and leftovers of writers that died before renaming
+        for directory in (self.fresh, self.tmp):
+            if directory.exists():
+                for path in directory.iterdir():
+                    info = _stat(path)
+                    if info and info.st_mtime <= cutoff:
+                        path.unlink(missing_ok=True)
+        return {"removed": removed, "bytes_freed": freed, "kept": kept}
+
+    def stats(self) -> Dict[str, int]:
+        """Blobs and bytes stored, and the bytes their extra hardlinks would otherwise take."""
+        blobs = size = links = saved = 0
+        for _, info in self.blobs():
+            blobs += 1
+            size += info.st_size
+            links += info.st_nlink - 1
+            saved += info.st_size * max(0, info.st_nlink - 2)
+        return {"blobs": blobs, "bytes": size, "links": links, "bytes_saved": saved}
+
+
+def _running_as_root() -> bool:
+    return hasattr(os, "geteuid") and os.geteuid() == 0
+
+
+def _stat(path: Path) -> Optional[os.stat_result]:
+    try:
+        info = path.stat()
+    except FileNotFoundError:
+        return None
+    return info if stat.S_ISREG(info.st_mode) else None
+
+
+class DedupWorkspace(LocalWorkspace):
+    """A `LocalWorkspace` whose files are materialized from a shared `BlobStore`."""
+
+    def __init__(self, root="./agentic_code", store: Optional[BlobStore] = None, mode: str = "auto"):
+        super().__init__(root)
+        self.store = store or BlobStore(self.root / ".blobs")
+        self.mode = mode
+        self.bytes_written = 0  # new blob content
+        self.bytes_deduplicated = 0  # content that was already stored
+
+    def _write(self, target: Path, content: str) -> None:
+        data = content.encode("utf-8")
+        target.parent.mkdir(parents=True, exist_ok=True)
+        for attempt in range(3):
+            blob, written = self.store.put(data)
+            try:
+                self.store.materialize(blob, target, self.mode)
+                break
+            except FileNotFoundError:
+                # Collected between put and link by a gc that ignored the grace period
+                if attempt == 2:
+                    raise
+        if written:
+            self.bytes_written += len(data)
+        else:
+            self.bytes_deduplicated += len(data)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m src.blobstore", description="Manage the shared blob store.")
+    parser.add_argument("command", choices=("gc", "stats"))
+    parser.add_argument("store", nargs="?", help="Blob store directory (default: OPEN_SWE_BLOB_STORE)")
+    parser.add_argument("--min-age", type=float, default=3600.0,
+                        help="Only collect blobs unused for this many seconds (default: 3600)")
+    args = parser.parse_args(argv)
+    root = args.store
+    if not root:
+        from .config import config
+        root = config.blob_store
+    if not root:
+        parser.error("no store given and OPEN_SWE_BLOB_STORE is not set")
+    store = BlobStore(root)
+    result = store.gc(args.min_age) if args.command == "gc" else store.stats()
+    print(" ".join(f"{key}={value}" for key, value in result.items()))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
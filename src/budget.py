@@ -0,0 +1,85 @@
+"""Per-run budgets and no-progress detection for the agent graph.
+
+A run is bounded in manager rounds, wall-clock seconds and LLM tokens. After every
+node the relevant part of the state (has a plan, has code, number of files, the
+next agent) is fingerprinted. Seeing a fingerprint again means the manager sent
+the run back to an agent without anything having changed: the first repeat is
+escalated by overriding the manager with the deterministic routing rule, a
+further repeat stops the run.
+"""
+
+import hashlib
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+ESCALATE_AFTER = 2
+STOP_AFTER = 3
+
+
+@dataclass
+class RunBudget:
+    """Limits for one run; 0 disables a limit."""
+
+    max_iterations: int = 10
+    max_seconds: float = 0.0
+    max_tokens: int = 0
+
+    @classmethod
+    def from_config(cls) -> "RunBudget":
+        from .config import config
+        return cls(max_iterations=config.max_iterations, max_seconds=config.max_run_seconds,
+                   max_tokens=config.max_run_tokens)
+
+    def exceeded(self, iterations: int, started_at: float, tokens: int) -> Optional[str]:
+        """The reason the run must stop, or None while it is within budget."""
+        if self.max_iterations and iterations >= self.max_iterations:
+            return f"iteration budget exhausted ({iterations}/{self.max_iterations} manager rounds)"
+        if self.max_seconds and time.monotonic() - started_at >= self.max_seconds:
+            return f"time budget exhausted ({self.max_seconds:.0f}s)"
+        if self.max_tokens and tokens >= self.max_tokens:
+            return f"token budget exhausted ({tokens}/{self.max_tokens} tokens)"
+        return None
+
+
+def default_next_agent(state) -> str:
+    """The routing rule the manager is asked to follow."""
+    if not state.get('plan'):
+        return "planner"
+    if not state.get('code_ref'):
+        return "programmer"
+    return "complete"
+
+
+def state_fingerprint(state, node: str) -> str:
+    """Fingerprint of the routing-relevant state after `node` ran."""
+    key = "|".join([
+        node,
+        str(state.get('next')),
+        str(bool(state.get('plan'))),
+        str(bool(state.get('code_ref'))),
+        str(len(state.get('files_created') or [])),
+    ])
+    return hashlib.sha1(key.encode()).hexdigest()[:12]
+
+
+def check_progress(state, node: str) -> Optional[str]:
+    """Record the fingerprint after `node`; escalate or return a stop reason on repeats.
+
+    Mutates `state['fingerprints']` and, when escalating, `state['next']`.
+    """
+    fingerprints = state.get('fingerprints')
+    if fingerprints is None:
+        fingerprints = state['fingerprints'] = {}
+    fingerprint = state_fingerprint(state, node)
+    seen = fingerprints.get(fingerprint, 0) + 1
+    fingerprints[fingerprint] = seen
+
+    if seen >= STOP_AFTER:
+        return f"no progress: {node} keeps routing to {state.get('next')} without changing the state"
+    if seen >= ESCALATE_AFTER and node == "manager":
+        fallback = default_next_agent(state)
+        if fallback == state.get('next'):
+            return f"no progress: {node} keeps routing to {fallback} without changing the state"
+        state['next'] = fallback
+    return None
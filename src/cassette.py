@@ -0,0 +1,217 @@
+"""Record/replay cassettes for LLM calls.
+
+In record mode every agent call is captured with its prompt messages, the
+streamed chunks and the delay before each chunk, and appended to a gzipped
+JSON-lines cassette. In replay mode the same calls are served back through the
+`astream`/`invoke` interface the agents already use, at the original pace, faster,
+or instantly, so parser and graph changes can be profiled against real traffic
+shapes without an Azure endpoint.
+
+Entry format (one JSON object per line):
+
+    {"agent": "planner", "model": "DeepSeek-R1-0528", "key": "<prompt hash>",
+     "messages": [{"role": "system", "content": "..."}],
+     "t": [812, 40, 38, ...],        # ms since the previous chunk
+     "c": ["<think>", "Okay", ...],  # chunk contents
+     "finish_reason": "stop", "usage": {...}}
+
+A call that failed upstream (a 429, a dropped connection) is recorded with
+`"error": "<exception type>"` and never replayed; its retry is the entry that is.
+Recorded usage is replayed with the last chunk, so token and budget accounting
+matches the recorded run.
+"""
+
+import asyncio
+import gzip
+import hashlib
+import json
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from langchain_core.messages import AIMessage, AIMessageChunk
+
+
+def message_key(messages) -> str:
+    """Stable hash of a prompt, used to match replayed calls."""
+    digest = hashlib.sha1()
+    for m in messages:
+        digest.update(type(m).__name__.encode())
+        digest.update(str(getattr(m, "content", m)).encode("utf-8"))
+    return digest.hexdigest()[:16]
+
+
+def _serialize_messages(messages) -> List[Dict[str, str]]:
+    return [{"role": getattr(m, "type", type(m).__name__), "content": str(getattr(m, "content", m))}
+            for m in messages]
+
+
+class Cassette:
+    """A gzipped JSON-lines file of recorded LLM calls."""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._entries: Optional[List[dict]] = None
+        self._used: set = set()
+
+    def append(self, entry: dict) -> None:
+        line = json.dumps(entry, ensure_ascii=False, separators=(",", ":")) + "\n"
+        with self._lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            # Each append is its own gzip member; gzip readers concatenate them
+            with gzip.open(self.path, "at", encoding="utf-8") as f:
+                f.write(line)
+
+    def entries(self) -> List[dict]:
+        with self._lock:
+            if self._entries is None:
+                with gzip.open(self.path, "rt", encoding="utf-8") as f:
+                    self._entries = [json.loads(line) for line in f if line.strip()]
+            return self._entries
+
+    def take(self, agent: str, messages) -> dict:
+        """Claim the recorded call for `agent`, preferring an exact prompt match."""
+        entries = self.entries()
+        key = message_key(messages)
+        with self._lock:
+            candidates = [i for i, e in enumerate(entries)
+                          if e["agent"] == agent and not e.get("error") and i not in self._used]
+            if not candidates:
+                raise LookupError(f"No recorded {agent} call left in {self.path}")
+            index = next((i for i in candidates if entries[i].get("key") == key), candidates[0])
+            self._used.add(index)
+            return entries[index]
+
+
+class RecordingLLM:
+    """Wraps a chat model and records every call into a cassette."""
+
+    def __init__(self, llm, agent: str, cassette: Cassette):
+        self.llm = llm
+        self.agent = agent
+        self.cassette = cassette
+
+    def __getattr__(self, name):
+        return getattr(self.llm, name)
+
+    def _entry(self, messages, delays, contents, finish_reason=None, usage=None, error=None) -> dict:
+        entry = {
+            "agent": self.agent,
+            "model": getattr(self.llm, "model_name", None),
+            "key": message_key(messages),
+            "recorded_at": time.time(),
+            "messages": _serialize_messages(messages),
+            "t": delays,
+            "c": contents,
+            "finish_reason": finish_reason,
+            "usage": usage,
+        }
+        if error is not None:
+            entry["error"] = type(error).__name__
+        return entry
+
+    async def astream(self, messages, **kwargs):
+        delays, contents = [], []
+        finish_reason = None
+        usage = None
+        error = None
+        last = time.monotonic()
+        try:
+            async for chunk in self.llm.astream(messages, **kwargs):
+                now = time.monotonic()
+                if chunk.content:
+                    delays.append(round((now - last) * 1000))
+                    contents.append(chunk.content)
+                    last = now
+                finish_reason = (getattr(chunk, "response_metadata", None) or {}).get("finish_reason", finish_reason)
+                usage = getattr(chunk, "usage_metadata", None) or usage
+                yield chunk
+        except Exception as e:
+            # A failed attempt; the retry is recorded on its own
+            error = e
+            raise
+        finally:
+            # Also runs when the consumer stops early, so partial streams are kept
+            self.cassette.append(self._entry(messages, delays, contents, finish_reason, usage, error))
+
+    def stream(self, messages, **kwargs):
+        delays, contents = [], []
+        finish_reason = None
+        usage = None
+        error = None
+        last = time.monotonic()
+        try:
+            for chunk in self.llm.stream(messages, **kwargs):
+                now = time.monotonic()
+                if chunk.content:
+                    delays.append(round((now - last) * 1000))
+                    contents.append(chunk.content)
+                    last = now
+                finish_reason = (getattr(chunk, "response_metadata", None) or {}).get("finish_reason", finish_reason)
+                usage = getattr(chunk, "usage_metadata", None) or usage
+                yield chunk
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            self.cassette.append(self._entry(messages, delays, contents, finish_reason, usage, error))
+
+    def invoke(self, messages, **kwargs):
+        start = time.monotonic()
+        response = self.llm.invoke(messages, **kwargs)
+        self.cassette.append(self._entry(
+            messages,
+            [round((time.monotonic() - start) * 1000)],
+            [str(response.content)],
+            (getattr(response, "response_metadata", None) or {}).get("finish_reason"),
+            getattr(response, "usage_metadata", None),
+        ))
+        return response
+
+
+class ReplayLLM:
+    """Serves recorded calls back through the chat model interface.
+
+    `speed` scales the recorded inter-chunk delays: 1.0 replays at the original
+    pace, 10.0 ten times faster and 0 instantly.
+    """
+
+    def __init__(self, agent: str, cassette: Cassette, speed: float = 1.0):
+        self.agent = agent
+        self.cassette = cassette
+        self.speed = speed
+        self.model_name = f"replay:{agent}"
+        self.endpoint = str(cassette.path)
+
+    def _delay(self, ms: int) -> float:
+        return 0.0 if self.speed <= 0 else ms / 1000.0 / self.speed
+
+    async def astream(self, messages, **kwargs):
+        entry = self.cassette.take(self.agent, messages)
+        last = len(entry["c"]) - 1
+        for i, (ms, content) in enumerate(zip(entry["t"], entry["c"])):
+            await asyncio.sleep(self._delay(ms))
+            yield _chunk(entry, content, i == last)
+
+    def stream(self, messages, **kwargs):
+        entry = self.cassette.take(self.agent, messages)
+        last = len(entry["c"]) - 1
+        for i, (ms, content) in enumerate(zip(entry["t"], entry["c"])):
+            time.sleep(self._delay(ms))
+            yield _chunk(entry, content, i == last)
+
+    def invoke(self, messages, **kwargs):
+        entry = self.cassette.take(self.agent, messages)
+        time.sleep(sum(self._delay(ms) for ms in entry["t"]))
+        return AIMessage(content="".join(entry["c"]), usage_metadata=entry.get("usage"),
+                         response_metadata={"finish_reason": entry.get("finish_reason")})
+
+
+def _chunk(entry: dict, content: str, last: bool) -> AIMessageChunk:
+    """A replayed chunk; the last one carries the call's finish reason and usage."""
+    if not last:
+        return AIMessageChunk(content=content)
+    return AIMessageChunk(content=content, usage_metadata=entry.get("usage"),
+                          response_metadata={"finish_reason": entry.get("finish_reason")})
@@ -0,0 +1,127 @@
+"""Request complexity classification for routing.
+
+Most requests need the full manager -> planner -> programmer pipeline, but a
+small, self-contained task ("a Python function to calculate factorial") does
+not need a separate planning pass. `classify` scores a request locally from
+its length, the files it mentions, list items and keywords:
+
+- a clearly simple request is routed "simple": one programmer call that
+  writes a short plan and the code together,
+- anything else, and every request on an existing repository, is routed
+  "full".
+
+Scores between the two thresholds are `uncertain`; a small model can then
+decide (see `ROUTING_PROMPT`), otherwise the request takes the full route.
+`log_classification` appends a classification and the run's outcome to a
+JSONL file, so misroutes can be found and the thresholds tuned.
+"""
+
+import json
+import os
+import re
+import time
+from dataclasses import asdict, dataclass, field, replace
+from typing import Any, Dict, Optional, Tuple
+
+SIMPLE = "simple"
+FULL = "full"
+
+# Scores at or below SIMPLE_MAX are simple, at or above FULL_MIN full
+SIMPLE_MAX = 0.25
+FULL_MIN = 0.5
+
+SIMPLE_KEYWORDS = frozenset({
+    "function", "method", "snippet", "script", "one-liner", "oneliner", "calculate", "compute", "convert",
+    "regex", "single", "simple", "small", "helper", "example", "algorithm", "class",
+})
+COMPLEX_KEYWORDS = frozenset({
+    "app", "application", "api", "server", "service", "microservice", "database", "sql", "frontend", "backend",
+    "full-stack", "fullstack", "website", "web", "dashboard", "authentication", "auth", "login", "deploy",
+    "docker", "kubernetes", "project", "framework", "refactor", "migrate", "integrate", "integration",
+    "multiple", "pipeline", "tests", "ui", "gui", "cli", "game", "bot", "scraper", "crud",
+})
+
+_WORD = re.compile(r"[a-z][a-z0-9+-]*")
+_FILE_NAME = re.compile(r"\b[\w./-]+\.(?:py|js|ts|tsx|jsx|html|css|json|ya?ml|toml|md|sql|sh|go|rs|java)\b", re.I)
+_FILE_COUNT = re.compile(r"\b(\d+|two|three|four|five|several|multiple)\s+(?:\w+\s+)?(?:files|modules|pages)\b", re.I)
+_LIST_ITEM = re.compile(r"^\s*(?:[-*]|\d+[.)])\s+", re.MULTILINE)
+_NUMBERS = {"two": 2, "three": 3, "four": 4, "five": 5, "several": 3, "multiple": 3}
+
+ROUTING_PROMPT = (
+    "Classify the coding request. Reply with ONE word only:\n"
+    '- "simple" if it can be written as one or two small files without planning\n'
+    '- "complex" if it needs several files, components or a design'
+)
+
+
+@dataclass(frozen=True)
+class Classification:
+    """Where a request is routed and why."""
+
+    route: str  # SIMPLE or FULL
+    score: float
+    reasons: Tuple[str, ...] = ()
+    uncertain: bool = False
+    source: str = "heuristic"  # or "model", "config"
+    features: Dict[str, Any] = field(default_factory=dict)
+
+    def decided(self, route: str, source: str = "model") -> "Classification":
+        """This classification with the route settled by another judge."""
+        return replace(self, route=route, uncertain=False, source=source)
+
+
+def request_features(request: str) -> Dict[str, Any]:
+    # File names are counted, not read as keywords ("app.py" is no app)
+    words = _WORD.findall(_FILE_NAME.sub(" ", request).lower())
+    file_count = max((int(n) if n.isdigit() else _NUMBERS[n.lower()] for n in _FILE_COUNT.findall(request)),
+                     default=0)
+    return {
+        "words": len(request.split()),
+        "files": max(len(set(_FILE_NAME.findall(request))), file_count),
+        "list_items": len(_LIST_ITEM.findall(request)),
+        "simple_keywords": sorted(SIMPLE_KEYWORDS.intersection(words)),
+        "complex_keywords": sorted(COMPLEX_KEYWORDS.intersection(words)),
+    }
+
+
+def classify(request: str, repo_path: Optional[str] = None) -> Classification:
+    """Score `request` from 0 (trivial) upwards and route it."""
+    features = request_features(request)
+    if repo_path:
+        return Classification(FULL, 1.0, ("existing repository",), features=features)
+
+    score, reasons = 0.3, []
+    words = features["words"]
+    if words <= 15:
+        score -= 0.1
+        reasons.append(f"short request ({words} words)")
+    elif words > 40:
+        score += 0.2 if words <= 120 else 0.4
+        reasons.append(f"long request ({words} words)")
+    if features["files"] >= 2:
+        score += 0.2 if features["files"] < 4 else 0.4
+        reasons.append(f"{features['files']} files mentioned")
+    if features["list_items"] >= 3:
+        score += 0.2
+        reasons.append(f"{features['list_items']} list items")
+    if features["complex_keywords"]:
+        score += min(0.6, 0.15 * len(features["complex_keywords"]))
+        reasons.append("complex keywords: " + ", ".join(features["complex_keywords"]))
+    if features["simple_keywords"]:
+        score -= min(0.3, 0.15 * len(features["simple_keywords"]))
+        reasons.append("simple keywords: " + ", ".join(features["simple_keywords"]))
+
+    score = round(score, 3)
+    if score <= SIMPLE_MAX:
+        return Classification(SIMPLE, score, tuple(reasons), features=features)
+    return Classification(FULL, score, tuple(reasons), uncertain=score < FULL_MIN, features=features)
+
+
+def log_classification(path: str, request: str, classification: Classification, **outcome) -> None:
+    """Append a classification and what came of it (status, files, tokens, seconds, ...) to a JSONL file."""
+    record = {"time": time.time(), "request": request, **asdict(classification), "outcome": outcome}
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(record, default=str) + "\n")
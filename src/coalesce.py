@@ -0,0 +1,207 @@
+"""Single-flight coalescing of identical in-flight agent runs.
+
+Requests are keyed on their normalized text plus everything else that shapes
+the result (target repository, budget, model deployment and generation
+settings). While a run for a key is in flight, further identical requests
+attach to it instead of starting their own manager -> planner -> programmer
+chain:
+
+- every participant receives the run's progress events on its own bus,
+- the run writes into a shared in-memory workspace, and each participant gets
+  the files copied into its own workspace and its own copy of the final state;
+  participants whose workspaces are the same directory (e.g. all using the
+  default output directory) share one copy instead of overwriting each other,
+- a participant that is cancelled just detaches; the run is only cancelled
+  once nobody is waiting for it any more.
+
+Only in-flight runs are shared; a request arriving after the run finished
+starts a new one.
+"""
+
+import asyncio
+import dataclasses
+import hashlib
+import json
+import os
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from .events import EventBus, Subscription
+from .workspace import MemoryWorkspace, Workspace
+
+
+def normalize_request(request: str) -> str:
+    """Case- and whitespace-insensitive form of a request."""
+    return " ".join(request.split()).casefold()
+
+
+def run_settings() -> Dict[str, Any]:
+    """The configuration that changes what a run produces."""
+    from .config import config
+    return {
+        name: getattr(config, name)
+        for name in ("azure_ai_endpoint", "azure_ai_deployment_name", "max_iterations", "max_run_seconds",
+                     "max_run_tokens", "max_output_tokens", "max_continuations", "repo_context_tokens",
+                     "cassette_mode", "cassette_path", "routing", "classifier_model")
+    }
+
+
+def coalesce_key(request: str, repo_path: Optional[str] = None, budget=None,
+                 settings: Optional[Dict[str, Any]] = None, **other) -> str:
+    """Key of a run; any other runner argument (e.g. a profiler) only matches the very same object."""
+    payload = {
+        "request": normalize_request(request),
+        "repo_path": os.path.abspath(repo_path) if repo_path else None,
+        "budget": dataclasses.asdict(budget) if budget is not None else None,
+        "settings": run_settings() if settings is None else settings,
+        "other": {name: f"{type(value).__name__}@{id(value)}" for name, value in other.items()},
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()[:16]
+
+
+@dataclass
+class Delivery:
+    """The copy of a flight's files into one directory, shared by its participants."""
+
+    task: asyncio.Task
+    waiters: int = 0
+
+
+@dataclass
+class Flight:
+    """One shared run and the participants waiting for it."""
+
+    key: str
+    events: EventBus
+    workspace: MemoryWorkspace
+    task: Optional[asyncio.Task] = None
+    participants: int = 0
+    deliveries: Dict[str, Delivery] = field(default_factory=dict)
+
+
+class RunCoalescer:
+    """Shares one in-flight run between concurrent identical requests."""
+
+    def __init__(self, runner: Callable[..., Awaitable[Any]],
+                 key: Callable[..., str] = coalesce_key, default_workspace: Optional[Callable[[], Workspace]] = None):
+        self.runner = runner
+        self.key = key
+        self.default_workspace = default_workspace
+        self.flights: Dict[str, Flight] = {}
+        self.runs = 0
+        self.coalesced = 0
+
+    def _start(self, key: str, request: str, kwargs: Dict[str, Any]) -> Flight:
+        flight = Flight(key=key, events=EventBus(), workspace=MemoryWorkspace())
+
+        async def fly():
+            try:
+                return await self.runner(request, workspace=flight.workspace, events=flight.events, **kwargs)
+            finally:
+                flight.events.close()
+                if self.flights.get(key) is flight:
+                    del self.flights[key]
+
+        flight.task = asyncio.get_running_loop().create_task(fly())
+        self.flights[key] = flight
+        self.runs += 1
+        return flight
+
+    async def run(self, request: str, workspace: Optional[Workspace] = None, events: Optional[EventBus] = None,
+                  **kwargs) -> Any:
+        """Run `request`, or attach to the identical run already in flight.
+
+        Files end up in `workspace` (by default a fresh `default_workspace()`, or
+        `output_workspace()`), progress goes to `events`, other keyword arguments
+        go to the runner and are part of the key.
+        """
+        key = self.key(request, **kwargs)
+        flight = self.flights.get(key)
+        if flight is None:
+            flight = self._start(key, request, kwargs)
+        else:
+            self.coalesced += 1
+        flight.participants += 1
+
+        # Lossy, so a slow participant cannot hold up the shared run's token stream
+        subscription = flight.events.subscribe(lossy=True) if events else None
+        forward = asyncio.create_task(_forward(subscription, events)) if events else None
+        try:
+            result = await asyncio.shield(flight.task)
+            if forward:
+                await forward
+            return await self._deliver(flight, result, workspace or self._workspace())
+        finally:
+            flight.participants -= 1
+            if forward and not forward.done():
+                forward.cancel()
+                flight.events.unsubscribe(subscription)
+            if flight.participants == 0 and not flight.task.done():
+                # Nobody is waiting for the result any more; later requests start afresh
+                flight.task.cancel()
+                if self.flights.get(key) is flight:
+                    del self.flights[key]
+
+    def _workspace(self) -> Workspace:
+        if self.default_workspace:
+            return self.default_workspace()
+        from .workspace import output_workspace
+        return output_workspace()
+
+    async def _deliver(self, flight: Flight, result: Any, target: Workspace) -> Any:
+        """Copy the shared run's files into `target` and point the result at the copies.
+
+        Participants writing to the same directory wait for one copy; it is only
+        abandoned (and rolled back) once all of them have been cancelled.
+        """
+        directory = _directory(target)
+        delivery = flight.deliveries.get(directory) if directory else None
+        if delivery is None or delivery.task.cancelled():
+            delivery = Delivery(asyncio.create_task(_copy(flight.workspace, target)))
+            if directory:
+                flight.deliveries[directory] = delivery
+        delivery.waiters += 1
+        try:
+            locations = await asyncio.shield(delivery.task)
+        finally:
+            delivery.waiters -= 1
+            if delivery.waiters == 0 and not delivery.task.done():
+                delivery.task.cancel()
+        files_created = tuple(locations.get(path, path) for path in (_get(result, "files_created") or ()))
+        if dataclasses.is_dataclass(result):
+            return dataclasses.replace(result, files_created=files_created, workspace=target)
+        return {**result, "files_created": list(files_created), "workspace": target}
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "in_flight": len(self.flights),
+            "waiting": sum(f.participants for f in self.flights.values()),
+            "runs": self.runs,
+            "coalesced": self.coalesced,
+        }
+
+
+def _directory(workspace: Workspace) -> Optional[str]:
+    """The directory a workspace writes to, if it writes to disk."""
+    root = getattr(workspace, "root", None)
+    return os.path.realpath(root) if root is not None else None
+
+
+async def _copy(source: MemoryWorkspace, target: Workspace) -> Dict[str, str]:
+    locations = {}
+    try:
+        for path in source.files:
+            locations[path] = await target.write(path, source.read(path))
+    except asyncio.CancelledError:
+        target.discard(locations.values())
+        raise
+    return locations
+
+
+def _get(result: Any, name: str) -> Any:
+    return result.get(name) if hasattr(result, "get") else getattr(result, name, None)
+
+
+async def _forward(subscription: Subscription, events: EventBus) -> None:
+    async for event in subscription:
+        await events.publish(event)
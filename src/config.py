@@ -15,6 +15,13 @@ class Config(BaseModel):
     azure_ai_endpoint: str = os.getenv("AZURE_AI_ENDPOINT", "")
     azure_ai_api_version: str = os.getenv("AZURE_AI_API_VERSION", "2024-02-15-preview")
     azure_ai_deployment_name: str = os.getenv("AZURE_AI_DEPLOYMENT_NAME", "")
+    # Equivalent endpoints per model to balance calls over (see src.balancer; empty:
+    # only azure_ai_endpoint), when an endpoint is taken out of rotation, and whether
+    # a run's calls stay on one endpoint
+    azure_ai_endpoints: str = os.getenv("AZURE_AI_ENDPOINTS", "")
+    endpoint_failure_threshold: int = int(os.getenv("AZURE_AI_ENDPOINT_FAILURE_THRESHOLD", "3"))
+    endpoint_cooldown_seconds: float = float(os.getenv("AZURE_AI_ENDPOINT_COOLDOWN_SECONDS", "30"))
+    sticky_routing: bool = os.getenv("OPEN_SWE_STICKY_ROUTING", "true").lower() == "true"
 
     # LangSmith tracing (optional)
     langchain_tracing_v2: bool = os.getenv("LANGCHAIN_TRACING_V2", "false").lower() == "false"
@@ -24,6 +31,60 @@ class Config(BaseModel):
     # Application settings
     log_level: str = os.getenv("LOG_LEVEL", "ERROR")
     max_iterations: int = int(os.getenv("MAX_ITERATIONS", "10"))
+    max_run_seconds: float = float(os.getenv("MAX_RUN_SECONDS", "0"))
+    max_run_tokens: int = int(os.getenv("MAX_RUN_TOKENS", "0"))
+    output_dir: str = os.getenv("OPEN_SWE_OUTPUT_DIR", "./agentic_code")
+    # Shared content-addressed store for generated files (empty: plain files) and
+    # how outputs are linked to it ("auto", "reflink", "hardlink" or "copy")
+    blob_store: str = os.getenv("OPEN_SWE_BLOB_STORE", "")
+    blob_link_mode: str = os.getenv("OPEN_SWE_BLOB_LINK", "auto").lower()
+
+    # Client-side rate limiting, per deployment (0 disables a limit)
+    azure_ai_requests_per_minute: int = int(os.getenv("AZURE_AI_REQUESTS_PER_MINUTE", "0"))
+    azure_ai_tokens_per_minute: int = int(os.getenv("AZURE_AI_TOKENS_PER_MINUTE", "0"))
+    max_output_tokens: int = int(os.getenv("MAX_OUTPUT_TOKENS", "8192"))
+    rate_limit_max_retries: int = int(os.getenv("RATE_LIMIT_MAX_RETRIES", "5"))
+    # Follow-up requests for a programmer answer cut off at the output limit
+    max_continuations: int = int(os.getenv("OPEN_SWE_MAX_CONTINUATIONS", "3"))
+
+    # Runs with a deadline: expected output rate, when to skip the manager LLM,
+    # and when to switch to the fast deployment (empty: never)
+    deadline_tokens_per_second: float = float(os.getenv("OPEN_SWE_DEADLINE_TOKENS_PER_SECOND", "40"))
+    deadline_skip_manager_seconds: float = float(os.getenv("OPEN_SWE_DEADLINE_SKIP_MANAGER_SECONDS", "90"))
+    deadline_fast_model_seconds: float = float(os.getenv("OPEN_SWE_DEADLINE_FAST_MODEL_SECONDS", "45"))
+    fast_model: str = os.getenv("AZURE_AI_FAST_MODEL", "")
+
+    # Request routing: "auto" sends simple requests to one combined plan-and-code
+    # call, "full" always runs the whole pipeline. The classifier model decides
+    # uncertain cases (empty: take the full route); the log records classifications.
+    routing: str = os.getenv("OPEN_SWE_ROUTING", "auto").lower()
+    classifier_model: str = os.getenv("AZURE_AI_CLASSIFIER_MODEL", "")
+    classifier_log: str = os.getenv("OPEN_SWE_CLASSIFIER_LOG", "")
+
+    # Where each run's reasoning trace is spilled, gzipped (empty: not kept), how
+    # long and how much of them is kept there (0: no limit), and how much of a
+    # trace's end is kept in memory
+    trace_dir: str = os.getenv("OPEN_SWE_TRACE_DIR", "~/.cache/open-swe/traces")
+    trace_max_age_days: float = float(os.getenv("OPEN_SWE_TRACE_MAX_AGE_DAYS", "7"))
+    trace_max_mb: float = float(os.getenv("OPEN_SWE_TRACE_MAX_MB", "256"))
+    trace_tail_chars: int = int(os.getenv("OPEN_SWE_TRACE_TAIL_CHARS", "4000"))
+
+    # JSONL log of every run's events, aggregated by `open-swe-cli.py stats`
+    telemetry_log: str = os.getenv("OPEN_SWE_TELEMETRY_LOG", "")
+
+    # Record/replay of LLM calls ("off", "record" or "replay")
+    cassette_mode: str = os.getenv("OPEN_SWE_CASSETTE_MODE", "off").lower()
+    cassette_path: str = os.getenv("OPEN_SWE_CASSETTE", "")
+    cassette_replay_speed: float = float(os.getenv("OPEN_SWE_REPLAY_SPEED", "1.0"))
+
+    # Existing-repository context
+    repo_index_dir: str = os.getenv("OPEN_SWE_INDEX_DIR", "")
+    repo_context_tokens: int = int(os.getenv("OPEN_SWE_REPO_CONTEXT_TOKENS", "6000"))
+
+    # MCP server
+    mcp_max_concurrent_runs: int = int(os.getenv("OPEN_SWE_MCP_MAX_CONCURRENT_RUNS", "4"))
+    mcp_cancel_timeout: float = float(os.getenv("OPEN_SWE_MCP_CANCEL_TIMEOUT", "5"))
+    mcp_coalesce_requests: bool = os.getenv("OPEN_SWE_MCP_COALESCE", "true").lower() == "true"
     
     def validate_required(self) -> None:
         """Validate required configuration fields."""
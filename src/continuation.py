@@ -0,0 +1,142 @@
+"""Continuation of programmer answers that were cut off at the output limit.
+
+A programmer answer is one JSON document `{"files": [...], "folder_name": ...}`.
+When the model hits its output limit (finish reason `length`, or the document
+never closes), `salvage_files` recovers every file object that was emitted
+completely. The next request replays the answer up to the end of the last
+complete file as the assistant's turn, so that prefix is shared rather than
+regenerated, and asks only for the remaining files. Later continuations extend
+the same conversation, so every earlier part stays in the replayed prefix and
+in the list of files not to repeat. `stitch` joins the parts into one document.
+"""
+
+import json
+import re
+from typing import Dict, Iterable, List, NamedTuple, Optional
+
+_decoder = json.JSONDecoder()
+
+
+class Salvage(NamedTuple):
+    """What could be recovered from a (possibly truncated) programmer answer."""
+
+    files: List[dict]
+    folder_name: Optional[str]
+    end: int  # offset just after the last complete file object
+    complete: bool  # the whole document parsed
+
+
+def _document_start(response: str) -> int:
+    fence = response.find("```json")
+    return response.find("{", fence + len("```json") if fence >= 0 else 0)
+
+
+def _parse(document: str) -> Optional[dict]:
+    for candidate in (document, re.sub(r",(\s*[}\]])", r"\1", document)):
+        try:
+            data = json.loads(candidate)
+        except json.JSONDecodeError:
+            continue
+        return data if isinstance(data, dict) else None
+    return None
+
+
+def salvage_files(response: str) -> Salvage:
+    """The complete file objects of the answer's JSON document, in order."""
+    start = _document_start(response)
+    if start < 0:
+        return Salvage([], None, 0, False)
+
+    try:
+        data, _ = _decoder.raw_decode(response, start)
+    except json.JSONDecodeError:
+        fence_end = response.find("```", start)
+        data = _parse(response[start:fence_end if fence_end >= 0 else len(response)].strip())
+    if isinstance(data, dict):
+        return Salvage(list(data.get("files") or []), data.get("folder_name"), len(response), True)
+
+    folder = re.search(r'"folder_name"\s*:\s*"((?:[^"\\]|\\.)*)"', response[start:])
+    folder_name = json.loads(f'"{folder.group(1)}"') if folder else None
+    files_key = re.compile(r'"files"\s*:\s*\[').search(response, start)
+    if not files_key:
+        return Salvage([], folder_name, start, False)
+
+    files, end = [], files_key.end()
+    pos = end
+    while True:
+        while pos < len(response) and response[pos] in " \t\r\n,":
+            pos += 1
+        if pos >= len(response) or response[pos] != "{":
+            break
+        try:
+            obj, pos = _decoder.raw_decode(response, pos)
+        except json.JSONDecodeError:
+            break  # the cut-off object
+        if isinstance(obj, dict):
+            files.append(obj)
+            end = pos
+    return Salvage(files, folder_name, end, False)
+
+
+def _closes(response: str, start: int) -> bool:
+    """Whether the document at `start` is balanced, i.e. ended rather than cut off (it may still be invalid)."""
+    depth, in_string, escape = 0, False, False
+    for ch in response[start:]:
+        if in_string:
+            if escape:
+                escape = False
+            elif ch == "\\":
+                escape = True
+            elif ch == '"':
+                in_string = False
+        elif ch == '"':
+            in_string = True
+        elif ch in "{[":
+            depth += 1
+        elif ch in "}]":
+            depth -= 1
+            if depth == 0:
+                return True
+    return False
+
+
+def is_truncated(response: str, finish_reason: Optional[str]) -> bool:
+    """Whether the answer stopped before its JSON document was complete.
+
+    Only a cut-off answer is worth continuing: one that hit the output limit,
+    or whose document never closes. A document that closes but doesn't parse
+    would come back the same way.
+    """
+    start = _document_start(response)
+    if start >= 0 and salvage_files(response).complete:
+        return False
+    if finish_reason == "length":
+        return True
+    return start >= 0 and not _closes(response, start)
+
+
+def file_path(file_info: dict) -> Optional[str]:
+    return file_info.get("file_path") or file_info.get("file_name")
+
+
+def continuation_prompt(parts: Iterable[Salvage]) -> str:
+    """Ask for the files after the ones already emitted, across all parts so far."""
+    done = ", ".join(p for p in (file_path(f) for part in parts for f in part.files) if p) or "none"
+    return (
+        "Your previous answer was cut off by the output limit. These files are complete and must not be "
+        f"repeated: {done}.\n"
+        "Continue with the remaining files only. Reply with a JSON object in the same format, "
+        '{"files": [...], "folder_name": "..."}, containing just the files that are still missing, '
+        "and keep each file complete."
+    )
+
+
+def stitch(parts: Iterable[Salvage]) -> Dict:
+    """One document from the parts of a continued answer; a later copy of a path replaces an earlier one."""
+    files: Dict[str, dict] = {}
+    folder_name = None
+    for part in parts:
+        folder_name = folder_name or part.folder_name
+        for file_info in part.files:
+            files[file_path(file_info) or f"unnamed_{len(files)}"] = file_info
+    return {"files": list(files.values()), "folder_name": folder_name or "output"}
@@ -0,0 +1,328 @@
+"""Warm background daemon that runs requests for short-lived CLI invocations.
+
+Every `python -m src.enhanced_graph "..."` otherwise pays for interpreter
+startup, the LangGraph/LangChain/rich imports, client construction and graph
+compilation before its first token. The daemon does that once and then
+serves runs over a Unix domain socket:
+
+    python -m src.daemon            # serve (in the foreground)
+    python -m src.daemon status     # active and queued runs
+    python -m src.daemon stop
+
+With a daemon listening, `python -m src.enhanced_graph` attaches to it before
+importing anything heavy (see `attach`), streams the run's events back to the
+terminal and exits with the run; without one it runs in-process as before.
+Closing the client (e.g. Ctrl-C) cancels its run. Runs use the daemon's
+configuration; generated files go under the client's working directory.
+
+The socket is `OPEN_SWE_DAEMON_SOCKET` (default `~/.cache/open-swe/daemon.sock`;
+empty disables attaching). The protocol is JSON lines: the client sends one
+message, `{"request": ..., "repo_path": ..., "cwd": ..., "deadline": ...}` (or
+`{"command": "status" | "stop"}`), and receives the run's events as
+`Event.to_dict()` records followed by `{"type": "result", ...}`.
+
+This module imports only the standard library at the top level, so that
+attaching stays cheap.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import socket
+import sys
+from contextlib import suppress
+from typing import Any, Dict, List, Optional
+
+from .reasoning import ThinkingPreview
+
+DEFAULT_SOCKET = "~/.cache/open-swe/daemon.sock"
+
+# Read directly rather than through `config`, which would import pydantic and dotenv
+SOCKET_ENV = "OPEN_SWE_DAEMON_SOCKET"
+
+
+def socket_path() -> str:
+    """The daemon's socket, or "" if attaching is disabled."""
+    return os.path.expanduser(os.environ.get(SOCKET_ENV, DEFAULT_SOCKET))
+
+
+def _send(sock_file, message: Dict[str, Any]) -> None:
+    sock_file.write(json.dumps(message, default=str).encode("utf-8") + b"\n")
+    sock_file.flush()
+
+
+def connect(path: Optional[str] = None, timeout: float = 0.5) -> Optional[socket.socket]:
+    """A connection to the daemon, or None if none is listening."""
+    path = path if path is not None else socket_path()
+    if not path or not os.path.exists(path):
+        return None
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.settimeout(timeout)
+    try:
+        sock.connect(path)
+    except OSError:
+        sock.close()
+        return None
+    sock.settimeout(None)
+    return sock
+
+
+def request(command: str, path: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """Send a `status` or `stop` command; None if no daemon is listening."""
+    sock = connect(path)
+    if sock is None:
+        return None
+    with sock, sock.makefile("rwb") as f:
+        _send(f, {"command": command})
+        line = f.readline()
+    return json.loads(line) if line else None
+
+
+class Renderer:
+    """Prints a run's events the way an in-process run shows its progress."""
+
+    def __init__(self, out=None):
+        self.out = out or sys.stdout
+        self.preview: Optional[ThinkingPreview] = None
+        self.answering = False
+
+    def __call__(self, event: Dict[str, Any]) -> None:
+        kind = event.get("type")
+        write = self.out.write
+        if kind == "node_started":
+            self._end_answer()
+            write(f"🚀 Running {event['node'].title()} Agent\n")
+        elif kind == "thinking_token":
+            if self.preview is None:
+                self.preview = ThinkingPreview(max_lines=10)
+                write(f"   💭 {event['agent'].title()} Thinking (live)\n")
+            for line in self.preview.feed(event["text"]):
+                write(f"      {line}\n")
+        elif kind == "answer_token":
+            self.answering = True
+            write(event["text"])
+        elif kind == "llm_call_finished":
+            self.preview = None
+            self._end_answer()
+        elif kind == "file_written":
+            self._end_answer()
+            write(f"📄 {event['location']}\n")
+        elif kind == "run_error":
+            self._end_answer()
+            write(f"Error: {event['message']}\n")
+        elif kind == "run_finished":
+            self._end_answer()
+            if event.get("stop_reason"):
+                write(f"⚠️  Stopped early: {event['stop_reason']}\n")
+            if event.get("degraded"):
+                write(f"⏱️  Degraded to meet the deadline: {', '.join(event['degraded'])}\n")
+        self.out.flush()
+
+    def _end_answer(self) -> None:
+        if self.answering:
+            self.out.write("\n")
+            self.answering = False
+
+
+def parse_run_args(argv: List[str]) -> Optional[Dict[str, Any]]:
+    """The run message for `python -m src.enhanced_graph` arguments, or None if there is no request."""
+    repo_path = None
+    if len(argv) > 1 and argv[0] == "--repo":
+        repo_path, argv = os.path.abspath(argv[1]), argv[2:]
+    if not argv:
+        return None
+    return {"request": " ".join(argv), "repo_path": repo_path, "cwd": os.getcwd()}
+
+
+def attach(argv: List[str], path: Optional[str] = None) -> Optional[int]:
+    """Run `argv` on the daemon and render it; the exit status, or None to run in-process."""
+    message = parse_run_args(argv)
+    if message is None:
+        return None
+    sock = connect(path)
+    if sock is None:
+        return None
+    render = Renderer()
+    result: Dict[str, Any] = {}
+    with sock, sock.makefile("rwb") as f:
+        try:
+            _send(f, message)
+            for line in f:
+                event = json.loads(line)
+                if event.get("type") == "result":
+                    result = event
+                    break
+                render(event)
+        except KeyboardInterrupt:
+            # Closing the connection cancels the run
+            return 130
+        except OSError as e:
+            print(f"Lost the connection to the daemon: {e}", file=sys.stderr)
+            return 1
+    if result.get("error"):
+        print(f"Error: {result['error']}")
+    print(f"\nCompleted. Files created: {result.get('files_created', [])}")
+    return 0 if result.get("status") == "complete" else 1
+
+
+class Daemon:
+    """Serves runs over a Unix socket from one warm process."""
+
+    def __init__(self, path: str, max_concurrent: int):
+        self.path = path
+        self.max_concurrent = max_concurrent
+        self.stopping: Optional[asyncio.Event] = None
+
+    def warm_up(self) -> None:
+        """Import the agent, construct its clients and compile its graph once."""
+        from . import enhanced_graph
+        from .coalesce import RunCoalescer
+        from .config import config
+        from .sessions import SessionManager
+        from .workspace import output_workspace
+
+        enhanced_graph.compiled_graph()
+        self.coalescer = RunCoalescer(enhanced_graph.run_agent)
+        self.sessions = SessionManager(
+            self.coalescer.run if config.mcp_coalesce_requests else enhanced_graph.run_agent,
+            max_concurrent=self.max_concurrent,
+            cancel_timeout=config.mcp_cancel_timeout,
+        )
+        self.output_workspace = output_workspace
+
+    async def serve(self) -> None:
+        self.warm_up()
+        self.stopping = asyncio.Event()
+        server = await asyncio.start_unix_server(self._handle, sock=self._bind())
+        print(f"open-swe daemon listening on {self.path} (pid {os.getpid()})", flush=True)
+        try:
+            async with server:
+                await self.stopping.wait()
+        finally:
+            with suppress(FileNotFoundError):
+                os.unlink(self.path)
+
+    def _bind(self) -> socket.socket:
+        """The daemon's socket, bound but not yet listening, reachable by this user only.
+
+        Runs execute requests with the user's credentials and write where the client
+        says, so nobody else may connect, not even before the permissions are set.
+        """
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        umask = os.umask(0o077)
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", mode=0o700, exist_ok=True)
+            with suppress(FileNotFoundError):
+                os.unlink(self.path)  # left behind by a daemon that died
+            sock.bind(self.path)
+            os.chmod(self.path, 0o600)
+        except BaseException:
+            sock.close()
+            raise
+        finally:
+            os.umask(umask)
+        return sock
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            line = await reader.readline()
+            if not line:
+                return
+            message = json.loads(line)
+            command = message.get("command", "run")
+            if command == "status":
+                await _write(writer, {"pid": os.getpid(), **self.sessions.status(),
+                                      "coalescing": self.coalescer.status()})
+            elif command == "stop":
+                await _write(writer, {"stopping": True})
+                self.stopping.set()
+            else:
+                run = asyncio.create_task(self._run(message, writer))
+                # The client closing its end (e.g. Ctrl-C) cancels its run
+                hangup = asyncio.create_task(reader.read())
+                await asyncio.wait({run, hangup}, return_when=asyncio.FIRST_COMPLETED)
+                hangup.cancel()
+                if not run.done():
+                    run.cancel()
+                with suppress(asyncio.CancelledError, ConnectionError):
+                    await run
+        except (ConnectionError, json.JSONDecodeError):
+            pass
+        finally:
+            writer.close()
+            with suppress(ConnectionError):
+                await writer.wait_closed()
+
+    async def _run(self, message: Dict[str, Any], writer: asyncio.StreamWriter) -> None:
+        from .deadline import Deadline
+        from .events import EventBus
+
+        events = EventBus()
+        forward = asyncio.create_task(_forward(events, events.subscribe(maxsize=1024, lossy=True), writer))
+        kwargs = {"workspace": self.output_workspace(message.get("cwd"))}
+        if message.get("repo_path"):
+            kwargs["repo_path"] = message["repo_path"]
+        if message.get("deadline"):
+            kwargs["deadline"] = Deadline.after(float(message["deadline"]))
+        try:
+            session = await self.sessions.run(message["request"], events=events, **kwargs)
+        finally:
+            events.close()
+        await forward
+        result = session.result or {}
+        await _write(writer, {
+            "type": "result",
+            **session.summary(),
+            "files_created": list(result.get("files_created") or []),
+            "stop_reason": result.get("stop_reason"),
+        })
+
+
+async def _write(writer: asyncio.StreamWriter, message: Dict[str, Any]) -> None:
+    writer.write(json.dumps(message, default=str).encode("utf-8") + b"\n")
+    await writer.drain()
+
+
+async def _forward(events, subscription, writer: asyncio.StreamWriter) -> None:
+    try:
+        async for event in subscription:
+            await _write(writer, event.to_dict())
+    except ConnectionError:
+        pass
+    finally:
+        # Unblock the run if the client went away
+        events.unsubscribe(subscription)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m src.daemon", description="Serve agent runs from a warm process.")
+    parser.add_argument("command", nargs="?", choices=("serve", "status", "stop"), default="serve")
+    parser.add_argument("--socket", default=None, help=f"Socket path (default: ${SOCKET_ENV} or {DEFAULT_SOCKET})")
+    parser.add_argument("--max-concurrent", type=int, default=None,
+                        help="Runs at once (default: OPEN_SWE_MCP_MAX_CONCURRENT_RUNS)")
+    args = parser.parse_args(argv)
+    path = os.path.expanduser(args.socket) if args.socket else socket_path()
+    if not path:
+        parser.error(f"no socket given and {SOCKET_ENV} is empty")
+
+    if args.command != "serve":
+        reply = request(args.command, path)
+        if reply is None:
+            print(f"No daemon is listening on {path}")
+            return 1
+        print(json.dumps(reply, indent=2))
+        return 0
+
+    if connect(path) is not None:
+        print(f"A daemon is already listening on {path}", file=sys.stderr)
+        return 1
+    from .config import config
+    daemon = Daemon(path, args.max_concurrent or config.mcp_max_concurrent_runs)
+    with suppress(KeyboardInterrupt):
+        asyncio.run(daemon.serve())
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
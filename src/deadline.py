@@ -0,0 +1,65 @@
+"""Deadlines for agent runs, and how the graph degrades as one approaches.
+
+A run started with a deadline binds a `Deadline` to its task (see `bind`);
+every LLM call and node below it reads it through `current_deadline`. The
+less time is left, the more the run gives up to finish on time:
+
+- each call's output is capped at what the deployment can stream in the
+  remaining time (`token_cap`),
+- below `config.deadline_fast_model_seconds` calls go to the fast
+  deployment, if one is configured,
+- below `config.deadline_skip_manager_seconds` the manager's LLM round trip
+  is replaced by the deterministic routing rule,
+- at the deadline the call in flight is cut off and the run returns the
+  files it has.
+
+Every such step is recorded, and a run that took one reports the status
+"degraded" instead of "complete".
+"""
+
+import contextvars
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+
+@dataclass(frozen=True)
+class Deadline:
+    """A point in `time.monotonic()` time by which the run must have returned."""
+
+    at: float
+
+    @classmethod
+    def after(cls, seconds: float) -> "Deadline":
+        return cls(time.monotonic() + seconds)
+
+    def remaining(self) -> float:
+        return max(0.0, self.at - time.monotonic())
+
+    @property
+    def passed(self) -> bool:
+        return time.monotonic() >= self.at
+
+
+def token_cap(remaining: float, tokens_per_second: float, max_tokens: int, floor: int = 256) -> int:
+    """Output tokens a call can stream in `remaining` seconds, between `floor` and `max_tokens`."""
+    if tokens_per_second <= 0:
+        return max_tokens
+    return max(min(floor, max_tokens), min(max_tokens, int(remaining * tokens_per_second)))
+
+
+_current_deadline: contextvars.ContextVar[Optional[Deadline]] = contextvars.ContextVar(
+    "open_swe_deadline", default=None)
+
+
+def bind(deadline: Optional[Deadline]) -> contextvars.Token:
+    """Apply `deadline` to this task and the tasks it starts."""
+    return _current_deadline.set(deadline)
+
+
+def unbind(token: contextvars.Token) -> None:
+    _current_deadline.reset(token)
+
+
+def current_deadline() -> Optional[Deadline]:
+    return _current_deadline.get()
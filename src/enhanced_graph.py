@@ -1,96 +1,241 @@
 """Simplified agent graph with async support."""
 
+import sys
+
+if __name__ == "__main__":
+    # Let a running daemon (see src.daemon) serve the request warm, before the heavy imports below
+    from .daemon import attach
+    _status = attach(sys.argv[1:])
+    if _status is not None:
+        sys.exit(_status)
+
+import functools
 import json
 import os
 import asyncio
-from pathlib import Path
-from typing import Dict, Optional
+import time
+import uuid
+from contextlib import suppress
+from typing import AsyncIterator, NamedTuple, Optional, Tuple, Union
 from langgraph.graph import StateGraph, END
-from langchain_core.messages import HumanMessage, SystemMessage
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
 
 # Import display functions
 from visuals import display_agent_status, display_agent_result, print_welcome_message
-from .llm import manager_llm, planner_llm, programmer_llm
-
-
-# Simplified state - only what we really need
-class SimpleState(Dict):
-    """Simplified agent state."""
-    request: str
-    plan: Optional[str] = None
-    code: Optional[str] = None
-    files_created: list = []
-    next: str = "manager"
-    iterations: int = 0
-
-def extract_thinking(text: str) -> tuple[str, str]:
-    """Extract thinking content and clean text."""
-    if "<think>" not in text:
-        return "", text
-    
-    start = text.find("<think>")
-    end = text.find("</think>")
-    if start >= 0 and end > start:
-        thoughts = text[start+7:end].strip()
-        clean = text[:start] + text[end+9:]
-        return thoughts, clean.strip()
-    return "", text
-
-
-async def stream_response(llm, messages, agent_name: str) -> str:
-    """Generic async streaming handler for all agents."""
+from .balancer import is_endpoint_failure, lease
+from .balancer import bind as bind_sticky, unbind as unbind_sticky
+from .budget import RunBudget, check_progress, default_next_agent
+from .classifier import FULL, ROUTING_PROMPT, SIMPLE, Classification, classify, log_classification
+from .completion import JsonDocumentComplete, RoutingTokenComplete, parse_routing_token
+from .config import config
+from .continuation import continuation_prompt, is_truncated, salvage_files, stitch
+from .deadline import Deadline, current_deadline, token_cap
+from .deadline import bind as bind_deadline, unbind as unbind_deadline
+from .events import (AnswerToken, EventBus, FileWritten, LlmCallFinished, NodeFinished, NodeStarted, PlanReady,
+                     RequestClassified, RunError, RunFinished, RunStarted, ScaffoldGenerated, ThinkingToken, bind,
+                     current_bus, emit, unbind)
+from .llm import classifier_llm, fast_llm, manager_llm, planner_llm, programmer_llm
+from .repo_index import repo_context
+from .scaffold import SKIP_INSTRUCTION, estimate_tokens_saved, scaffold_files
+from .state import SimpleState
+from .telemetry import start_telemetry
+from .workspace import Workspace, output_workspace, safe_relative_path
+from .reasoning import ReasoningTrace, ThinkingPreview, ThinkingSplitter, current_trace
+from .reasoning import bind as bind_trace, trace_for_run, unbind as unbind_trace
+from .ratelimit import estimate_tokens, get_rate_limiter, is_rate_limit_error, retry_after_seconds
+
+
+class StreamResult(NamedTuple):
+    """Answer text of a streamed call plus what it cost."""
+    text: str
+    tokens: int
+    finish_reason: Optional[str] = None
+    degraded: Tuple[str, ...] = ()  # how a deadline degraded the call
+    output_tokens: int = 0  # thinking included
+    generation_seconds: float = 0.0  # after the first token
+
+    @property
+    def output_rate(self) -> float:
+        """Output tokens per second while generating, or 0 if unknown."""
+        return self.output_tokens / self.generation_seconds if self.generation_seconds > 0 else 0.0
+
+
+async def stream_response(llm, messages, agent_name: str, is_complete=None) -> StreamResult:
+    """Generic async streaming handler for all agents.
+
+    `is_complete` is an optional completion predicate (see `src.completion`) called
+    with the answer text streamed so far; once it returns True the upstream stream
+    is closed instead of being drained.
+    """
     
     display_agent_status(agent_name, "working")
    
+    # Under a deadline, fit the call into the time that is left
+    deadline = current_deadline()
+    call_kwargs = {}
+    degraded = []
+    if deadline:
+        remaining = deadline.remaining()
+        cap = token_cap(remaining, config.deadline_tokens_per_second, config.max_output_tokens)
+        if cap < config.max_output_tokens:
+            call_kwargs["max_tokens"] = cap
+            degraded.append("tokens_capped")
+        fast = fast_llm(agent_name) if remaining < config.deadline_fast_model_seconds else None
+        if fast is not None:
+            llm = fast
+            degraded.append("fast_deployment")
+    
+    estimated_tokens = estimate_tokens(messages, call_kwargs.get("max_tokens", config.max_output_tokens))
+    streaming_events = current_bus() is not None
+    started = time.monotonic()
+    ttft = None
+    
+    trace = current_trace() or ReasoningTrace()
+    splitter = ThinkingSplitter()
+    answer_text = ""
+    finish_reason = None
+    usage = None
+    
+    async def consume(thinking: str, answer: str) -> None:
+        # Only the answer is kept; thinking goes to the run's trace and the live display
+        nonlocal answer_text
+        if thinking:
+            trace.write(thinking)
+            if streaming_events:
+                await emit(ThinkingToken, agent=agent_name, text=thinking)
+            for line in preview.feed(thinking):
+                print(f"      {line}")
+        if answer:
+            answer_text += answer
+            if streaming_events:
+                await emit(AnswerToken, agent=agent_name, text=answer)
+    
+    try:
+        # Nothing may run past the run's deadline, including rate-limit waits
+        cutoff = asyncio.timeout(deadline.remaining() if deadline else None)
+        async with cutoff:
+            for attempt in range(config.rate_limit_max_retries + 1):
+                # One endpoint per attempt, so a retry can go to another deployment
+                call = lease(llm)
+                limiter = get_rate_limiter(call.llm)
+                try:
+                    reserved = await limiter.acquire(estimated_tokens)
+                except BaseException:
+                    call.release()
+                    raise
+        
+                splitter = ThinkingSplitter()
+                preview = ThinkingPreview(max_lines=10)
+                answer_text = ""
+                usage = None
+                finish_reason = None
+                trace.begin(agent_name)
+                stream = call.llm.astream(messages, **call_kwargs)
+                upstream_error = None
+        
+                try:
+                    while True:
+                        try:
+                            chunk = await anext(stream)
+                        except StopAsyncIteration:
+                            break
+                        except BaseException as e:
+                            # Only errors of the call itself say anything about the endpoint
+                            upstream_error = e
+                            raise
+                        if getattr(chunk, 'usage_metadata', None):
+                            usage = chunk.usage_metadata
+                        metadata = getattr(chunk, 'response_metadata', None) or {}
+                        finish_reason = metadata.get('finish_reason', finish_reason)
+                        if hasattr(chunk, 'content') and chunk.content:
+                            if ttft is None:
+                                ttft = time.monotonic() - started
+                            was_thinking = splitter.saw_thinking
+                            thinking, answer = splitter.feed(chunk.content)
+                            if splitter.saw_thinking and not was_thinking:
+                                print(f"   💭 {agent_name.title()} Thinking (live)")
+                            await consume(thinking, answer)
+                    
+                            # Stop as soon as the answer is decisively complete
+                            if is_complete and answer and not splitter.in_thinking and is_complete(answer_text):
+                                break
+                    await consume(*splitter.flush())
+                except BaseException as e:
+                    if e is not upstream_error:
+                        # A bug of ours (or a cancellation) while handling a chunk the endpoint did send
+                        call.release()
+                        raise
+                    call.release(e)
+                    # Only retry 429s, or another endpoint, before any output was streamed
+                    retry = is_rate_limit_error(e) or (call.failover and is_endpoint_failure(e))
+                    if splitter.chars or not retry or attempt == config.rate_limit_max_retries:
+                        raise
+                    if is_rate_limit_error(e):
+                        limiter.on_rate_limited(retry_after_seconds(e))
+                        print(f"   ⏳ {agent_name.title()} rate limited, retrying")
+                    else:
+                        print(f"   ⚠️ {agent_name.title()} endpoint failed, retrying on another")
+                    continue
+                finally:
+                    # Release the upstream connection, also when we stopped early
+                    await stream.aclose()
+        
+                call.release()
+                limiter.on_success()
+                if usage:
+                    tokens = usage.get("total_tokens", reserved)
+                else:
+                    tokens = estimate_tokens(messages) + splitter.chars // 4
+                limiter.settle(reserved, tokens)
+                break
+    except TimeoutError:
+        if not (deadline and cutoff.expired()):
+            # An upstream timeout (network, SDK), not ours: leave it to the caller's retries
+            raise
+        # Out of time: keep what was streamed so far; an unfinished thinking block is no answer
+        finish_reason = "deadline"
+        degraded.append("cut_at_deadline")
+        if splitter.in_thinking:
+            answer_text = ""
+            print(f"   💭 {agent_name.title()} was still thinking: ...{trace.tail[-200:].strip()}")
+        tokens = estimate_tokens(messages) + splitter.chars // 4
+        limiter.settle(estimated_tokens, tokens)
     
-    full_response = ""
-    thinking_buffer = ""
-    in_thinking = False
-    displayed_lines = 0
-    
-    async for chunk in llm.astream(messages):
-        if hasattr(chunk, 'content') and chunk.content:
-            full_response += chunk.content
-            
-            # Real-time thinking display
-            if "<think>" in chunk.content:
-                in_thinking = True
-                print(f"   💭 {agent_name.title()} Thinking (live)")
-                # Get content after <think>
-                start = chunk.content.find("<think>") + 7
-                if start < len(chunk.content):
-                    thinking_buffer += chunk.content[start:]
-            elif "</think>" in chunk.content:
-                # Get content before </think>
-                end = chunk.content.find("</think>")
-                if end > 0:
-                    thinking_buffer += chunk.content[:end]
-                in_thinking = False
-            elif in_thinking:
-                thinking_buffer += chunk.content
-            
-            # Display new complete lines as they come (max 10)
-            if in_thinking and displayed_lines < 10:
-                lines = thinking_buffer.split('\n')
-                while displayed_lines < 10 and displayed_lines < len(lines) - 1:
-                    line = lines[displayed_lines].strip()
-                    if line:
-                        print(f"      {line}")
-                    displayed_lines += 1
-                if displayed_lines == 10 and len(lines) > 11:
-                    print("      ... (truncated)")
-                    displayed_lines = 11  # Stop checking
-    
-    thoughts, clean_text = extract_thinking(full_response)
+    # Estimated where the deployment reports no usage
+    usage = usage or {}
+    seconds = time.monotonic() - started
+    output_tokens = usage.get("output_tokens") or splitter.chars // 4
+    await emit(LlmCallFinished, agent=agent_name, model=getattr(llm, "model_name", None),
+               ttft=round(ttft, 4) if ttft is not None else None, seconds=round(seconds, 4),
+               tokens=tokens, finish_reason=finish_reason,
+               input_tokens=usage.get("input_tokens") or estimate_tokens(messages),
+               output_tokens=output_tokens,
+               cached_tokens=(usage.get("input_token_details") or {}).get("cache_read", 0))
+    clean_text = answer_text.strip() if splitter.saw_thinking else answer_text
     
     # Don't show rich display thoughts - we already showed them live
     print()  # Just add spacing
     
-    return clean_text
+    return StreamResult(clean_text, tokens, finish_reason, tuple(degraded), output_tokens,
+                        seconds - ttft if ttft is not None else 0.0)
+
 
+async def get_repo_context(state: SimpleState, query: str) -> str:
+    """Relevant files and symbols from the target repository, if the run has one."""
+    if not state.repo_path:
+        return ""
+    return await asyncio.to_thread(repo_context, state.repo_path, query, config.repo_context_tokens)
 
-async def manager_agent(state: SimpleState) -> SimpleState:
+
+async def manager_agent(state: SimpleState) -> dict:
     """Simplified manager - just routes to next agent."""
+    deadline = current_deadline()
+    if deadline and deadline.remaining() < config.deadline_skip_manager_seconds:
+        # Not enough time for a round trip that only confirms the routing rule
+        next_agent = default_next_agent(state)
+        display_agent_result("manager", f"Next: {next_agent} (deadline close, routed without LLM)")
+        return {'next': next_agent, 'iterations': 1, 'degraded': ("manager_skipped",)}
+    
     messages = [
         SystemMessage(content=f"""You are a manager agent that coordinates the overall workflow:
 
@@ -102,38 +247,31 @@ async def manager_agent(state: SimpleState) -> SimpleState:
         5. Mark as complete if work is finished
 
         Current state:
-        - Request: {state['request'][:100]}...
-        - Has plan: {bool(state.get('plan'))}
-        - Has code: {bool(state.get('code'))}
+        - Request: {state.request[:100]}...
+        - Has plan: {bool(state.plan_ref)}
+        - Has code: {bool(state.code_ref)}
         
         Reply with ONE word only:
         - "planner" if no plan exists
         - "programmer" if plan exists but no code
         - "complete" if code exists
         """),
-        HumanMessage(content=state['request'])
+        HumanMessage(content=state.request)
     ]
 
-    response = await stream_response(manager_llm, messages, "manager")
-    next_agent = response.strip().lower()
+    result = await stream_response(manager_llm, messages, "manager", is_complete=RoutingTokenComplete())
+    next_agent = parse_routing_token(result.text)
     
     # Validate and default
-    if next_agent not in ["planner", "programmer", "complete"]:
-        if not state.get('plan'):
-            next_agent = "planner"
-        elif not state.get('code'):
-            next_agent = "programmer"
-        else:
-            next_agent = "complete"
+    if next_agent is None:
+        next_agent = default_next_agent(state)
     
     display_agent_result("manager", f"Next: {next_agent}")
     
-    state['next'] = next_agent
-    state['iterations'] += 1
-    return state
+    return {'next': next_agent, 'iterations': 1, 'tokens_used': result.tokens, 'degraded': result.degraded}
 
 
-async def planner_agent(state: SimpleState) -> SimpleState:
+async def planner_agent(state: SimpleState) -> dict:
     """Simplified planner - creates implementation plan."""
     messages = [
         SystemMessage(content="""You are an expert software planning agent.
@@ -154,68 +292,90 @@ async def planner_agent(state: SimpleState) -> SimpleState:
         Format your response as a structured plan that a programmer can follow.
         Keep it concise and actionable.
         """),
-        HumanMessage(content=state['request'])
+        HumanMessage(content=state.request)
     ]
 
-    plan = await stream_response(planner_llm, messages, "planner")
+    context = await get_repo_context(state, state.request)
+    if context:
+        messages[1] = HumanMessage(
+            content=f"{state.request}\n\nRelevant code from the existing repository:\n\n{context}"
+        )
+
+    result = await stream_response(planner_llm, messages, "planner")
+    plan = result.text
 
     display_agent_result("planner", f"Plan created ({len(plan)} chars)")
+    await emit(PlanReady, plan=plan)
     
-    state['plan'] = plan
-    state['next'] = "manager"
-    return state
-
-
-async def programmer_agent(state: SimpleState) -> SimpleState:
-    """Simplified programmer - generates code."""
-    messages = [
-        SystemMessage(content=f"""You are an expert programmer agent. Implement this plan:
-
-        Plan to implement:
-        {state.get('plan', 'No plan provided')}
-
-        Your responsibilities:
-        1. Follow the provided plan exactly
-        2. Generate complete, working code
-        3. Include proper error handling and documentation
-        4. Follow best practices for the programming language
-        5. Provide clear implementation details
-        6. Make sure to include a requirements.txt file or equivalent!
+    # The plan is stored once and referenced from state
+    return {'plan_ref': state.artifacts.put(plan), 'next': "manager", 'tokens_used': result.tokens,
+            'degraded': result.degraded}
+
+
+async def continue_truncated(state: SimpleState, messages, result: StreamResult) -> StreamResult:
+    """Continue a programmer answer cut off at the output limit.
+
+    Each follow-up replays the answer up to its last complete file and asks only
+    for the missing files, up to `config.max_continuations` times and within the
+    run's token budget and deadline. Returns the stitched answer with the tokens,
+    output and generation time of all calls together.
+    """
+    if not is_truncated(result.text, result.finish_reason):
+        return result
+    response, tokens, degraded = result.text, result.tokens, result.degraded
+    output_tokens, generation_seconds = result.output_tokens, result.generation_seconds
+    
+    budget = state.budget or RunBudget.from_config()
+    deadline = current_deadline()
+    parts = []
+    # Every follow-up extends the previous one, so all earlier parts stay in the replayed prefix
+    conversation = list(messages)
+    for attempt in range(1, config.max_continuations + 1):
+        salvage = salvage_files(response)
+        if not salvage.files or budget.exceeded(state.iterations, state.started_at or time.monotonic(),
+                                                state.tokens_used + tokens):
+            break
+        if result.finish_reason == "deadline" or (deadline and deadline.passed):
+            # Out of time: return the complete files rather than asking for more
+            parts.append(salvage)
+            response = ""
+            break
+        parts.append(salvage)
+        display_agent_result("programmer", f"Output cut off after {sum(len(p.files) for p in parts)} files, "
+                                           f"continuing ({attempt}/{config.max_continuations})")
+        conversation += [
+            AIMessage(content=response[:salvage.end]),
+            HumanMessage(content=continuation_prompt(parts)),
+        ]
+        result = await stream_response(programmer_llm, conversation, "programmer",
+                                       is_complete=JsonDocumentComplete())
+        response, tokens, degraded = result.text, tokens + result.tokens, degraded + result.degraded
+        output_tokens += result.output_tokens
+        generation_seconds += result.generation_seconds
+        if not is_truncated(response, result.finish_reason):
+            break
+    
+    if parts:
+        # One document for the parser below, as if the model had answered in one go
+        response = f"```json\n{json.dumps(stitch(parts + [salvage_files(response)]), indent=2)}\n```"
+    return StreamResult(response, tokens, result.finish_reason, degraded, output_tokens, generation_seconds)
 
-        Generate the actual code implementation. Include:
-        - Complete file contents
-        - Proper imports and dependencies
-        - Error handling
-        - Documentation/comments
-        - Example usage if applicable
 
-        Format your response as complete code with clear file organization.
-        You should return a json object in this format:
-        
-        Format:
-        ```json
-        {{
-            "files": [
-                {{"file_path": "main.py", "file_content": "code here"}},
-                {{"file_path": "templates/index.html", "file_content": "code here"}},
-            ],
-            "folder_name": "project_name"
-        }}
-        ```
-        
-        Use 'file_path' to support nested directories. Write complete, working code with error handling.
-        Ensure all strings are properly escaped for valid JSON parsing.
-        """),
-        HumanMessage(content="Generate the code with properly escaped JSON")
-    ]
-
-    response = await stream_response(programmer_llm, messages, "programmer")
+async def write_files(state: SimpleState, response: str, output_rate: float) -> Tuple[list, int]:
+    """Write the files of a programmer answer, plus the scaffolded boilerplate.
 
+    `output_rate` is the answer's generation speed in tokens per second (0 if
+    unknown). Returns the locations written and the output tokens the scaffold saved.
+    """
     # Enhanced JSON extraction with subfolder support and better error handling
     files_created = []
+    scaffold_tokens = 0
     if "```json" in response:
         json_start = response.find("```json") + 7
         json_end = response.find("```", json_start)
+        if json_end < 0:
+            # The stream was closed right after the JSON document
+            json_end = len(response)
         if json_end > json_start:
             try:
                 json_content = response[json_start:json_end].strip()
@@ -256,19 +416,47 @@ async def programmer_agent(state: SimpleState) -> SimpleState:
                 
                 # Create files if data was successfully parsed
                 if data:
-                    folder = Path("./agentic_code") / data.get("folder_name", "output")
-                    folder.mkdir(parents=True, exist_ok=True)
+                    workspace = state.workspace or output_workspace()
+                    folder = data.get("folder_name", "output")
+                    written = {}
                     
-                    for file_info in data.get("files", []):
-                        file_path_str = file_info.get("file_path") or file_info.get("file_name")
-                        file_content = file_info.get("file_content")
-                        
-                        if file_path_str and file_content:
-                            file_path = folder / file_path_str
-                            file_path.parent.mkdir(parents=True, exist_ok=True)
+                    try:
+                        for file_info in data.get("files", []):
+                            file_path_str = file_info.get("file_path") or file_info.get("file_name")
+                            file_content = file_info.get("file_content")
                             
-                            await asyncio.to_thread(file_path.write_text, file_content, encoding='utf-8')
-                            files_created.append(str(file_path))
+                            if file_path_str and file_content:
+                                try:
+                                    relative = safe_relative_path(file_path_str)
+                                    location = await workspace.write(f"{folder}/{file_path_str}", file_content)
+                                except ValueError as e:
+                                    # One bad path from the model must not cost the rest of the project
+                                    print(f"   ⚠️ Skipped {file_path_str!r}: {e}")
+                                    continue
+                                files_created.append(location)
+                                written[relative] = file_content
+                                await emit(FileWritten, path=f"{folder}/{file_path_str}", location=location,
+                                           bytes=len(file_content.encode("utf-8")))
+                        
+                        # Boilerplate the model was told to skip is generated locally
+                        if written:
+                            scaffold = scaffold_files(written, state.plan or "", folder)
+                            for file_path_str, file_content in scaffold.items():
+                                location = await workspace.write(f"{folder}/{file_path_str}", file_content)
+                                files_created.append(location)
+                                await emit(FileWritten, path=f"{folder}/{file_path_str}", location=location,
+                                           bytes=len(file_content.encode("utf-8")))
+                            scaffold_tokens = estimate_tokens_saved(scaffold)
+                            # At the programmer's output rate, that is how long the model would have taken
+                            seconds_saved = scaffold_tokens / output_rate if output_rate else 0.0
+                            await emit(ScaffoldGenerated, files=tuple(scaffold), tokens_saved=scaffold_tokens,
+                                       seconds_saved=round(seconds_saved, 3))
+                            display_agent_result("programmer", f"Scaffolded {len(scaffold)} files locally "
+                                                 f"(~{scaffold_tokens} output tokens, ~{seconds_saved:.1f}s saved)")
+                    except asyncio.CancelledError:
+                        # Don't leave a half-written project behind
+                        workspace.discard(files_created)
+                        raise
                 else:
                     print("Could not parse JSON response - no files created")
                     
@@ -280,35 +468,190 @@ async def programmer_agent(state: SimpleState) -> SimpleState:
                 print("Response preview:")
                 print(response[:1000] + "..." if len(response) > 1000 else response)
     
+    return files_created, scaffold_tokens
+
+
+async def programmer_agent(state: SimpleState) -> dict:
+    """Simplified programmer - generates code."""
+    messages = [
+        SystemMessage(content=f"""You are an expert programmer agent. Implement this plan:
+
+        Plan to implement:
+        {state.plan or 'No plan provided'}
+
+        Your responsibilities:
+        1. Follow the provided plan exactly
+        2. Generate complete, working code
+        3. Include proper error handling and documentation
+        4. Follow best practices for the programming language
+        5. Provide clear implementation details
+        6. {SKIP_INSTRUCTION}
+
+        Generate the actual code implementation. Include:
+        - Complete file contents
+        - Proper imports and dependencies
+        - Error handling
+        - Documentation/comments
+        - Example usage if applicable
+
+        Format your response as complete code with clear file organization.
+        You should return a json object in this format:
+        
+        Format:
+        ```json
+        {{
+            "files": [
+                {{"file_path": "main.py", "file_content": "code here"}},
+                {{"file_path": "templates/index.html", "file_content": "code here"}},
+            ],
+            "folder_name": "project_name"
+        }}
+        ```
+        
+        Use 'file_path' to support nested directories. Write complete, working code with error handling.
+        Ensure all strings are properly escaped for valid JSON parsing.
+        """),
+        HumanMessage(content="Generate the code with properly escaped JSON")
+    ]
+
+    context = await get_repo_context(state, f"{state.request}\n{state.plan or ''}")
+    if context:
+        messages.insert(1, HumanMessage(content=f"Relevant code from the existing repository:\n\n{context}"))
+
+    result = await stream_response(programmer_llm, messages, "programmer", is_complete=JsonDocumentComplete())
+    result = await continue_truncated(state, messages, result)
+    response, tokens, degraded = result.text, result.tokens, result.degraded
+
+    files_created, scaffold_tokens = await write_files(state, response, result.output_rate)
     
     display_agent_result("programmer", f"Created {len(files_created)} files")
     
-    state['code'] = response
-    state['files_created'] = files_created
-    state['next'] = "manager"
-    return state
+    # Keep the (large) raw response out of the state update
+    return {
+        'code_ref': state.artifacts.put(response),
+        'files_created': files_created,
+        'next': "manager",
+        'tokens_used': tokens,
+        'scaffold_tokens_saved': scaffold_tokens,
+        'degraded': degraded,
+    }
+
+
+async def oneshot_agent(state: SimpleState) -> dict:
+    """Plan and code a simple request in one programmer call, skipping the planner and manager rounds."""
+    messages = [
+        SystemMessage(content=f"""You are an expert programmer agent. Implement the user's request.
 
+        First write a short plan under the heading "## Plan": at most five bullet points.
+        Then write the complete, working code with error handling and documentation.
+        {SKIP_INSTRUCTION}
 
-def create_simple_graph():
-    """Create simplified agent graph with async support."""
+        You should return the code as a json object in this format:
+        
+        Format:
+        ```json
+        {{
+            "files": [
+                {{"file_path": "main.py", "file_content": "code here"}}
+            ],
+            "folder_name": "project_name"
+        }}
+        ```
+        
+        Use 'file_path' to support nested directories. Keep it small: one or two files.
+        Ensure all strings are properly escaped for valid JSON parsing.
+        """),
+        HumanMessage(content=state.request)
+    ]
+
+    result = await stream_response(programmer_llm, messages, "programmer", is_complete=JsonDocumentComplete())
+    # The plan is whatever came before the code; a continued answer comes back as the bare document
+    plan = result.text.split("```json", 1)[0].strip()
+    result = await continue_truncated(state, messages, result)
+    response, tokens, degraded = result.text, result.tokens, result.degraded
+    plan_ref = state.artifacts.put(plan) if plan else None
+    files_created, scaffold_tokens = await write_files(state.evolve({'plan_ref': plan_ref}), response,
+                                                       result.output_rate)
+    
+    if not files_created:
+        # Misrouted or failed: hand the request to the full pipeline, which plans it properly
+        display_agent_result("programmer", "One-shot answer had no files, continuing with the full pipeline")
+        return {'next': "manager", 'route': FULL, 'tokens_used': tokens, 'degraded': degraded}
+    
+    if plan:
+        await emit(PlanReady, plan=plan)
+    display_agent_result("programmer", f"Created {len(files_created)} files in one pass")
+    return {
+        'plan_ref': plan_ref,
+        'code_ref': state.artifacts.put(response),
+        'files_created': files_created,
+        'next': "complete",
+        'tokens_used': tokens,
+        'scaffold_tokens_saved': scaffold_tokens,
+        'degraded': degraded,
+    }
+
+
+def guarded(name: str, node):
+    """Wrap a node with the run's budget check and no-progress detection."""
+    
+    @functools.wraps(node)
+    async def run_node(state: SimpleState) -> dict:
+        budget = state.budget or RunBudget.from_config()
+        stop_reason = budget.exceeded(state.iterations, state.started_at or time.monotonic(), state.tokens_used)
+        deadline = current_deadline()
+        if not stop_reason and deadline and deadline.passed:
+            stop_reason = "deadline reached"
+        if stop_reason:
+            # Skip the LLM call entirely
+            return {'stop_reason': stop_reason}
+        
+        await emit(NodeStarted, node=name)
+        started = time.monotonic()
+        update = await node(state)
+        await emit(NodeFinished, node=name, seconds=round(time.monotonic() - started, 4),
+                   tokens=update.get('tokens_used', 0))
+        
+        # Judge progress on what the state will look like after this update
+        view = state.evolve(update)
+        view.fingerprints = dict(state.fingerprints or {})
+        update['stop_reason'] = check_progress(view, name)
+        update['fingerprints'] = view.fingerprints
+        if view.next != update.get('next', state.next):
+            update['next'] = view.next
+        return update
+    
+    return run_node
+
+
+def create_simple_graph(profiler=None):
+    """Create simplified agent graph with async support.
+    
+    With a `RunProfiler`, every node is wrapped so its CPU samples and
+    allocations are attributed to it.
+    """
     workflow = StateGraph(SimpleState)
     
     # Add nodes (async functions)
-    workflow.add_node("manager", manager_agent)
-    workflow.add_node("planner", planner_agent)
-    workflow.add_node("programmer", programmer_agent)
+    nodes = {"manager": manager_agent, "planner": planner_agent, "programmer": programmer_agent,
+             "oneshot": oneshot_agent}
+    for name, node in nodes.items():
+        workflow.add_node(name, guarded(name, profiler.wrap(name, node) if profiler else node))
     
-    # Simple routing
+    # Simple routing; budgets and cycle detection set `stop_reason`
     def route(state):
-        if state.get('iterations', 0) > 10:  # Safety limit
+        if state.stop_reason:
             return END
-        next_agent = state.get('next', 'manager')
+        next_agent = state.next or 'manager'
         return END if next_agent == 'complete' else next_agent
     
-    # Set up edges
-    workflow.set_entry_point("manager")
+    # Set up edges; simple requests start with the one-shot programmer call
+    workflow.set_conditional_entry_point(
+        lambda state: "oneshot" if state.route == SIMPLE else "manager",
+        {"oneshot": "oneshot", "manager": "manager"},
+    )
     
-    for node in ["manager", "planner", "programmer"]:
+    for node in ["manager", "planner", "programmer", "oneshot"]:
         workflow.add_conditional_edges(
             node, route,
             {"manager": "manager", "planner": "planner", 
@@ -317,43 +660,204 @@ def create_simple_graph():
     
     return workflow.compile()
 
-async def run_agent(request: str) -> SimpleState:
-    """Run the simplified agent system asynchronously."""
+
+@functools.lru_cache(maxsize=1)
+def compiled_graph():
+    """The graph without profiling, compiled once per process and shared by its runs."""
+    return create_simple_graph()
+
+async def classify_request(request: str, repo_path: Optional[str] = None) -> Tuple[Classification, int]:
+    """Route the request (see `src.classifier`); returns the classification and the tokens it took."""
+    tokens = 0
+    if config.routing != "auto":
+        classification = Classification(FULL, 1.0, (f"routing is {config.routing}",), source="config")
+    else:
+        classification = classify(request, repo_path)
+        llm = classifier_llm() if classification.uncertain else None
+        if llm is not None:
+            routes = ("simple", "complex")
+            messages = [SystemMessage(content=ROUTING_PROMPT), HumanMessage(content=request)]
+            result = await stream_response(llm, messages, "classifier", is_complete=RoutingTokenComplete(routes))
+            tokens = result.tokens
+            answer = parse_routing_token(result.text, routes)
+            if answer:
+                classification = classification.decided(SIMPLE if answer == "simple" else FULL)
+    
+    print(f"🧭 Route: {classification.route} (score {classification.score}, {classification.source})")
+    await emit(RequestClassified, route=classification.route, score=classification.score,
+               reasons=classification.reasons, source=classification.source)
+    return classification, tokens
+
+
+async def run_agent(request: str, repo_path: Optional[str] = None, profiler=None,
+                    workspace: Optional[Workspace] = None, budget: Optional[RunBudget] = None,
+                    events: Optional[EventBus] = None,
+                    deadline: Union[float, Deadline, None] = None) -> SimpleState:
+    """Run the simplified agent system asynchronously.
+
+    If `repo_path` points at an existing repository, the planner and programmer
+    get the relevant files and symbols from its index as context. A started
+    `RunProfiler` collects per-node CPU and memory statistics. Generated files
+    go to `workspace` (by default `output_workspace()`, i.e. `./agentic_code`); pass
+    a `MemoryWorkspace` or `ArchiveWorkspace` to get them back as bytes instead.
+    `budget` bounds the run in manager rounds, seconds and tokens (defaults from
+    config); why a run stopped early is reported in `stop_reason`. With an
+    `EventBus`, progress is also published as events (see `run_agent_events`).
+    With a `deadline` (seconds from now, or a `Deadline`), the run degrades as time runs out (see
+    `src.deadline`) and returns by then; the final status is "degraded" if it
+    had to. With `OPEN_SWE_TELEMETRY_LOG` set, the run's events are also
+    appended to that log (see `src.telemetry`). The models' thinking is not
+    kept in the result; it goes to the run's trace file (see `src.reasoning`).
+    """
+    if events is None and config.telemetry_log:
+        events = EventBus()
+    if events is not None:
+        token = bind(events)
+        telemetry = start_telemetry(events, config.telemetry_log) if config.telemetry_log else None
+        try:
+            return await run_agent(request, repo_path, profiler, workspace, budget, deadline=deadline)
+        except BaseException:
+            if telemetry:
+                # No run_finished will come; write what was recorded
+                telemetry.cancel()
+            raise
+        finally:
+            unbind(token)
+            if telemetry:
+                with suppress(asyncio.CancelledError):
+                    await telemetry
+    if deadline is not None:
+        token = bind_deadline(deadline if isinstance(deadline, Deadline) else Deadline.after(deadline))
+        try:
+            return await run_agent(request, repo_path, profiler, workspace, budget)
+        finally:
+            unbind_deadline(token)
+    if current_trace() is None:
+        # The run's reasoning trace, and its key for keeping its calls on one
+        # endpoint (for that endpoint's prompt cache)
+        bus = current_bus()
+        run_id = bus.run_id if bus else uuid.uuid4().hex[:12]
+        trace = trace_for_run(run_id)
+        token = bind_trace(trace)
+        sticky = bind_sticky(run_id) if config.sticky_routing else None
+        try:
+            return await run_agent(request, repo_path, profiler, workspace, budget)
+        finally:
+            if sticky:
+                unbind_sticky(sticky)
+            unbind_trace(token)
+            trace.close(wait=False)
+    await emit(RunStarted, request=request)
+    classification, classifier_tokens = await classify_request(request, repo_path)
+    
     initial_state = SimpleState(
         request=request,
-        plan=None,
-        code=None,
-        files_created=[],
-        next="manager",
-        iterations=0
+        route=classification.route,
+        tokens_used=classifier_tokens,
+        repo_path=repo_path,
+        workspace=workspace or output_workspace(),
+        budget=budget or RunBudget.from_config(),
+        started_at=time.monotonic(),
+        fingerprints={},
     )
     
-    app = create_simple_graph()
+    app = create_simple_graph(profiler=profiler) if profiler else compiled_graph()
     
     try:
+        # Stream per-node updates only and fold them into one state, instead of
+        # receiving a full snapshot of the state after every node
         final_state = initial_state
-        async for state_update in app.astream(initial_state):
-            if isinstance(state_update, dict):
-                for _, node_state in state_update.items():
-                    final_state = node_state
-                    break
+        # The budget ends the run; the recursion limit is only a backstop
+        max_iterations = initial_state.budget.max_iterations or 1000
+        async for state_update in app.astream(initial_state.as_input(), {"recursion_limit": 2 * max_iterations + 5},
+                                              stream_mode="updates"):
+            for _, node_update in state_update.items():
+                if node_update:
+                    final_state = final_state.evolve(node_update)
         
+        if final_state.stop_reason:
+            print(f"⚠️  Stopped early: {final_state.stop_reason}")
+        if final_state.degraded:
+            print(f"⏱️  Degraded to meet the deadline: {', '.join(final_state.degraded)}")
+        await emit_run_finished(final_state, run_status(final_state))
+        record_classification(classification, final_state, run_status(final_state))
         return final_state
         
     except Exception as e:
         print(f"Error: {e}")
+        await emit(RunError, message=str(e))
+        await emit_run_finished(initial_state, "error")
+        record_classification(classification, initial_state, "error")
         return initial_state
 
+
+def record_classification(classification: Classification, state: SimpleState, status: str) -> None:
+    """Log the routing decision with the run's outcome, for tuning the classifier."""
+    if not config.classifier_log:
+        return
+    log_classification(config.classifier_log, state.request, classification, status=status,
+                       escalated=state.route != classification.route, files=len(state.files_created),
+                       tokens=state.tokens_used, seconds=round(time.monotonic() - state.started_at, 3))
+
+
+def run_status(state: SimpleState) -> str:
+    """"degraded" if a deadline cut anything short, else "stopped" or "complete"."""
+    if state.degraded or state.stop_reason == "deadline reached":
+        return "degraded"
+    return "stopped" if state.stop_reason else "complete"
+
+
+async def emit_run_finished(state: SimpleState, status: str) -> None:
+    await emit(RunFinished, status=status, stop_reason=state.stop_reason, files_created=state.files_created,
+               iterations=state.iterations, tokens_used=state.tokens_used,
+               scaffold_tokens_saved=state.scaffold_tokens_saved, degraded=state.degraded)
+
+
+async def run_agent_events(request: str, events: Optional[EventBus] = None, lossy: bool = False,
+                           **kwargs) -> AsyncIterator:
+    """Run the agent and yield its progress as typed events (see `src.events`).
+
+    The first thinking/answer tokens arrive as soon as the LLM streams them.
+    Pass an `EventBus` to fan the same events out to further subscribers
+    (subscribe before iterating). If the consumer is slow, the run waits for it,
+    unless `lossy`, in which case token events it cannot keep up with are
+    dropped. Leaving the loop early cancels the run. Other keyword arguments
+    go to `run_agent`.
+    """
+    events = events or EventBus()
+    subscription = events.subscribe(lossy=lossy)
+    
+    async def run() -> SimpleState:
+        try:
+            return await run_agent(request, events=events, **kwargs)
+        finally:
+            events.close()
+    
+    task = asyncio.create_task(run())
+    try:
+        async for event in subscription:
+            yield event
+        await task
+    finally:
+        events.unsubscribe(subscription)
+        if not task.done():
+            task.cancel()
+            with suppress(asyncio.CancelledError):
+                await task
+
 # Main execution
 async def main():
-    import sys
+    args = sys.argv[1:]
+    repo_path = None
+    if len(args) > 1 and args[0] == "--repo":
+        repo_path, args = args[1], args[2:]
     
-    if len(sys.argv) > 1:
-        request = " ".join(sys.argv[1:])
-        result = await run_agent(request)
+    if args:
+        request = " ".join(args)
+        result = await run_agent(request, repo_path=repo_path)
         print(f"\nCompleted. Files created: {result.get('files_created', [])}")
     else:
-        print("Usage: python simplified_graph.py <request>")
+        print("Usage: python -m src.enhanced_graph [--repo <path>] <request>")
 
 if __name__ == "__main__":
     import atexit
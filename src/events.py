@@ -0,0 +1,242 @@
+"""Typed progress events for agent runs, with subscriber fan-out and backpressure.
+
+A run publishes its events to an `EventBus`. Every subscriber gets its own
+bounded queue:
+
+- By default a full queue makes the run wait (backpressure), so a subscriber
+  sees every event.
+- A `lossy` subscriber never slows the run down for token events: those that
+  do not fit its queue are dropped and counted. Every other event is still
+  delivered, waiting for room like any subscriber.
+- `types` restricts a subscription to the event types it cares about.
+
+The graph code publishes through `emit`, which goes to the bus bound to the
+current task (see `bind`) and does nothing when no bus is bound.
+"""
+
+import asyncio
+import contextvars
+import dataclasses
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Any, ClassVar, Dict, List, Optional, Tuple, Type
+
+
+@dataclass(frozen=True, slots=True, kw_only=True)
+class Event:
+    """Base of all run events; `t` is seconds since the run started."""
+
+    type: ClassVar[str] = "event"
+    run_id: str
+    t: float
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"type": self.type, **dataclasses.asdict(self)}
+
+
+@dataclass(frozen=True, slots=True, kw_only=True)
+class RunStarted(Event):
+    type: ClassVar[str] = "run_started"
+    request: str
+
+
+@dataclass(frozen=True, slots=True, kw_only=True)
+class RequestClassified(Event):
+    """How the request was routed (see `src.classifier`)."""
+
+    type: ClassVar[str] = "request_classified"
+    route: str
+    score: float
+    reasons: Tuple[str, ...]
+    source: str
+
+
+@dataclass(frozen=True, slots=True, kw_only=True)
+class NodeStarted(Event):
+    type: ClassVar[str] = "node_started"
+    node: str
+
+
+@dataclass(frozen=True, slots=True, kw_only=True)
+class NodeFinished(Event):
+    type: ClassVar[str] = "node_finished"
+    node: str
+    seconds: float
+    tokens: int = 0
+
+
+@dataclass(frozen=True, slots=True, kw_only=True)
+class ThinkingToken(Event):
+    type: ClassVar[str] = "thinking_token"
+    agent: str
+    text: str
+
+
+@dataclass(frozen=True, slots=True, kw_only=True)
+class AnswerToken(Event):
+    type: ClassVar[str] = "answer_token"
+    agent: str
+    text: str
+
+
+@dataclass(frozen=True, slots=True, kw_only=True)
+class LlmCallFinished(Event):
+    """Metrics of one streamed LLM call."""
+
+    type: ClassVar[str] = "llm_call_finished"
+    agent: str
+    model: Optional[str]
+    ttft: Optional[float]
+    seconds: float
+    tokens: int
+    finish_reason: Optional[str] = None
+    input_tokens: int = 0
+    output_tokens: int = 0
+    cached_tokens: int = 0  # input tokens served from the deployment's prompt cache
+
+
+@dataclass(frozen=True, slots=True, kw_only=True)
+class PlanReady(Event):
+    type: ClassVar[str] = "plan_ready"
+    plan: str
+
+
+@dataclass(frozen=True, slots=True, kw_only=True)
+class FileWritten(Event):
+    type: ClassVar[str] = "file_written"
+    path: str
+    location: str
+    bytes: int
+
+
+@dataclass(frozen=True, slots=True, kw_only=True)
+class ScaffoldGenerated(Event):
+    """Boilerplate files generated locally instead of by the model."""
+
+    type: ClassVar[str] = "scaffold_generated"
+    files: Tuple[str, ...]
+    tokens_saved: int
+    seconds_saved: float
+
+
+@dataclass(frozen=True, slots=True, kw_only=True)
+class RunError(Event):
+    type: ClassVar[str] = "run_error"
+    message: str
+
+
+@dataclass(frozen=True, slots=True, kw_only=True)
+class RunFinished(Event):
+    type: ClassVar[str] = "run_finished"
+    status: str  # "complete", "degraded", "stopped" or "error"
+    stop_reason: Optional[str]
+    files_created: Tuple[str, ...]
+    iterations: int
+    tokens_used: int
+    scaffold_tokens_saved: int = 0
+    degraded: Tuple[str, ...] = ()
+
+
+TOKEN_EVENTS = (ThinkingToken, AnswerToken)
+
+_CLOSED = object()
+
+
+class Subscription:
+    """One subscriber's bounded queue; iterate it to receive events until the run ends."""
+
+    def __init__(self, bus: "EventBus", maxsize: int, lossy: bool, types: Optional[Tuple[Type[Event], ...]]):
+        self.bus = bus
+        self.lossy = lossy
+        self.types = types
+        self.dropped = 0
+        self.closed = False
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize)
+
+    def wants(self, event: Event) -> bool:
+        return self.types is None or isinstance(event, self.types)
+
+    def close(self) -> None:
+        self.closed = True
+        if not self.queue.full():
+            self.queue.put_nowait(_CLOSED)  # wake a waiting reader
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> Event:
+        while True:
+            if self.closed and self.queue.empty():
+                raise StopAsyncIteration
+            event = await self.queue.get()
+            if event is not _CLOSED:
+                return event
+
+
+class EventBus:
+    """Fans one run's events out to its subscribers."""
+
+    def __init__(self, run_id: Optional[str] = None):
+        self.run_id = run_id or uuid.uuid4().hex[:12]
+        self.started = time.monotonic()
+        self.subscriptions: List[Subscription] = []
+        self.closed = False
+
+    def subscribe(self, maxsize: int = 256, lossy: bool = False,
+                  types: Optional[Tuple[Type[Event], ...]] = None) -> Subscription:
+        subscription = Subscription(self, maxsize, lossy, types)
+        if self.closed:
+            subscription.close()
+        self.subscriptions.append(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        subscription.close()
+        # Unblock a publisher waiting for room in the queue
+        while not subscription.queue.empty():
+            subscription.queue.get_nowait()
+        if subscription in self.subscriptions:
+            self.subscriptions.remove(subscription)
+
+    def make(self, event_type: Type[Event], **fields) -> Event:
+        return event_type(run_id=self.run_id, t=round(time.monotonic() - self.started, 4), **fields)
+
+    async def publish(self, event: Event) -> None:
+        for subscription in tuple(self.subscriptions):
+            if subscription.closed or not subscription.wants(event):
+                continue
+            if subscription.lossy and subscription.queue.full():
+                if isinstance(event, TOKEN_EVENTS):
+                    subscription.dropped += 1
+                    continue
+            await subscription.queue.put(event)
+
+    def close(self) -> None:
+        """End the stream: subscribers receive what is queued, then stop."""
+        self.closed = True
+        for subscription in self.subscriptions:
+            subscription.close()
+
+
+_current_bus: contextvars.ContextVar[Optional[EventBus]] = contextvars.ContextVar("open_swe_event_bus", default=None)
+
+
+def bind(bus: Optional[EventBus]) -> contextvars.Token:
+    """Make `bus` receive the events emitted by this task and the tasks it starts."""
+    return _current_bus.set(bus)
+
+
+def unbind(token: contextvars.Token) -> None:
+    _current_bus.reset(token)
+
+
+def current_bus() -> Optional[EventBus]:
+    return _current_bus.get()
+
+
+async def emit(event_type: Type[Event], **fields) -> None:
+    """Publish an event to the current run's bus, if it has one."""
+    bus = _current_bus.get()
+    if bus is not None and bus.subscriptions:
+        await bus.publish(bus.make(event_type, **fields))
@@ -1,10 +1,15 @@
 """Main agent graph using LangGraph supervisor pattern."""
 
+import operator
+import uuid
+
 from langgraph.graph import StateGraph, END
+from langgraph.graph.message import add_messages
 from langgraph.prebuilt import ToolNode
 from .state import AgentState
 from .agents import manager_agent, planner_agent, programmer_agent
 from .config import config
+from .reasoning import bind as bind_trace, trace_for_run, unbind as unbind_trace
 
 
 def create_agent_graph():
@@ -23,6 +28,8 @@ def create_agent_graph():
         """Route to the next agent based on manager decision."""
         next_agent = state.get("next_agent")
         
+        if state.get("iteration_count", 0) >= config.max_iterations:
+            return END
         if next_agent == "complete":
             return END
         elif next_agent in ["planner", "programmer"]:
@@ -50,6 +57,18 @@ def create_agent_graph():
     return app
 
 
+# Fields whose updates are appended rather than replaced (mirrors AgentState)
+REDUCERS = {"messages": add_messages, "code_changes": operator.add, "created_files": operator.add}
+
+
+def apply_update(state: AgentState, update: dict) -> AgentState:
+    """Merge one node's update into `state` in place, the way the graph does."""
+    for key, value in update.items():
+        reducer = REDUCERS.get(key)
+        state[key] = reducer(state.get(key) or [], value) if reducer else value
+    return state
+
+
 def run_agent(request: str) -> AgentState:
     """Run the agent system with a given request."""
     # Initialize state
@@ -61,24 +80,27 @@ def run_agent(request: str) -> AgentState:
         "status": "planning",
         "next_agent": None,
         "iteration_count": 0,
+        "created_files": [],
         "error_message": None
     }
     
     # Create and run the graph
     app = create_agent_graph()
+    trace = trace_for_run(uuid.uuid4().hex[:12])
+    token = bind_trace(trace)
     
     try:
-        # Run the graph with iteration limit
-        final_state = None
-        for state in app.stream(initial_state, {"recursion_limit": config.max_iterations}):
-            final_state = state
-            # Get the last node's state
-            if isinstance(state, dict):
-                for node_name, node_state in state.items():
-                    final_state = node_state
-                    break
+        # The router stops after max_iterations manager rounds; each round is at most
+        # two graph steps, so the recursion limit is only a backstop
+        # Stream per-node updates only and fold them into one state
+        final_state = dict(initial_state)
+        for update in app.stream(initial_state, {"recursion_limit": 2 * config.max_iterations + 5},
+                                 stream_mode="updates"):
+            for _, node_update in update.items():
+                if node_update:
+                    apply_update(final_state, node_update)
         
-        return final_state or initial_state
+        return final_state
         
     except Exception as e:
         # Handle errors gracefully
@@ -86,3 +108,6 @@ def run_agent(request: str) -> AgentState:
         error_state["status"] = "error"
         error_state["error_message"] = str(e)
         return error_state
+    finally:
+        unbind_trace(token)
+        trace.close()
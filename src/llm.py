@@ -1,24 +1,155 @@
 """Azure AI LLM initialization."""
 
 import os
+import time
+from functools import lru_cache
+from typing import List
 from langchain_azure_ai.chat_models import AzureAIChatCompletionsModel
 from .config import config
+from .balancer import Balancer, BalancedLLM, Endpoint, EndpointSpec, is_endpoint_failure, lease, parse_endpoints
+from .cassette import Cassette, RecordingLLM, ReplayLLM
+from .reasoning import ReasoningTrace, ThinkingSplitter, current_trace
+from .ratelimit import estimate_tokens, get_rate_limiter, is_rate_limit_error, retry_after_seconds
 
 # Disable LangSmith tracing and suppress warnings
 os.environ["LANGCHAIN_TRACING_V2"] = "false"
 
-def create_azure_llm(model: str="Phi-4", temperature: float = 0.0) -> AzureAIChatCompletionsModel:
-    """Create an Azure AI chat model instance."""
+def create_azure_llm(model: str="Phi-4", temperature: float = 0.0):
+    """Create an Azure AI chat model instance, balanced if `AZURE_AI_ENDPOINTS` lists the model."""
+    endpoints = model_endpoints(model)
+    if not endpoints:
+        return create_endpoint_llm(config.azure_ai_endpoint, model, config.azure_ai_api_key, temperature)
+    return BalancedLLM(get_balancer(model), {
+        endpoint_name(spec, model): create_endpoint_llm(spec.endpoint, spec.deployment or model,
+                                                        spec.api_key or config.azure_ai_api_key, temperature)
+        for spec in endpoints
+    })
+
+
+def create_endpoint_llm(endpoint: str, model: str, credential: str,
+                        temperature: float = 0.0) -> AzureAIChatCompletionsModel:
     return AzureAIChatCompletionsModel(
-        endpoint=config.azure_ai_endpoint,
+        endpoint=endpoint,
         model=model,
         api_version=config.azure_ai_api_version,
-        credential=config.azure_ai_api_key,
+        credential=credential,
         temperature=temperature,
     )
 
 
+def model_endpoints(model: str) -> List[EndpointSpec]:
+    endpoints = parse_endpoints(config.azure_ai_endpoints)
+    return endpoints.get(model) or endpoints.get("*", [])
+
+
+def endpoint_name(spec: EndpointSpec, model: str) -> str:
+    return f"{spec.endpoint}|{spec.deployment or model}"
+
+
+@lru_cache(maxsize=None)
+def get_balancer(model: str) -> Balancer:
+    """The process-wide balancer of a model, shared by every agent using it."""
+    return Balancer(model, [Endpoint(endpoint_name(spec, model), spec.weight) for spec in model_endpoints(model)],
+                    failure_threshold=config.endpoint_failure_threshold, cooldown=config.endpoint_cooldown_seconds)
+
+
+def stream_rate_limited(llm, messages, agent: str, **kwargs) -> str:
+    """Stream an LLM synchronously through its deployment's shared rate limiter; returns the answer.
+
+    The thinking is not kept: it goes to the run's reasoning trace (see `src.reasoning`).
+    """
+    estimated_tokens = estimate_tokens(messages, config.max_output_tokens)
+    trace = current_trace() or ReasoningTrace()
+
+    for attempt in range(config.rate_limit_max_retries + 1):
+        call = lease(llm)
+        limiter = get_rate_limiter(call.llm)
+        try:
+            reserved = limiter.acquire_sync(estimated_tokens)
+        except BaseException:
+            call.release()
+            raise
+        splitter = ThinkingSplitter()
+        answer = []
+        usage = None
+        trace.begin(agent)
+        stream = iter(call.llm.stream(messages, **kwargs))
+        upstream_error = None
+        try:
+            while True:
+                try:
+                    chunk = next(stream)
+                except StopIteration:
+                    break
+                except BaseException as e:
+                    # Only errors of the call itself say anything about the endpoint
+                    upstream_error = e
+                    raise
+                usage = getattr(chunk, "usage_metadata", None) or usage
+                if chunk.content:
+                    thinking, text = splitter.feed(chunk.content)
+                    trace.write(thinking)
+                    answer.append(text)
+            thinking, text = splitter.flush()
+            trace.write(thinking)
+            answer.append(text)
+        except BaseException as e:
+            if e is not upstream_error:
+                call.release()
+                raise
+            call.release(e)
+            # Only retry 429s, or another endpoint, before any output was streamed
+            retry = is_rate_limit_error(e) or (call.failover and is_endpoint_failure(e))
+            if splitter.chars or not retry or attempt == config.rate_limit_max_retries:
+                raise
+            if is_rate_limit_error(e):
+                limiter.on_rate_limited(retry_after_seconds(e))
+            continue
+
+        call.release()
+        limiter.on_success()
+        if usage:
+            limiter.settle(reserved, usage.get("total_tokens", reserved))
+        return "".join(answer).strip()
+
+
+@lru_cache(maxsize=None)
+def get_cassette() -> Cassette:
+    """The cassette used by this process in record or replay mode."""
+    if config.cassette_path:
+        return Cassette(config.cassette_path)
+    if config.cassette_mode == "replay":
+        raise ValueError("OPEN_SWE_CASSETTE is required in replay mode")
+    return Cassette(f"cassettes/run-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}.jsonl.gz")
+
+
+def create_agent_llm(agent: str, model: str = "Phi-4", temperature: float = 0.0):
+    """Create the LLM for an agent, honouring the record/replay cassette mode."""
+    if config.cassette_mode == "replay":
+        return ReplayLLM(agent, get_cassette(), speed=config.cassette_replay_speed)
+    llm = create_azure_llm(model=model, temperature=temperature)
+    if config.cassette_mode == "record":
+        return RecordingLLM(llm, agent, get_cassette())
+    return llm
+
+
 # Pre-configured LLM instances for different use cases
-manager_llm = create_azure_llm(model = "DeepSeek-R1-0528", temperature=0.0)
-planner_llm = create_azure_llm(model = "DeepSeek-R1-0528", temperature=0.1)
-programmer_llm = create_azure_llm(model = "DeepSeek-R1-0528", temperature=0.0)
+manager_llm = create_agent_llm("manager", model = "DeepSeek-R1-0528", temperature=0.0)
+planner_llm = create_agent_llm("planner", model = "DeepSeek-R1-0528", temperature=0.1)
+programmer_llm = create_agent_llm("programmer", model = "DeepSeek-R1-0528", temperature=0.0)
+
+
+@lru_cache(maxsize=None)
+def fast_llm(agent: str):
+    """The agent's LLM on the fast deployment used when a deadline is close, or None if none is configured."""
+    if not config.fast_model:
+        return None
+    return create_agent_llm(agent, model=config.fast_model)
+
+
+@lru_cache(maxsize=None)
+def classifier_llm():
+    """The small model deciding uncertain request classifications, or None if none is configured."""
+    if not config.classifier_model:
+        return None
+    return create_agent_llm("classifier", model=config.classifier_model)
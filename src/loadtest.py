@@ -0,0 +1,324 @@
+"""Load-testing harness for concurrent agent runs.
+
+Drives `run_agent` (or the MCP server's `run_code_agent_in_process` tool, with
+its session manager, request coalescing and output directory) at a given
+arrival rate and concurrency against a local stand-in LLM. The stand-in emulates
+DeepSeek-R1-style streaming (time to first token, tokens per second, a thinking
+block before the answer) and a server-side quota that answers with 429s and a
+`retry-after` hint, so the client-side rate limiter is exercised as well.
+
+It reports end-to-end latency percentiles, event-loop lag, RSS growth and
+runs/second:
+
+    python -m src.loadtest --runs 200 --concurrency 50 --rate 20
+
+Runs take the full manager/planner/programmer route unless `--routing auto`
+lets the request classifier send simple requests to the one-call route. Every
+LLM the graph can reach is replaced by a stand-in, so no run calls Azure.
+"""
+
+import argparse
+import asyncio
+import contextlib
+import importlib.util
+import json
+import os
+import random
+import resource
+import statistics
+import sys
+import tempfile
+import time
+from collections import deque
+from pathlib import Path
+from typing import Dict, List, Optional
+from unittest.mock import patch
+
+from langchain_core.messages import AIMessageChunk
+
+from .ratelimit import RateLimiter, deployment_key, rate_limit_metrics, register_rate_limiter
+from .workspace import MemoryWorkspace
+
+MCP_SERVER = Path(__file__).resolve().parent.parent / "open-swe-copilot.py"
+
+
+class StandInRateLimitError(Exception):
+    """Mimics the Azure client's 429 error (status code and retry-after header)."""
+
+    def __init__(self, retry_after: float):
+        super().__init__("429 Too Many Requests: rate limit exceeded")
+        self.status_code = 429
+        self.response = type("Response", (), {"status_code": 429, "headers": {"retry-after": f"{retry_after:.2f}"}})()
+
+
+class StandInServer:
+    """Shared behaviour of the stand-in deployment: latency profile and quota."""
+
+    def __init__(self, ttft: float = 0.3, tokens_per_second: float = 300.0, thinking_tokens: int = 200,
+                 answer_tokens: Optional[Dict[str, int]] = None, quota_rpm: int = 0, error_rate: float = 0.0):
+        self.ttft = ttft
+        self.tokens_per_second = tokens_per_second
+        self.thinking_tokens = thinking_tokens
+        self.answer_tokens = answer_tokens or {"manager": 1, "planner": 300, "programmer": 800}
+        self.quota_rpm = quota_rpm
+        self.error_rate = error_rate
+        self.calls = deque()
+        self.requests = 0
+        self.rejected = 0
+
+    def admit(self) -> None:
+        """Apply the server-side quota (sliding one-minute window) and random 429s."""
+        now = time.monotonic()
+        self.requests += 1
+        while self.calls and self.calls[0] < now - 60:
+            self.calls.popleft()
+        if self.quota_rpm and len(self.calls) >= self.quota_rpm:
+            self.rejected += 1
+            raise StandInRateLimitError(retry_after=self.calls[0] + 60 - now)
+        if self.error_rate and random.random() < self.error_rate:
+            self.rejected += 1
+            raise StandInRateLimitError(retry_after=1.0)
+        self.calls.append(now)
+
+
+def _words(count: int) -> List[str]:
+    vocabulary = ["the", "plan", "step", "function", "module", "test", "input", "value", "check", "return"]
+    return [f"{random.choice(vocabulary)} " for _ in range(count)]
+
+
+class StandInLLM:
+    """A chat model stand-in for one agent, with the `astream` interface the graph uses."""
+
+    endpoint = "standin://local"
+    model_name = "standin"
+
+    def __init__(self, agent: str, server: StandInServer):
+        self.agent = agent
+        self.server = server
+
+    def _answer(self, messages) -> List[str]:
+        if self.agent == "classifier":
+            return ["complex"]
+        if self.agent == "manager":
+            prompt = str(messages[0].content)
+            if "Has plan: False" in prompt:
+                return ["planner"]
+            return ["programmer"] if "Has code: False" in prompt else ["complete"]
+        if self.agent == "planner":
+            return ["## Plan\n"] + _words(self.server.answer_tokens["planner"])
+        body = "".join(_words(self.server.answer_tokens["programmer"]))
+        document = json.dumps({"files": [{"file_path": "main.py", "file_content": f"# {body}\n"}],
+                               "folder_name": "loadtest"})
+        return ["```json\n"] + [document[i:i + 4] for i in range(0, len(document), 4)] + ["\n```"]
+
+    async def astream(self, messages, **kwargs):
+        self.server.admit()
+        await asyncio.sleep(self.server.ttft)
+        delay = 1.0 / self.server.tokens_per_second
+        for token in ["<think>"] + _words(self.server.thinking_tokens) + ["</think>\n"] + self._answer(messages):
+            await asyncio.sleep(delay)
+            yield AIMessageChunk(content=token)
+
+
+class LoopLagMonitor:
+    """Measures how late the event loop wakes up a task that sleeps `interval`."""
+
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.lags: List[float] = []
+        self._task: Optional[asyncio.Task] = None
+
+    async def _run(self) -> None:
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            self.lags.append(max(0.0, time.perf_counter() - start - self.interval))
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        self._task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await self._task
+
+
+def rss_bytes() -> int:
+    """Current resident set size (falls back to the peak where /proc is unavailable)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+def load_mcp_server():
+    """A fresh instance of the MCP server module, so its session manager belongs to the running loop."""
+    spec = importlib.util.spec_from_file_location("open_swe_copilot", MCP_SERVER)
+    server = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(server)
+    return server
+
+
+class _ToolContext:
+    """The part of the MCP request context the tool uses; progress messages are discarded."""
+
+    async def info(self, message: str) -> None:
+        pass
+
+
+def percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def run_load(runs: int, concurrency: int, rate: float, target: str, server: StandInServer,
+                   request: str = "Create a Python function to calculate factorial", routing: str = "full") -> dict:
+    """Start `runs` agent runs (Poisson arrivals at `rate`/s, or all at once if 0) with at
+    most `concurrency` in flight."""
+    from . import enhanced_graph
+
+    stand_ins = {f"{agent}_llm": StandInLLM(agent, server) for agent in ("manager", "planner", "programmer")}
+    # The deadline's fast deployment and the routing classifier, too
+    classifier = StandInLLM("classifier", server)
+    stand_ins.update(fast_llm=lambda agent: stand_ins.get(f"{agent}_llm"), classifier_llm=lambda: classifier)
+    slots = asyncio.Semaphore(concurrency)
+    mcp_server = load_mcp_server() if target == "mcp" else None
+    latencies: List[float] = []
+    errors: List[str] = []
+    rss_samples = [rss_bytes()]
+
+    async def one_run() -> None:
+        async with slots:
+            start = time.perf_counter()
+            try:
+                if mcp_server:
+                    # The tool writes to the configured output directory, like in production
+                    result = await mcp_server.run_code_agent_in_process(request, _ToolContext())
+                    if result["status"] != "complete":
+                        raise RuntimeError(result["error"] or result["status"])
+                else:
+                    result = await enhanced_graph.run_agent(request, workspace=MemoryWorkspace())
+                # run_agent reports failures by returning a state without files
+                if not result.get("files_created"):
+                    raise RuntimeError("run finished without creating files")
+                latencies.append(time.perf_counter() - start)
+            except Exception as e:
+                errors.append(str(e))
+
+    async def sample_rss() -> None:
+        while True:
+            await asyncio.sleep(0.5)
+            rss_samples.append(rss_bytes())
+
+    monitor = LoopLagMonitor()
+    with patch.multiple(enhanced_graph, **stand_ins), patch.object(enhanced_graph.config, "routing", routing), \
+            tempfile.TemporaryDirectory(prefix="open-swe-loadtest-") as output_dir, \
+            patch.object(enhanced_graph.config, "output_dir", output_dir), \
+            open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        if mcp_server:
+            # Console output is already discarded; there is no protocol on stdout to protect
+            mcp_server._keep_stdout_for_protocol = lambda: None
+        monitor.start()
+        sampler = asyncio.create_task(sample_rss())
+        started = time.perf_counter()
+        tasks = []
+        for _ in range(runs):
+            tasks.append(asyncio.create_task(one_run()))
+            if rate > 0:
+                await asyncio.sleep(random.expovariate(rate))
+        await asyncio.gather(*tasks)
+        wall = time.perf_counter() - started
+        sampler.cancel()
+        await monitor.stop()
+    rss_samples.append(rss_bytes())
+
+    completed = len(latencies)
+    return {
+        "target": target,
+        "routing": routing,
+        "runs": runs,
+        "completed": completed,
+        "errors": len(errors),
+        "error_samples": errors[:5],
+        "concurrency": concurrency,
+        "arrival_rate": rate,
+        "wall_seconds": round(wall, 3),
+        "runs_per_second": round(completed / wall, 3) if wall else 0.0,
+        "latency_seconds": {
+            "p50": round(percentile(latencies, 50), 3),
+            "p95": round(percentile(latencies, 95), 3),
+            "p99": round(percentile(latencies, 99), 3),
+            "mean": round(statistics.fmean(latencies), 3) if latencies else 0.0,
+            "max": round(max(latencies, default=0.0), 3),
+        },
+        "event_loop_lag_ms": {
+            "p50": round(percentile(monitor.lags, 50) * 1000, 2),
+            "p99": round(percentile(monitor.lags, 99) * 1000, 2),
+            "max": round(max(monitor.lags, default=0.0) * 1000, 2),
+        },
+        "rss_mb": {
+            "start": round(rss_samples[0] / 1e6, 1),
+            "peak": round(max(rss_samples) / 1e6, 1),
+            "end": round(rss_samples[-1] / 1e6, 1),
+            "growth_per_run_kb": round((rss_samples[-1] - rss_samples[0]) / 1e3 / max(1, completed), 1),
+        },
+        "llm": {
+            "requests": server.requests,
+            "rejected_429": server.rejected,
+            "client_rate_limiter": rate_limit_metrics().get(deployment_key(StandInLLM)),
+        },
+    }
+
+
+def format_report(report: dict) -> str:
+    latency = report["latency_seconds"]
+    lag = report["event_loop_lag_ms"]
+    rss = report["rss_mb"]
+    return "\n".join([
+        f"Target: {report['target']} ({report['routing']} routing)  "
+        f"runs: {report['completed']}/{report['runs']} ok, {report['errors']} failed",
+        f"Concurrency: {report['concurrency']}  arrival rate: {report['arrival_rate'] or 'all at once'}/s",
+        f"Throughput: {report['runs_per_second']} runs/s over {report['wall_seconds']}s",
+        f"Latency (s): p50 {latency['p50']}  p95 {latency['p95']}  p99 {latency['p99']}  max {latency['max']}",
+        f"Event-loop lag (ms): p50 {lag['p50']}  p99 {lag['p99']}  max {lag['max']}",
+        f"RSS (MB): start {rss['start']}  peak {rss['peak']}  end {rss['end']}  "
+        f"(~{rss['growth_per_run_kb']} KB/run)",
+        f"LLM calls: {report['llm']['requests']}  rejected with 429: {report['llm']['rejected_429']}",
+    ])
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Load-test concurrent agent runs against a stand-in LLM.")
+    parser.add_argument("--runs", type=int, default=50, help="Total runs to start")
+    parser.add_argument("--concurrency", type=int, default=10, help="Maximum runs in flight")
+    parser.add_argument("--rate", type=float, default=0.0, help="Arrival rate in runs/s (0: start all at once)")
+    parser.add_argument("--target", choices=["graph", "mcp"], default="graph",
+                        help="Drive run_agent directly or through the MCP server's in-process tool")
+    parser.add_argument("--routing", choices=["full", "auto"], default="full",
+                        help="Always run the full pipeline, or let the classifier route simple requests")
+    parser.add_argument("--ttft", type=float, default=0.3, help="Stand-in time to first token (s)")
+    parser.add_argument("--tps", type=float, default=300.0, help="Stand-in tokens per second per stream")
+    parser.add_argument("--quota-rpm", type=int, default=0, help="Stand-in server quota, requests/minute")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of calls rejected with 429")
+    parser.add_argument("--client-rpm", type=int, default=0, help="Client-side limiter requests/minute")
+    parser.add_argument("--json", help="Also write the report as JSON to this path")
+    args = parser.parse_args(argv)
+
+    register_rate_limiter(RateLimiter(deployment_key(StandInLLM), requests_per_minute=args.client_rpm))
+    server = StandInServer(ttft=args.ttft, tokens_per_second=args.tps, quota_rpm=args.quota_rpm,
+                           error_rate=args.error_rate)
+    report = asyncio.run(run_load(args.runs, args.concurrency, args.rate, args.target, server, routing=args.routing))
+
+    print(format_report(report))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
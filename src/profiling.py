@@ -0,0 +1,183 @@
+"""Per-node CPU and memory profiling for agent runs.
+
+A background thread samples the stack of the thread running the graph every few
+milliseconds and attributes each sample to the graph node that is active at the
+time (or to `(graph)` for LangGraph's own work between nodes). Samples taken
+while the event loop is idle in its selector, waiting on the network (i.e. on
+the model), are counted as idle rather than CPU time. `tracemalloc` records the
+peak traced memory and the largest new allocations of every node.
+"""
+
+import functools
+import json
+import linecache
+import selectors
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter, defaultdict
+from pathlib import Path
+from typing import Dict, List, Optional
+
+GRAPH = "(graph)"
+
+
+@functools.lru_cache(maxsize=None)
+def _code_label(code) -> str:
+    return f"{code.co_name} ({Path(code.co_filename).name}:{code.co_firstlineno})"
+
+
+def _frame_label(frame) -> str:
+    return _code_label(frame.f_code)
+
+
+def _is_idle(frame) -> bool:
+    """Whether the sampled thread is blocked in the event loop's selector poll."""
+    code = frame.f_code
+    return code.co_name == "select" and code.co_filename == selectors.__file__
+
+
+class RunProfiler:
+    """Sampling CPU profiler plus tracemalloc statistics, split by graph node."""
+
+    def __init__(self, interval: float = 0.005, top: int = 15, frames: int = 10):
+        self.interval = interval
+        self.top = top
+        self.frames = frames
+        self.current: str = GRAPH
+        self.samples: Dict[str, int] = Counter()
+        self.idle_samples: Dict[str, int] = Counter()
+        self.self_time: Dict[str, Counter] = defaultdict(Counter)
+        self.cumulative: Dict[str, Counter] = defaultdict(Counter)
+        self.nodes: Dict[str, dict] = defaultdict(lambda: {"calls": 0, "wall_seconds": 0.0, "peak_bytes": 0,
+                                                            "allocations": Counter()})
+        self._thread_id: Optional[int] = None
+        self._sampler: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._started = 0.0
+        self._elapsed = 0.0
+
+    # Lifecycle
+
+    def start(self) -> None:
+        """Start profiling the calling thread (the one that runs the event loop)."""
+        self._thread_id = threading.get_ident()
+        self._started = time.perf_counter()
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+        self._stop.clear()
+        self._sampler = threading.Thread(target=self._sample_loop, name="run-profiler", daemon=True)
+        self._sampler.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._sampler:
+            self._sampler.join()
+        self._elapsed = time.perf_counter() - self._started
+        tracemalloc.stop()
+
+    def _sample_loop(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self._thread_id)
+            if frame is None:
+                continue
+            node = self.current
+            if _is_idle(frame):
+                self.idle_samples[node] += 1
+                continue
+            self.samples[node] += 1
+            self.self_time[node][_frame_label(frame)] += 1
+            seen = set()
+            while frame is not None:
+                label = _frame_label(frame)
+                if label not in seen:
+                    seen.add(label)
+                    self.cumulative[node][label] += 1
+                frame = frame.f_back
+
+    # Node instrumentation
+
+    def wrap(self, name: str, fn):
+        """Wrap an async graph node so its time and allocations are attributed to `name`."""
+
+        @functools.wraps(fn)
+        async def profiled(state):
+            stats = self.nodes[name]
+            tracemalloc.reset_peak()
+            before = tracemalloc.take_snapshot()
+            self.current = name
+            start = time.perf_counter()
+            try:
+                return await fn(state)
+            finally:
+                stats["wall_seconds"] += time.perf_counter() - start
+                self.current = GRAPH
+                stats["calls"] += 1
+                stats["peak_bytes"] = max(stats["peak_bytes"], tracemalloc.get_traced_memory()[1])
+                after = tracemalloc.take_snapshot()
+                for diff in after.compare_to(before, "lineno")[:self.top]:
+                    if diff.size_diff > 0:
+                        frame = diff.traceback[0]
+                        stats["allocations"][(frame.filename, frame.lineno)] += diff.size_diff
+
+        return profiled
+
+    # Reporting
+
+    def report(self) -> dict:
+        seconds_per_sample = self.interval
+        nodes = {}
+        for name in sorted(set(self.nodes) | set(self.samples) | set(self.idle_samples)):
+            stats = self.nodes.get(name, {"calls": 0, "wall_seconds": 0.0, "peak_bytes": 0, "allocations": Counter()})
+            nodes[name] = {
+                "calls": stats["calls"],
+                "wall_seconds": round(stats["wall_seconds"], 3),
+                "cpu_samples": self.samples.get(name, 0),
+                "cpu_seconds_estimate": round(self.samples.get(name, 0) * seconds_per_sample, 3),
+                "idle_samples": self.idle_samples.get(name, 0),
+                "peak_traced_bytes": stats["peak_bytes"],
+                "top_self": self.self_time[name].most_common(self.top),
+                "top_cumulative": self.cumulative[name].most_common(self.top),
+                "top_allocations": [
+                    {"location": f"{filename}:{lineno}", "bytes": size,
+                     "line": linecache.getline(filename, lineno).strip()}
+                    for (filename, lineno), size in stats["allocations"].most_common(self.top)
+                ],
+            }
+        return {
+            "elapsed_seconds": round(self._elapsed, 3),
+            "sample_interval_seconds": self.interval,
+            "nodes": nodes,
+        }
+
+    def format_report(self, report: Optional[dict] = None) -> str:
+        report = report or self.report()
+        lines = [f"Run profile ({report['elapsed_seconds']}s, sampled every {self.interval * 1000:.0f}ms)", ""]
+        for name, node in report["nodes"].items():
+            lines.append(f"== {name}: {node['calls']} call(s), {node['wall_seconds']}s wall, "
+                         f"~{node['cpu_seconds_estimate']}s on-thread, "
+                         f"~{round(node['idle_samples'] * self.interval, 3)}s idle, "
+                         f"peak {node['peak_traced_bytes'] / 1e6:.1f} MB")
+            lines.append("  Hottest functions (self):")
+            lines.extend(f"    {count:6d}  {label}" for label, count in node["top_self"][:10])
+            lines.append("  Hottest functions (cumulative):")
+            lines.extend(f"    {count:6d}  {label}" for label, count in node["top_cumulative"][:10])
+            if node["top_allocations"]:
+                lines.append("  Largest allocations:")
+                lines.extend(f"    {a['bytes'] / 1024:10.1f} KiB  {a['location']}  {a['line']}"
+                             for a in node["top_allocations"][:10])
+            lines.append("")
+        return "\n".join(lines)
+
+    def write_report(self, directory) -> List[Path]:
+        """Write JSON and text reports into `directory`; returns their paths."""
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        report = self.report()
+        json_path = directory / f"profile-{stamp}.json"
+        text_path = directory / f"profile-{stamp}.txt"
+        json_path.write_text(json.dumps(report, indent=2), encoding="utf-8")
+        text_path.write_text(self.format_report(report), encoding="utf-8")
+        return [json_path, text_path]
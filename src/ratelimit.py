@@ -0,0 +1,271 @@
+"""Client-side rate limiting for Azure AI deployments.
+
+Every agent and every concurrent run shares one limiter per deployment, so the
+requests/minute and tokens/minute quotas are spent in a coordinated way instead
+of each caller discovering them through 429 errors.
+"""
+
+import asyncio
+import threading
+import time
+from typing import Dict, Optional
+
+
+class TokenBucket:
+    """Token bucket that supports reservations (the level may go negative).
+
+    A caller that reserves more than is available is told how long to wait
+    for the deficit to refill. Later callers queue up behind that deficit, so
+    admission happens in arrival order.
+    """
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.base_rate = per_minute / 60.0
+        self.rate = self.base_rate
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def refill(self, now: float) -> None:
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self, cost: float, now: float) -> float:
+        """Take `cost` tokens and return the delay before they are really available."""
+        self.refill(now)
+        self.level -= min(cost, self.capacity)
+        return 0.0 if self.level >= 0 else -self.level / self.rate
+
+    def refund(self, amount: float, now: float) -> None:
+        self.refill(now)
+        self.level = min(self.capacity, self.level + amount)
+
+    def drain(self, now: float) -> None:
+        """Drop any remaining headroom, e.g. after the server rejected a call."""
+        self.refill(now)
+        self.level = min(self.level, 0.0)
+
+    def scale(self, factor: float, now: float) -> None:
+        self.refill(now)
+        self.rate = self.base_rate * factor
+
+
+class RateLimiter:
+    """Requests/minute and tokens/minute scheduler for a single deployment.
+
+    Callers reserve capacity with the estimated prompt plus max output tokens,
+    sleep until it is available and then make their call. 429 responses pause
+    admissions for `retry-after` seconds and back the admission rate off
+    multiplicatively; successful calls restore it additively, so sustained
+    throughput settles just under the real quota.
+    """
+
+    def __init__(self, name: str, requests_per_minute: int = 0, tokens_per_minute: int = 0,
+                 backoff: float = 0.7, recovery: float = 0.05, min_scale: float = 0.1):
+        self.name = name
+        self.requests = TokenBucket(requests_per_minute) if requests_per_minute > 0 else None
+        self.tokens = TokenBucket(tokens_per_minute) if tokens_per_minute > 0 else None
+        self.backoff = backoff
+        self.recovery = recovery
+        self.min_scale = min_scale
+        self.scale = 1.0
+        self.blocked_until = 0.0
+        self._lock = threading.Lock()
+
+        # Metrics
+        self.queue_depth = 0
+        self.max_queue_depth = 0
+        self.admitted = 0
+        self.delayed = 0
+        self.rate_limited = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def _buckets(self):
+        return [b for b in (self.requests, self.tokens) if b is not None]
+
+    def _reserve(self, tokens: int) -> float:
+        with self._lock:
+            now = time.monotonic()
+            delay = max(0.0, self.blocked_until - now)
+            if self.requests is not None:
+                delay = max(delay, self.requests.reserve(1, now))
+            if self.tokens is not None:
+                delay = max(delay, self.tokens.reserve(tokens, now))
+            self.admitted += 1
+            if delay > 0:
+                self.delayed += 1
+                self.queue_depth += 1
+                self.max_queue_depth = max(self.max_queue_depth, self.queue_depth)
+            return delay
+
+    def _blocked_for(self) -> float:
+        with self._lock:
+            return max(0.0, self.blocked_until - time.monotonic())
+
+    def _record_wait(self, waited: float) -> None:
+        with self._lock:
+            self.queue_depth -= 1
+            self.total_wait += waited
+            self.max_wait = max(self.max_wait, waited)
+
+    async def acquire(self, tokens: int) -> int:
+        """Wait until `tokens` may be spent on this deployment. Returns the reserved amount."""
+        delay = self._reserve(tokens)
+        if delay > 0:
+            start = time.monotonic()
+            try:
+                while delay > 0:
+                    await asyncio.sleep(delay)
+                    # A 429 may have arrived while we were queued
+                    delay = self._blocked_for()
+            except BaseException:
+                # Cancelled while queued (run cancelled, deadline hit): the call is never made
+                self.release(tokens)
+                raise
+            finally:
+                self._record_wait(time.monotonic() - start)
+        return tokens
+
+    def acquire_sync(self, tokens: int) -> int:
+        """Blocking variant of `acquire` for the synchronous agents."""
+        delay = self._reserve(tokens)
+        if delay > 0:
+            start = time.monotonic()
+            try:
+                while delay > 0:
+                    time.sleep(delay)
+                    delay = self._blocked_for()
+            except BaseException:
+                self.release(tokens)
+                raise
+            finally:
+                self._record_wait(time.monotonic() - start)
+        return tokens
+
+    def settle(self, reserved: int, actual: int) -> None:
+        """Return over-estimated tokens once the real usage of a call is known."""
+        if self.tokens is None or actual >= reserved:
+            return
+        with self._lock:
+            self.tokens.refund(reserved - actual, time.monotonic())
+
+    def release(self, reserved: int) -> None:
+        """Give back a whole reservation whose call was never made."""
+        with self._lock:
+            now = time.monotonic()
+            self.admitted -= 1
+            if self.requests is not None:
+                self.requests.refund(1, now)
+            if self.tokens is not None:
+                self.tokens.refund(min(reserved, self.tokens.capacity), now)
+
+    def on_rate_limited(self, retry_after: Optional[float] = None) -> None:
+        """Feed back a 429 from the server."""
+        with self._lock:
+            now = time.monotonic()
+            self.rate_limited += 1
+            self.scale = max(self.min_scale, self.scale * self.backoff)
+            for bucket in self._buckets():
+                bucket.drain(now)
+                bucket.scale(self.scale, now)
+            self.blocked_until = max(self.blocked_until, now + (retry_after if retry_after is not None else 1.0))
+
+    def on_success(self) -> None:
+        """Feed back a successful call, slowly restoring the admission rate."""
+        if self.scale >= 1.0:
+            return
+        with self._lock:
+            now = time.monotonic()
+            self.scale = min(1.0, self.scale + self.recovery)
+            for bucket in self._buckets():
+                bucket.scale(self.scale, now)
+
+    def snapshot(self) -> Dict[str, float]:
+        """Current queue and wait metrics."""
+        with self._lock:
+            return {
+                "name": self.name,
+                "queue_depth": self.queue_depth,
+                "max_queue_depth": self.max_queue_depth,
+                "admitted": self.admitted,
+                "delayed": self.delayed,
+                "rate_limited": self.rate_limited,
+                "total_wait_seconds": round(self.total_wait, 3),
+                "max_wait_seconds": round(self.max_wait, 3),
+                "avg_wait_seconds": round(self.total_wait / self.delayed, 3) if self.delayed else 0.0,
+                "scale": round(self.scale, 3),
+            }
+
+
+_limiters: Dict[str, RateLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def deployment_key(llm) -> str:
+    """Identify the deployment an LLM instance talks to."""
+    endpoint = getattr(llm, "endpoint", "") or ""
+    model = getattr(llm, "model_name", None) or getattr(llm, "model", None) or "default"
+    return f"{endpoint}|{model}"
+
+
+def get_rate_limiter(llm_or_key) -> RateLimiter:
+    """Return the process-wide limiter for a deployment (created on first use)."""
+    key = llm_or_key if isinstance(llm_or_key, str) else deployment_key(llm_or_key)
+    with _limiters_lock:
+        limiter = _limiters.get(key)
+        if limiter is None:
+            from .config import config
+            limiter = RateLimiter(
+                key,
+                requests_per_minute=config.azure_ai_requests_per_minute,
+                tokens_per_minute=config.azure_ai_tokens_per_minute,
+            )
+            _limiters[key] = limiter
+        return limiter
+
+
+def register_rate_limiter(limiter: RateLimiter) -> RateLimiter:
+    """Install a limiter with explicit quotas under its name, replacing any existing one."""
+    with _limiters_lock:
+        _limiters[limiter.name] = limiter
+    return limiter
+
+
+def rate_limit_metrics() -> Dict[str, Dict[str, float]]:
+    """Metrics for every deployment seen so far."""
+    with _limiters_lock:
+        limiters = list(_limiters.values())
+    return {limiter.name: limiter.snapshot() for limiter in limiters}
+
+
+def estimate_tokens(messages, max_output_tokens: int = 0) -> int:
+    """Rough prompt size (~4 characters per token) plus the output allowance."""
+    chars = sum(len(str(getattr(m, "content", m))) for m in messages)
+    return chars // 4 + max_output_tokens
+
+
+def is_rate_limit_error(exc: BaseException) -> bool:
+    """Whether an exception from the Azure client is a 429."""
+    status = getattr(exc, "status_code", None)
+    if status is None:
+        status = getattr(getattr(exc, "response", None), "status_code", None)
+    if status is not None:
+        return status == 429
+    message = str(exc).lower()
+    return "429" in message and "rate" in message
+
+
+def retry_after_seconds(exc: BaseException) -> Optional[float]:
+    """Extract the `retry-after` hint from a 429 error, if the server sent one."""
+    headers = getattr(getattr(exc, "response", None), "headers", None) or {}
+    for name in ("retry-after-ms", "x-ms-retry-after-ms", "retry-after"):
+        value = headers.get(name)
+        if value is None:
+            continue
+        try:
+            seconds = float(value)
+        except (TypeError, ValueError):
+            continue
+        return seconds / 1000.0 if name.endswith("-ms") else seconds
+    return None
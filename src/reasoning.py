@@ -0,0 +1,264 @@
+"""Bounded handling of reasoning (`<think>`) traces.
+
+DeepSeek-R1 streams tens of thousands of thinking tokens per call ahead of
+its answer. The thinking is only ever shown, never used, so instead of
+keeping whole responses in memory every call splits its stream as it
+arrives (`ThinkingSplitter`): the answer text is kept and returned, the
+thinking goes to the run's `ReasoningTrace`. That appends it to one gzip file
+per run under `OPEN_SWE_TRACE_DIR` (default `~/.cache/open-swe/traces`; empty
+keeps no file) and holds only its last `OPEN_SWE_TRACE_TAIL_CHARS` in memory
+for display, so a run's memory does not grow with the length of its traces.
+The file is written in 64 KiB batches on a background thread, so thinking
+chunks never wait for gzip or the disk on the event loop. Traces older than
+`OPEN_SWE_TRACE_MAX_AGE_DAYS` (default 7), and the oldest beyond
+`OPEN_SWE_TRACE_MAX_MB` in total (default 256), are pruned as runs start.
+
+A run binds its trace to its task (see `bind`); calls outside a run get one
+that keeps no file.
+"""
+
+import contextvars
+import gzip
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+OPEN_TAG, CLOSE_TAG = "<think>", "</think>"
+
+FLUSH_CHARS = 1 << 16
+TRACE_SUFFIX = ".thinking.txt.gz"
+PRUNE_INTERVAL = 600.0  # seconds between prunes of a directory by one process
+
+_writer: Optional[ThreadPoolExecutor] = None
+_writer_lock = threading.Lock()
+
+
+def _writer_pool() -> ThreadPoolExecutor:
+    """The one thread writing every trace file; a single worker keeps each file's writes in order."""
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            _writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="open-swe-trace")
+        return _writer
+
+
+def _partial_tag(text: str, tag: str) -> int:
+    """Length of the longest suffix of `text` that is the start of `tag`."""
+    for size in range(min(len(tag) - 1, len(text)), 0, -1):
+        if text.endswith(tag[:size]):
+            return size
+    return 0
+
+
+class ThinkingSplitter:
+    """Splits a streamed response into its thinking and answer text, chunk by chunk.
+
+    Tags split across chunks are recognised: text that may be the start of
+    one is held back until the next chunk (or `flush`).
+    """
+
+    def __init__(self):
+        self.in_thinking = False
+        self.saw_thinking = False
+        self.chars = 0  # everything fed, tags included
+        self._pending = ""
+
+    def feed(self, content: str) -> Tuple[str, str]:
+        """The thinking and answer text completed by `content`."""
+        self.chars += len(content)
+        text, self._pending = self._pending + content, ""
+        parts: Tuple[List[str], List[str]] = ([], [])
+        while text:
+            tag = CLOSE_TAG if self.in_thinking else OPEN_TAG
+            end = text.find(tag)
+            if end < 0:
+                held = _partial_tag(text, tag)
+                parts[not self.in_thinking].append(text[:len(text) - held])
+                self._pending = text[len(text) - held:]
+                break
+            parts[not self.in_thinking].append(text[:end])
+            text = text[end + len(tag):]
+            self.in_thinking = not self.in_thinking
+            self.saw_thinking = True
+        return "".join(parts[0]), "".join(parts[1])
+
+    def flush(self) -> Tuple[str, str]:
+        """The text held back at the end of the stream."""
+        pending, self._pending = self._pending, ""
+        return (pending, "") if self.in_thinking else ("", pending)
+
+
+class ThinkingPreview:
+    """The first `max_lines` complete lines of a call's thinking, for live display.
+
+    Only the line being streamed is held, cut at `max_line_chars`.
+    """
+
+    def __init__(self, max_lines: int = 10, max_line_chars: int = 500):
+        self.max_lines = max_lines
+        self.max_line_chars = max_line_chars
+        self.shown = 0
+        self.done = False
+        self._line = ""
+
+    def feed(self, text: str) -> List[str]:
+        """The lines to print now; "... (truncated)" once more lines follow `max_lines`."""
+        if self.done:
+            return []
+        *complete, partial = (self._line + text).split("\n")
+        self._line = partial[:self.max_line_chars]
+        lines = []
+        for line in complete:
+            if self.shown == self.max_lines:
+                lines.append("... (truncated)")
+                self.done = True
+                break
+            self.shown += 1
+            if line.strip():
+                lines.append(line.strip())
+        return lines
+
+
+class ReasoningTrace:
+    """The thinking text of one run: spilled to a gzip file, with a bounded tail in memory."""
+
+    def __init__(self, path: Optional[str] = None, tail_chars: int = 4000):
+        self.path = path
+        self.tail_chars = tail_chars
+        self.chars = 0
+        self._tail = ""
+        self._file = None  # only touched by the writer thread
+        self._section: Optional[str] = None
+        self._buffer: List[str] = []
+        self._buffered = 0
+
+    def begin(self, agent: str) -> None:
+        """Start the thinking of a new call of `agent`."""
+        self._section = agent
+
+    def write(self, text: str) -> None:
+        if not text:
+            return
+        self.chars += len(text)
+        self._tail = (self._tail + text)[-self.tail_chars:]
+        if not self.path:
+            return
+        if self._section is not None:
+            self._buffer.append(f"\n=== {self._section} ===\n")
+            self._section = None
+        self._buffer.append(text)
+        self._buffered += len(text)
+        if self._buffered >= FLUSH_CHARS:
+            self._flush()
+
+    def _flush(self) -> Future:
+        text, self._buffer, self._buffered = "".join(self._buffer), [], 0
+        return _writer_pool().submit(self._append, text)
+
+    def _append(self, text: str) -> None:
+        if not self.path:
+            return
+        try:
+            if self._file is None:
+                directory = os.path.dirname(self.path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                self._file = gzip.open(self.path, "at", encoding="utf-8")
+            if text:
+                self._file.write(text)
+        except OSError as e:
+            # The trace is a debugging aid; the run goes on without it
+            print(f"Could not write the reasoning trace {self.path}: {e}")
+            self.path = None
+
+    @property
+    def tail(self) -> str:
+        """The last `tail_chars` of thinking, across the run's calls."""
+        return self._tail
+
+    def close(self, wait: bool = True) -> None:
+        """Write what is buffered and close the file; `wait=False` leaves that to the writer thread."""
+        if not self.path:
+            return
+        if self._buffer:
+            self._flush()
+        done = _writer_pool().submit(self._close_file)
+        if wait:
+            done.result()
+
+    def _close_file(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def prune_traces(directory: str, max_age: float = 0.0, max_bytes: int = 0) -> Dict[str, int]:
+    """Remove traces older than `max_age` seconds, then the oldest until at most `max_bytes` remain (0: no limit)."""
+    traces = []
+    try:
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if entry.name.endswith(TRACE_SUFFIX):
+                    try:
+                        info = entry.stat()
+                    except OSError:
+                        continue
+                    traces.append((info.st_mtime, info.st_size, entry.path))
+    except OSError:
+        return {"removed": 0, "bytes_freed": 0, "kept": 0}
+
+    traces.sort()  # oldest first
+    total = sum(size for _, size, _ in traces)
+    cutoff = time.time() - max_age if max_age else None
+    removed = freed = 0
+    for mtime, size, path in traces:
+        if not ((cutoff is not None and mtime < cutoff) or (max_bytes and total > max_bytes)):
+            break
+        try:
+            os.unlink(path)
+        except OSError:
+            continue
+        removed += 1
+        freed += size
+        total -= size
+    return {"removed": removed, "bytes_freed": freed, "kept": len(traces) - removed}
+
+
+_last_prune: Dict[str, float] = {}
+
+
+def trace_for_run(run_id: str) -> ReasoningTrace:
+    """A new trace for the run `run_id`, spilling to `OPEN_SWE_TRACE_DIR` if set."""
+    from .config import config
+    path = None
+    if config.trace_dir:
+        directory = os.path.expanduser(config.trace_dir)
+        path = os.path.join(directory, f"{run_id}{TRACE_SUFFIX}")
+        now = time.monotonic()
+        with _writer_lock:
+            due = now - _last_prune.get(directory, -PRUNE_INTERVAL) >= PRUNE_INTERVAL
+            if due:
+                _last_prune[directory] = now
+        if due:
+            _writer_pool().submit(prune_traces, directory, config.trace_max_age_days * 86400,
+                                  int(config.trace_max_mb * 1024 * 1024))
+    return ReasoningTrace(path, config.trace_tail_chars)
+
+
+_current_trace: contextvars.ContextVar[Optional[ReasoningTrace]] = contextvars.ContextVar(
+    "open_swe_reasoning_trace", default=None)
+
+
+def bind(trace: Optional[ReasoningTrace]) -> contextvars.Token:
+    """Send the thinking of this task and the tasks it starts to `trace`."""
+    return _current_trace.set(trace)
+
+
+def unbind(token: contextvars.Token) -> None:
+    _current_trace.reset(token)
+
+
+def current_trace() -> Optional[ReasoningTrace]:
+    return _current_trace.get()
@@ -0,0 +1,349 @@
+"""Offline index of an existing repository, used to give the agents code context.
+
+The index holds, per file, a one-line summary, the imports and (for Python) an
+AST-based symbol table. It is cached on disk and updated incrementally: files
+whose mtime and size are unchanged are skipped, and files that were touched but
+have the same content hash are not re-parsed. Retrieval ranks files against a
+query and renders the best ones, as full source or as a symbol outline, within
+a token budget.
+"""
+
+import ast
+import hashlib
+import json
+import os
+import re
+import sys
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List, Optional, Set
+
+INDEX_VERSION = 1
+
+SKIP_DIRS = {
+    ".git", ".hg", ".svn", ".venv", "venv", "env", "node_modules", "__pycache__", ".mypy_cache",
+    ".pytest_cache", ".ruff_cache", ".tox", ".nox", "build", "dist", ".idea", ".vscode", "agentic_code",
+}
+TEXT_SUFFIXES = {
+    ".py", ".pyi", ".md", ".rst", ".txt", ".toml", ".cfg", ".ini", ".yaml", ".yml", ".json",
+    ".js", ".jsx", ".ts", ".tsx", ".html", ".css", ".sh", ".sql",
+}
+MAX_FILE_BYTES = 512 * 1024
+PARALLEL_THRESHOLD = 200
+
+STOPWORDS = {
+    "the", "and", "for", "with", "that", "this", "from", "into", "create", "make", "add", "use", "using",
+    "python", "file", "files", "code", "function", "should", "can", "you", "please", "new", "want",
+}
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // 4
+
+
+def terms(text: str) -> Set[str]:
+    """Lowercased search terms, splitting snake_case, CamelCase and paths."""
+    text = re.sub(r"([a-z0-9])([A-Z])", r"\1 \2", text)
+    return {t for t in re.split(r"[^A-Za-z0-9]+", text.lower()) if len(t) > 2 and t not in STOPWORDS}
+
+
+def _first_line(text: Optional[str]) -> str:
+    for line in (text or "").splitlines():
+        line = line.strip().lstrip("#").strip()
+        if line:
+            return line[:160]
+    return ""
+
+
+def _module_name(relpath: str) -> str:
+    parts = Path(relpath).with_suffix("").parts
+    if parts and parts[-1] == "__init__":
+        parts = parts[:-1]
+    return ".".join(parts)
+
+
+def _python_info(relpath: str, source: str) -> dict:
+    try:
+        tree = ast.parse(source, filename=relpath)
+    except (SyntaxError, ValueError):
+        return {"summary": _first_line(source), "symbols": [], "imports": []}
+
+    package = _module_name(relpath).split(".")
+    if not relpath.endswith("__init__.py"):
+        package = package[:-1]
+
+    imports = []
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            imports.extend(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom):
+            if node.level:
+                base = package[:len(package) - node.level + 1] if node.level > 1 else package
+                module = ".".join(base + ([node.module] if node.module else []))
+            else:
+                module = node.module or ""
+            imports.append(module)
+            imports.extend(f"{module}.{alias.name}" for alias in node.names if alias.name != "*")
+
+    symbols = []
+
+    def add(node, prefix=""):
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            kind = "async def" if isinstance(node, ast.AsyncFunctionDef) else "def"
+            signature = f"{prefix}{node.name}({ast.unparse(node.args)})"
+        elif isinstance(node, ast.ClassDef):
+            kind = "class"
+            bases = ", ".join(ast.unparse(b) for b in node.bases)
+            signature = f"{node.name}({bases})" if bases else node.name
+        else:
+            return
+        symbols.append({
+            "name": f"{prefix}{node.name}",
+            "kind": kind,
+            "line": node.lineno,
+            "signature": signature,
+            "doc": _first_line(ast.get_docstring(node)),
+        })
+        if isinstance(node, ast.ClassDef):
+            for child in node.body:
+                add(child, prefix=f"{node.name}.")
+
+    for node in tree.body:
+        add(node)
+
+    return {"summary": _first_line(ast.get_docstring(tree)), "symbols": symbols, "imports": sorted(set(imports))}
+
+
+def index_file(root: str, relpath: str, known_sha1: Optional[str] = None) -> Optional[dict]:
+    """Read, hash and parse one file. Runs in worker processes for large updates.
+
+    If the content hash equals `known_sha1` only the stat fields are returned and
+    the caller keeps its previously parsed entry.
+    """
+    path = os.path.join(root, relpath)
+    try:
+        stat = os.stat(path)
+        with open(path, "rb") as f:
+            data = f.read()
+    except OSError:
+        return None
+    entry = {
+        "mtime": stat.st_mtime_ns,
+        "size": stat.st_size,
+        "sha1": hashlib.sha1(data).hexdigest(),
+        "tokens": len(data) // 4,
+    }
+    if entry["sha1"] == known_sha1:
+        return entry
+    source = data.decode("utf-8", errors="replace")
+    if relpath.endswith((".py", ".pyi")):
+        entry.update(_python_info(relpath, source))
+    else:
+        entry.update({"summary": _first_line(source), "symbols": [], "imports": []})
+    return entry
+
+
+def _index_batch(root: str, batch: List[tuple]) -> Dict[str, Optional[dict]]:
+    return {relpath: index_file(root, relpath, known_sha1) for relpath, known_sha1 in batch}
+
+
+class RepoIndex:
+    """Symbol tables, summaries and the import graph of one repository."""
+
+    def __init__(self, root, cache_dir: Optional[str] = None):
+        self.root = Path(root).resolve()
+        cache_dir = Path(cache_dir or Path.home() / ".cache" / "open-swe" / "index")
+        key = hashlib.sha1(str(self.root).encode()).hexdigest()[:16]
+        self.cache_path = cache_dir / f"{self.root.name}-{key}.json"
+        self.files: Dict[str, dict] = {}
+        self._terms: Dict[str, tuple] = {}
+        self._modules: Dict[str, str] = {}
+        # Concurrent runs share one index per root (see `get_repo_index`)
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self) -> None:
+        try:
+            data = json.loads(self.cache_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return
+        if data.get("version") == INDEX_VERSION and data.get("root") == str(self.root):
+            self.files = data["files"]
+
+    def _save(self) -> None:
+        self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.cache_path.with_suffix(".tmp")
+        tmp.write_text(json.dumps({"version": INDEX_VERSION, "root": str(self.root), "files": self.files},
+                                  separators=(",", ":")), encoding="utf-8")
+        os.replace(tmp, self.cache_path)
+
+    def _walk(self) -> Dict[str, os.stat_result]:
+        found = {}
+        stack = [str(self.root)]
+        while stack:
+            directory = stack.pop()
+            try:
+                entries = list(os.scandir(directory))
+            except OSError:
+                continue
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    if entry.name not in SKIP_DIRS and not entry.name.startswith("."):
+                        stack.append(entry.path)
+                elif entry.is_file(follow_symlinks=False) and os.path.splitext(entry.name)[1] in TEXT_SUFFIXES:
+                    try:
+                        stat = entry.stat(follow_symlinks=False)
+                    except OSError:
+                        continue  # removed since the scan
+                    if stat.st_size <= MAX_FILE_BYTES:
+                        found[os.path.relpath(entry.path, self.root).replace(os.sep, "/")] = stat
+        return found
+
+    def update(self) -> Dict[str, int]:
+        """Bring the index up to date with the working tree and persist it."""
+        found = self._walk()
+        removed = [p for p in self.files if p not in found]
+        for relpath in removed:
+            del self.files[relpath]
+
+        stale = [
+            relpath for relpath, stat in found.items()
+            if (old := self.files.get(relpath)) is None
+            or old["mtime"] != stat.st_mtime_ns or old["size"] != stat.st_size
+        ]
+
+        stale = [(relpath, self.files[relpath]["sha1"] if relpath in self.files else None) for relpath in stale]
+        if len(stale) >= PARALLEL_THRESHOLD:
+            batches = [stale[i:i + 64] for i in range(0, len(stale), 64)]
+            with ProcessPoolExecutor() as pool:
+                results = {}
+                for batch in pool.map(_index_batch, [str(self.root)] * len(batches), batches):
+                    results.update(batch)
+        else:
+            results = _index_batch(str(self.root), stale)
+
+        changed = 0
+        for relpath, entry in results.items():
+            if entry is None:
+                self.files.pop(relpath, None)
+                continue
+            old = self.files.get(relpath)
+            if old is not None and old["sha1"] == entry["sha1"]:
+                old.update(entry)
+                continue
+            changed += 1
+            self.files[relpath] = entry
+
+        self._terms.clear()
+        self._modules.clear()
+        if stale or removed:
+            self._save()
+        return {"files": len(self.files), "changed": changed, "touched": len(stale), "removed": len(removed)}
+
+    def _file_terms(self, relpath: str) -> tuple:
+        """(all terms, path terms, symbol name terms) of a file, cached until the next update."""
+        cached = self._terms.get(relpath)
+        if cached is None:
+            entry = self.files[relpath]
+            path_terms = terms(relpath)
+            symbol_terms, doc_terms = set(), terms(entry["summary"])
+            for symbol in entry["symbols"]:
+                symbol_terms |= terms(symbol["name"])
+                doc_terms |= terms(symbol["doc"])
+            cached = (path_terms | symbol_terms | doc_terms, path_terms, symbol_terms)
+            self._terms[relpath] = cached
+        return cached
+
+    def imports_of(self, relpath: str) -> List[str]:
+        """Files in this repository that `relpath` imports."""
+        if not self._modules:
+            self._modules = {_module_name(p): p for p in self.files if p.endswith(".py")}
+        return sorted({self._modules[m] for m in self.files[relpath]["imports"] if m in self._modules} - {relpath})
+
+    def rank(self, query: str) -> List[tuple]:
+        """Files ordered by relevance to `query`, as (score, relpath)."""
+        wanted = terms(query)
+        if not wanted:
+            return []
+        scores: Dict[str, float] = {}
+        for relpath in self.files:
+            all_terms, path_terms, symbol_terms = self._file_terms(relpath)
+            hits = wanted & all_terms
+            if hits:
+                scores[relpath] = sum(3.0 if t in path_terms else 2.0 if t in symbol_terms else 1.0 for t in hits)
+
+        # Files imported by strong matches are likely needed too
+        for relpath, score in sorted(scores.items(), key=lambda x: -x[1])[:20]:
+            if relpath.endswith(".py"):
+                for dependency in self.imports_of(relpath):
+                    scores[dependency] = scores.get(dependency, 0.0) + 0.3 * score
+
+        return sorted(((s, p) for p, s in scores.items()), key=lambda x: (-x[0], x[1]))
+
+    def outline(self, relpath: str) -> str:
+        entry = self.files[relpath]
+        lines = [f"### {relpath}" + (f" - {entry['summary']}" if entry["summary"] else "")]
+        for symbol in entry["symbols"]:
+            doc = f"  # {symbol['doc']}" if symbol["doc"] else ""
+            lines.append(f"    {symbol['kind']} {symbol['signature']}  (line {symbol['line']}){doc}")
+        return "\n".join(lines)
+
+    def retrieve(self, query: str, token_budget: int = 6000, max_full_files: int = 3) -> str:
+        """Render the files and symbols most relevant to `query` within `token_budget`."""
+        remaining = token_budget
+        sections = []
+        full_files = 0
+        for _, relpath in self.rank(query):
+            entry = self.files[relpath]
+            if full_files < max_full_files and entry["tokens"] + 20 <= remaining:
+                try:
+                    source = (self.root / relpath).read_text(encoding="utf-8", errors="replace")
+                except OSError:
+                    continue
+                section = f"### {relpath}\n```\n{source}\n```"
+                full_files += 1
+            else:
+                section = self.outline(relpath)
+            cost = estimate_tokens(section)
+            if cost > remaining:
+                if remaining < 50:
+                    break
+                continue
+            sections.append(section)
+            remaining -= cost
+        return "\n\n".join(sections)
+
+    def context(self, query: str, token_budget: int = 6000) -> str:
+        """`update`, then `retrieve`, without another thread changing the index in between."""
+        with self._lock:
+            self.update()
+            return self.retrieve(query, token_budget)
+
+
+@lru_cache(maxsize=8)
+def get_repo_index(root: str) -> RepoIndex:
+    """Process-wide index per repository root."""
+    from .config import config
+    return RepoIndex(root, cache_dir=config.repo_index_dir or None)
+
+
+def repo_context(root: str, query: str, token_budget: int) -> str:
+    """Update the index for `root` and return the context relevant to `query`."""
+    return get_repo_index(str(Path(root).resolve())).context(query, token_budget)
+
+
+if __name__ == "__main__":
+    import time
+
+    if len(sys.argv) < 2:
+        print("Usage: python -m src.repo_index <repo path> [query]")
+        sys.exit(1)
+
+    start = time.perf_counter()
+    index = RepoIndex(sys.argv[1])
+    stats = index.update()
+    print(f"Indexed {stats} in {time.perf_counter() - start:.2f}s -> {index.cache_path}")
+    if len(sys.argv) > 2:
+        print(index.retrieve(" ".join(sys.argv[2:])))
@@ -0,0 +1,250 @@
+"""Local generation of boilerplate project files.
+
+The programmer agent is told not to write files that follow from the code
+itself. After it answers, `scaffold_files` fills them in from the generated
+code and the plan, using the templates of the project's ecosystem:
+
+- Python: `requirements.txt` (third-party imports mapped to their PyPI
+  names), `__init__.py` for package directories, `.gitignore`, `README.md`.
+- Node: `package.json` (dependencies from `require`/`import`), `.gitignore`,
+  `README.md`.
+
+Files the model wrote anyway are never replaced. `estimate_tokens_saved`
+returns how many output tokens the model would have spent on the generated
+files.
+"""
+
+import ast
+import json
+import posixpath
+import re
+import sys
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+# Told to the programmer agent instead of asking for requirements.txt
+SKIP_INSTRUCTION = ("Do NOT write requirements.txt, package.json, .gitignore, README.md or empty __init__.py files; "
+                    "they are generated automatically from your code.")
+
+# Import names whose PyPI distribution is named differently
+PYPI_NAMES = {
+    "PIL": "Pillow",
+    "bs4": "beautifulsoup4",
+    "cv2": "opencv-python",
+    "dateutil": "python-dateutil",
+    "dotenv": "python-dotenv",
+    "google.generativeai": "google-generativeai",
+    "jwt": "PyJWT",
+    "magic": "python-magic",
+    "serial": "pyserial",
+    "skimage": "scikit-image",
+    "sklearn": "scikit-learn",
+    "telegram": "python-telegram-bot",
+    "yaml": "PyYAML",
+    "docx": "python-docx",
+    "attr": "attrs",
+    "Crypto": "pycryptodome",
+    "OpenSSL": "pyOpenSSL",
+    "win32api": "pywin32",
+    "flask_sqlalchemy": "Flask-SQLAlchemy",
+    "flask_cors": "Flask-Cors",
+    "flask_login": "Flask-Login",
+    "flask_wtf": "Flask-WTF",
+    "multipart": "python-multipart",
+}
+
+NODE_BUILTINS = {
+    "assert", "async_hooks", "buffer", "child_process", "cluster", "console", "crypto", "dgram", "dns", "events",
+    "fs", "http", "http2", "https", "module", "net", "os", "path", "perf_hooks", "process", "querystring",
+    "readline", "repl", "stream", "string_decoder", "timers", "tls", "tty", "url", "util", "v8", "vm",
+    "worker_threads", "zlib",
+}
+
+COMMON_GITIGNORE = [".DS_Store", ".env", ".vscode/", ".idea/"]
+
+
+@dataclass(frozen=True)
+class Ecosystem:
+    """Templates and conventions of one language ecosystem."""
+
+    name: str
+    extensions: Tuple[str, ...]
+    entry_points: Tuple[str, ...]
+    gitignore: Tuple[str, ...]
+    install: str
+    run: Callable[[str], str]
+    manifests: Callable[[Dict[str, str], str], Dict[str, str]]
+
+
+def _is_package_dir(directory: str, files: Dict[str, str]) -> bool:
+    if directory in ("", ".") or directory.split("/")[0] in ("tests", "test", "scripts", "static", "templates"):
+        return False
+    return any(posixpath.dirname(path) == directory for path in files if path.endswith(".py"))
+
+
+def python_imports(source: str) -> Set[str]:
+    """Top-level names of the absolute imports in Python `source`."""
+    names = set()
+    try:
+        tree = ast.parse(source)
+    except SyntaxError:
+        # Still useful for a file the model left slightly broken
+        return set(re.findall(r"^\s*(?:from|import)\s+([A-Za-z_]\w*)", source, re.MULTILINE))
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            names.update(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            names.add(node.module)
+    return names
+
+
+def _local_modules(files: Iterable[str]) -> Set[str]:
+    local = set()
+    for path in files:
+        parts = path.split("/")
+        local.update(parts[:-1])
+        if parts[-1].endswith(".py"):
+            local.add(parts[-1][:-3])
+    return local
+
+
+def python_requirements(files: Dict[str, str]) -> List[str]:
+    """PyPI distributions for the third-party imports of the Python files."""
+    local = _local_modules(files)
+    requirements = set()
+    for path, source in files.items():
+        if not path.endswith(".py"):
+            continue
+        for name in python_imports(source):
+            top = name.split(".")[0]
+            if top in sys.stdlib_module_names or top in local or top == "__future__":
+                continue
+            requirements.add(PYPI_NAMES.get(name) or PYPI_NAMES.get(top) or top.replace("_", "-"))
+    return sorted(requirements, key=str.lower)
+
+
+def _python_manifests(files: Dict[str, str], project_name: str) -> Dict[str, str]:
+    manifests = {}
+    requirements = python_requirements(files)
+    if requirements:
+        manifests["requirements.txt"] = "\n".join(requirements) + "\n"
+    for directory in sorted({posixpath.dirname(path) for path in files}):
+        if _is_package_dir(directory, files):
+            manifests[f"{directory}/__init__.py"] = ""
+    return manifests
+
+
+_NODE_IMPORT = re.compile(r"""(?:require\(\s*|import\s*\(\s*|\bfrom\s+|^\s*import\s+)['"]([^'"]+)['"]""", re.MULTILINE)
+
+
+def node_dependencies(files: Dict[str, str]) -> List[str]:
+    """npm packages required or imported by the JavaScript/TypeScript files."""
+    packages = set()
+    for path, source in files.items():
+        if not path.endswith(NODE.extensions):
+            continue
+        for spec in _NODE_IMPORT.findall(source):
+            if spec.startswith((".", "/", "node:")):
+                continue
+            parts = spec.split("/")
+            package = "/".join(parts[:2]) if spec.startswith("@") else parts[0]
+            if package not in NODE_BUILTINS:
+                packages.add(package)
+    return sorted(packages)
+
+
+def _node_manifests(files: Dict[str, str], project_name: str) -> Dict[str, str]:
+    entry = entry_point(files, NODE) or "index.js"
+    typescript = any(path.endswith((".ts", ".tsx")) for path in files)
+    package = {
+        "name": re.sub(r"[^a-z0-9._-]+", "-", project_name.lower()).strip("-") or "project",
+        "version": "1.0.0",
+        "private": True,
+        "main": entry,
+        "scripts": {"start": NODE.run(entry)},
+        "dependencies": {name: "latest" for name in node_dependencies(files)},
+    }
+    if typescript:
+        package["devDependencies"] = {"typescript": "latest", "ts-node": "latest"}
+    return {"package.json": json.dumps(package, indent=2) + "\n"}
+
+
+PYTHON = Ecosystem(
+    name="python",
+    extensions=(".py",),
+    entry_points=("main.py", "app.py", "run.py", "manage.py", "__main__.py", "cli.py"),
+    gitignore=("__pycache__/", "*.py[cod]", ".venv/", "venv/", "*.egg-info/", "build/", "dist/", ".pytest_cache/"),
+    install="pip install -r requirements.txt",
+    run=lambda entry: f"python {entry}",
+    manifests=_python_manifests,
+)
+
+NODE = Ecosystem(
+    name="node",
+    extensions=(".js", ".mjs", ".cjs", ".jsx", ".ts", ".tsx"),
+    entry_points=("index.js", "main.js", "app.js", "server.js", "index.ts", "main.ts", "app.ts", "server.ts"),
+    gitignore=("node_modules/", "npm-debug.log*", "dist/", "build/"),
+    install="npm install",
+    run=lambda entry: f"{'ts-node' if entry.endswith('.ts') else 'node'} {entry}",
+    manifests=_node_manifests,
+)
+
+ECOSYSTEMS = (PYTHON, NODE)
+
+
+def detect_ecosystem(files: Iterable[str]) -> Optional[Ecosystem]:
+    """The first ecosystem (Python before Node, e.g. Flask with static JS) any file belongs to."""
+    paths = list(files)
+    for ecosystem in ECOSYSTEMS:
+        if any(path.endswith(ecosystem.extensions) for path in paths):
+            return ecosystem
+    return None
+
+
+def entry_point(files: Iterable[str], ecosystem: Ecosystem) -> Optional[str]:
+    paths = list(files)
+    for name in ecosystem.entry_points:
+        if name in paths:
+            return name
+    root_sources = [path for path in paths if "/" not in path and path.endswith(ecosystem.extensions)]
+    return root_sources[0] if len(root_sources) == 1 else None
+
+
+def _summary(plan: str) -> str:
+    """The first prose paragraph of the plan."""
+    for paragraph in re.split(r"\n\s*\n", plan or ""):
+        text = paragraph.strip()
+        if text and not text.startswith(("#", "```", "-", "*", "|")) and not re.match(r"\d+\.", text):
+            return text if len(text) <= 400 else text[:397].rstrip() + "..."
+    return ""
+
+
+def readme(project_name: str, files: Iterable[str], plan: str, ecosystem: Optional[Ecosystem]) -> str:
+    paths = sorted(files)
+    title = re.sub(r"[_-]+", " ", project_name).strip().title() or "Project"
+    lines = [f"# {title}", ""]
+    summary = _summary(plan)
+    if summary:
+        lines += [summary, ""]
+    if ecosystem:
+        lines += ["## Setup", "", "```bash", ecosystem.install, "```", ""]
+        entry = entry_point(paths, ecosystem)
+        if entry:
+            lines += ["## Usage", "", "```bash", ecosystem.run(entry), "```", ""]
+    lines += ["## Files", ""] + [f"- `{path}`" for path in paths]
+    return "\n".join(lines) + "\n"
+
+
+def scaffold_files(files: Dict[str, str], plan: str = "", project_name: str = "project") -> Dict[str, str]:
+    """Boilerplate files (path relative to the project folder -> content) that `files` lacks."""
+    ecosystem = detect_ecosystem(files)
+    generated = ecosystem.manifests(files, project_name) if ecosystem else {}
+    ignore = list(ecosystem.gitignore if ecosystem else ()) + COMMON_GITIGNORE
+    generated[".gitignore"] = "\n".join(ignore) + "\n"
+    generated["README.md"] = readme(project_name, list(files) + list(generated), plan, ecosystem)
+    return {path: content for path, content in generated.items() if path not in files}
+
+
+def estimate_tokens_saved(scaffold: Dict[str, str]) -> int:
+    """Output tokens the model would have spent on these files in its JSON answer (~4 chars/token)."""
+    return sum(len(json.dumps({"file_path": path, "file_content": content})) for path, content in scaffold.items()) // 4
@@ -0,0 +1,124 @@
+"""Concurrent, isolated agent runs for long-lived servers such as the MCP server.
+
+Each run gets its own session with its own state and asyncio task. At most
+`max_concurrent` sessions run at once; the rest wait in arrival order. When the
+caller of a session is cancelled (e.g. the MCP client cancels its request), the
+session's task is cancelled too, which closes its in-flight LLM stream and rolls
+back partially written files.
+"""
+
+import asyncio
+import itertools
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+QUEUED = "queued"
+RUNNING = "running"
+COMPLETE = "complete"
+CANCELLED = "cancelled"
+ERROR = "error"
+
+
+@dataclass
+class Session:
+    """One agent run and its lifecycle."""
+
+    id: str
+    request: str
+    status: str = QUEUED
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    result: Optional[Any] = None
+    error: Optional[str] = None
+    task: Optional[asyncio.Task] = field(default=None, repr=False)
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "session_id": self.id,
+            "status": self.status,
+            "queued_seconds": round((self.started_at or time.time()) - self.created_at, 3),
+            "run_seconds": round((self.finished_at or time.time()) - self.started_at, 3) if self.started_at else 0.0,
+            "error": self.error,
+        }
+
+
+class SessionManager:
+    """Runs agent sessions concurrently with a bound on simultaneous runs."""
+
+    def __init__(self, runner: Callable[..., Awaitable[Any]], max_concurrent: int = 4,
+                 cancel_timeout: float = 5.0, keep_finished: int = 100):
+        self.runner = runner
+        self.max_concurrent = max_concurrent
+        self.cancel_timeout = cancel_timeout
+        self.keep_finished = keep_finished
+        self.sessions: Dict[str, Session] = {}
+        self._slots = asyncio.Semaphore(max_concurrent)
+        self._ids = itertools.count(1)
+        self._totals = {COMPLETE: 0, CANCELLED: 0, ERROR: 0}
+
+    async def _execute(self, session: Session, kwargs: Dict[str, Any]) -> Any:
+        async with self._slots:
+            session.status = RUNNING
+            session.started_at = time.time()
+            try:
+                session.result = await self.runner(session.request, **kwargs)
+                session.status = COMPLETE
+                return session.result
+            except asyncio.CancelledError:
+                session.status = CANCELLED
+                raise
+            except Exception as e:
+                session.status = ERROR
+                session.error = str(e)
+                raise
+            finally:
+                session.finished_at = time.time()
+
+    async def run(self, request: str, **kwargs) -> Session:
+        """Run `request` in a new session and wait for it to finish."""
+        session = Session(id=f"s{next(self._ids)}", request=request)
+        self.sessions[session.id] = session
+        session.task = asyncio.create_task(self._execute(session, kwargs))
+        try:
+            await asyncio.shield(session.task)
+        except asyncio.CancelledError:
+            # The caller went away: stop the run instead of burning tokens
+            session.task.cancel()
+            asyncio.get_running_loop().create_task(self._reap(session))
+            raise
+        except Exception:
+            pass
+        finally:
+            self._finish(session)
+        return session
+
+    async def _reap(self, session: Session) -> None:
+        """Wait for a cancelled session to wind down, within the cancel timeout."""
+        done, _ = await asyncio.wait({session.task}, timeout=self.cancel_timeout)
+        if not done:
+            session.error = f"did not stop within {self.cancel_timeout}s of cancellation"
+        elif not session.task.cancelled() and session.task.exception() is not None:
+            session.error = session.error or str(session.task.exception())
+        session.status = CANCELLED
+
+    def _finish(self, session: Session) -> None:
+        self._totals[session.status if session.status in self._totals else CANCELLED] += 1
+        finished = [s for s in self.sessions.values() if s.status in self._totals and s.task and s.task.done()]
+        for old in finished[:-self.keep_finished or None]:
+            self.sessions.pop(old.id, None)
+
+    def status(self) -> Dict[str, Any]:
+        """Active and queued session counts plus recent sessions."""
+        active = [s for s in self.sessions.values() if s.status == RUNNING]
+        queued = [s for s in self.sessions.values() if s.status == QUEUED]
+        return {
+            "active": len(active),
+            "queued": len(queued),
+            "max_concurrent": self.max_concurrent,
+            "completed": self._totals[COMPLETE],
+            "cancelled": self._totals[CANCELLED],
+            "failed": self._totals[ERROR],
+            "sessions": [s.summary() for s in active + queued],
+        }
@@ -1,18 +1,111 @@
 """State management for the agent system."""
 
-from typing import List, Literal, Optional, TypedDict
+import dataclasses
+import operator
+import sys
+from dataclasses import dataclass, field
+from typing import Annotated, Any, Dict, List, Literal, Mapping, Optional, Sequence, TypedDict, get_type_hints
 from langchain_core.messages import BaseMessage
+from langgraph.graph.message import add_messages
+
+from .artifacts import ArtifactStore
+from .budget import RunBudget
+from .workspace import Workspace
 
 
 class AgentState(TypedDict):
     """Shared state across all agents."""
-    
-    messages: List[BaseMessage]
+
+    # Agents return only the fields they change; these lists are appended to.
+    # Agents store slim AIMessages (content only), not the full LLM responses.
+    messages: Annotated[List[BaseMessage], add_messages]
     current_request: str
     plan: Optional[str]
-    code_changes: List[dict]  
+    code_changes: Annotated[List[dict], operator.add]
     status: Literal["planning", "programming", "complete", "error"]
     next_agent: Optional[str]
     iteration_count: int
-    created_files: List[str]
-    error_message: Optional[str]
\ No newline at end of file
+    created_files: Annotated[List[str], operator.add]
+    error_message: Optional[str]
+
+
+def append_unique(existing: Sequence, new: Sequence) -> tuple:
+    """Reducer for append-only fields: a new tuple without repeats, so earlier states are unaffected."""
+    return tuple(dict.fromkeys((*(existing or ()), *(new or ()))))
+
+
+@dataclass(slots=True)
+class SimpleState:
+    """State of one run of the async agent graph.
+
+    Slotted, so a state is a fixed set of references rather than a dict. The
+    plan and the raw programmer response are stored once in `artifacts` and
+    referenced by hash; `next` is interned; list fields are tuples shared
+    between states. Nodes return only the fields they change and `evolve`
+    applies such an update the way the graph does, copying nothing else.
+
+    Reads also work mapping-style (`state['plan']`, `state.get('files_created')`).
+    """
+    request: str = ""
+    plan_ref: Optional[str] = None
+    code_ref: Optional[str] = None  # raw programmer response
+    files_created: Annotated[tuple, append_unique] = ()
+    next: str = "manager"
+    route: str = "full"  # "simple" requests skip the planner (see src.classifier)
+    iterations: Annotated[int, operator.add] = 0
+    repo_path: Optional[str] = None
+    workspace: Optional[Workspace] = None
+    artifacts: ArtifactStore = field(default_factory=ArtifactStore)
+    budget: Optional[RunBudget] = None
+    started_at: float = 0.0
+    tokens_used: Annotated[int, operator.add] = 0
+    scaffold_tokens_saved: Annotated[int, operator.add] = 0  # output tokens not spent on boilerplate
+    fingerprints: Optional[dict] = None
+    stop_reason: Optional[str] = None
+    degraded: Annotated[tuple, append_unique] = ()  # what a deadline made the run give up
+
+    def __post_init__(self):
+        if self.next is not None:
+            self.next = sys.intern(self.next)
+        if not isinstance(self.files_created, tuple):
+            self.files_created = tuple(self.files_created)
+
+    @property
+    def plan(self) -> Optional[str]:
+        return self.artifacts.get(self.plan_ref) if self.plan_ref else None
+
+    @property
+    def code(self) -> Optional[str]:
+        return self.artifacts.get(self.code_ref) if self.code_ref else None
+
+    def evolve(self, update: Mapping[str, Any]) -> "SimpleState":
+        """A new state with a node's `update` merged in; unchanged fields are shared."""
+        changes = {}
+        for key, value in update.items():
+            reducer = STATE_REDUCERS.get(key)
+            changes[key] = reducer(getattr(self, key), value) if reducer else value
+        return dataclasses.replace(self, **changes)
+
+    def as_input(self) -> Dict[str, Any]:
+        """The fields as a shallow dict, e.g. as graph input."""
+        return {f.name: getattr(self, f.name) for f in dataclasses.fields(self)}
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return getattr(self, key, default)
+
+    def __getitem__(self, key: str) -> Any:
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        setattr(self, key, value)
+
+
+# Fields merged with a reducer instead of replaced, from the annotations above
+STATE_REDUCERS = {
+    name: hint.__metadata__[0]
+    for name, hint in get_type_hints(SimpleState, include_extras=True).items()
+    if hasattr(hint, "__metadata__")
+}
@@ -0,0 +1,135 @@
+"""Memory benchmark: per-run footprint of the legacy dict state vs `SimpleState`.
+
+Builds the final state of many runs, each with its own plan, raw programmer
+response and file list (pseudo-random code-like text, so it compresses about as
+well as real model output), and measures with `tracemalloc` what one run's
+state keeps alive. It also measures what a run's node outputs cost to serialize:
+the legacy graph returned the whole state from every node, `SimpleState` nodes
+return only the fields they changed.
+
+    python -m src.state_benchmark --runs 500 --iterations 5
+"""
+
+import argparse
+import gc
+import pickle
+import random
+import time
+import tracemalloc
+from typing import Callable, Dict, List
+
+from .state import SimpleState
+
+PLAN_CHARS = 4_000
+CODE_CHARS = 16_000
+FILES = 4
+
+
+class LegacyState(dict):
+    """The state as it was: a dict subclass with the plan and raw response inline."""
+
+
+VOCABULARY = ("def", "return", "self", "items", "todo", "if", "not", "for", "in", "raise", "ValueError", "args",
+              "parser", "add_argument", "path", "open", "json", "load", "dump", "=", "(", ")", ":", "None",
+              "True", "list", "append", "index", "print", "f\"{item}\"", "#", "the", "file", "and", "a", "to")
+
+
+WORDS = [f"{word} " for word in VOCABULARY] + ["\n    ", "\n        "]
+
+
+def _text(rng: random.Random, chars: int) -> str:
+    return "".join(rng.choices(WORDS, k=chars // 3))[:chars]
+
+
+def _texts(run: int) -> Dict[str, str]:
+    # Distinct strings per run, like real LLM output
+    rng = random.Random(run)
+    return {
+        "request": f"Create a command line todo app #{run}",
+        "plan": f"## Plan {run}\n" + _text(rng, PLAN_CHARS),
+        "code": f"```json {run}\n" + _text(rng, CODE_CHARS),
+        "files": [f"./agentic_code/todo_{run}/module_{i}.py" for i in range(FILES)],
+    }
+
+
+def legacy_run(run: int, iterations: int) -> tuple:
+    """Final state and per-node outputs of one run, the way the legacy graph produced them."""
+    texts = _texts(run)
+    state = LegacyState(request=texts["request"], plan=None, code=None, files_created=[], next="manager",
+                        iterations=0, repo_path=None, workspace=None, budget=None, started_at=time.monotonic(),
+                        tokens_used=0, fingerprints={}, stop_reason=None)
+    outputs = []
+    for _ in range(iterations):
+        state.update(next="planner", iterations=state["iterations"] + 1, tokens_used=state["tokens_used"] + 50)
+        outputs.append(dict(state))
+        state.update(plan=texts["plan"], next="manager", tokens_used=state["tokens_used"] + 1000)
+        outputs.append(dict(state))
+        state.update(code=texts["code"], files_created=list(texts["files"]), next="manager",
+                     tokens_used=state["tokens_used"] + 4000)
+        outputs.append(dict(state))
+    return state, outputs
+
+
+def compact_run(run: int, iterations: int) -> tuple:
+    """Final state and per-node updates of one run with `SimpleState`."""
+    texts = _texts(run)
+    state = SimpleState(request=texts["request"], started_at=time.monotonic(), fingerprints={})
+    outputs = []
+    for _ in range(iterations):
+        updates = [
+            {"next": "planner", "iterations": 1, "tokens_used": 50},
+            {"plan_ref": state.artifacts.put(texts["plan"]), "next": "manager", "tokens_used": 1000},
+            {"code_ref": state.artifacts.put(texts["code"]), "files_created": list(texts["files"]),
+             "next": "manager", "tokens_used": 4000},
+        ]
+        for update in updates:
+            state = state.evolve(update)
+            outputs.append(update)
+    return state, outputs
+
+
+def _serialized_bytes(outputs: List[dict]) -> int:
+    return sum(len(pickle.dumps({k: v for k, v in output.items() if k != "artifacts"})) for output in outputs)
+
+
+def measure(run: Callable, runs: int, iterations: int) -> Dict[str, float]:
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    started = time.perf_counter()
+    states = []
+    serialized = 0
+    for i in range(runs):
+        state, outputs = run(i, iterations)
+        serialized += _serialized_bytes(outputs)
+        states.append(state)
+        del outputs
+    elapsed = time.perf_counter() - started
+    gc.collect()
+    retained = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return {
+        "retained_per_run_bytes": round(retained / runs),
+        "serialized_per_run_bytes": round(serialized / runs),
+        "ms_per_run": round(elapsed / runs * 1000, 3),
+    }
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Compare the per-run memory of the legacy and compact run state.")
+    parser.add_argument("--runs", type=int, default=500, help="Runs to keep alive at once")
+    parser.add_argument("--iterations", type=int, nargs="+", default=[1, 5, 10],
+                        help="Planner/programmer rounds per run")
+    args = parser.parse_args(argv)
+
+    print(f"Generated text per run: {PLAN_CHARS + CODE_CHARS:,} chars")
+    print(f"{'state':<8} {'rounds':>6} {'retained/run':>13} {'serialized/run':>15} {'ms/run':>8}")
+    for iterations in args.iterations:
+        for name, run in (("legacy", legacy_run), ("compact", compact_run)):
+            result = measure(run, args.runs, iterations)
+            print(f"{name:<8} {iterations:>6} {result['retained_per_run_bytes']:>13,} "
+                  f"{result['serialized_per_run_bytes']:>15,} {result['ms_per_run']:>8}")
+
+
+if __name__ == "__main__":
+    main()
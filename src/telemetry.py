@@ -0,0 +1,70 @@
+"""Telemetry log of agent runs.
+
+With `OPEN_SWE_TELEMETRY_LOG` set, every run's events (everything except the
+individual thinking/answer tokens) are appended to that JSONL file, one
+record per event with the wall-clock `time` it was received. Paths ending in
+`.gz` are gzip-compressed; each run appends its own gzip member.
+
+`python open-swe-cli.py stats` (see `src.analytics`) aggregates these logs.
+"""
+
+import asyncio
+import gzip
+import json
+import os
+import threading
+import time
+from typing import List, Optional
+
+from .events import (Event, EventBus, FileWritten, LlmCallFinished, NodeFinished, NodeStarted, PlanReady,
+                     RequestClassified, RunError, RunFinished, RunStarted, ScaffoldGenerated, Subscription)
+
+TELEMETRY_EVENTS = (RunStarted, RequestClassified, NodeStarted, NodeFinished, LlmCallFinished, PlanReady,
+                    FileWritten, ScaffoldGenerated, RunError, RunFinished)
+
+# Concurrent runs append to the same file
+_write_lock = threading.Lock()
+
+
+def telemetry_record(event: Event, received: Optional[float] = None) -> dict:
+    record = {"time": round(received or time.time(), 3), **event.to_dict()}
+    if isinstance(event, PlanReady):
+        # The plan itself is in the run's output, its size is enough here
+        record["plan"] = len(event.plan)
+    return record
+
+
+def append_records(path: str, records: List[dict]) -> None:
+    if not records:
+        return
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    lines = "".join(json.dumps(record, default=str) + "\n" for record in records)
+    opener = gzip.open if path.endswith(".gz") else open
+    with _write_lock, opener(path, "at", encoding="utf-8") as f:
+        f.write(lines)
+
+
+def start_telemetry(bus: EventBus, path: str) -> asyncio.Task:
+    """Subscribe to `bus` now and write its events to `path` once the run finishes.
+
+    The task returns the number of records written; cancelling it writes what
+    was received so far.
+    """
+    subscription = bus.subscribe(types=TELEMETRY_EVENTS)
+    return asyncio.create_task(_record(bus, subscription, path))
+
+
+async def _record(bus: EventBus, subscription: Subscription, path: str) -> int:
+    records = []
+    try:
+        async for event in subscription:
+            records.append(telemetry_record(event))
+            if isinstance(event, RunFinished):
+                break
+    finally:
+        bus.unsubscribe(subscription)
+        # Written in one go, so concurrent runs' records do not interleave
+        await asyncio.shield(asyncio.to_thread(append_records, path, records))
+    return len(records)
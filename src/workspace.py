@@ -0,0 +1,186 @@
+"""Output workspaces for generated projects.
+
+The programmer agent writes every generated file through a workspace:
+
+- `LocalWorkspace` writes to a directory on disk (the default, `./agentic_code`).
+- `DedupWorkspace` (in `src.blobstore`) does the same, but stores each distinct
+  file once in a blob store shared by all runs and links it into place.
+- `MemoryWorkspace` keeps files in memory and can hand them out as a zip or tar
+  archive in a bytes buffer.
+- `ArchiveWorkspace` streams files straight into a zip or tar archive written to
+  any binary file object, e.g. a socket, an HTTP response or a `BytesIO`.
+
+Paths are always relative, use forward slashes and may not leave the workspace.
+"""
+
+import asyncio
+import io
+import os
+import posixpath
+import tarfile
+import time
+import uuid
+import zipfile
+from pathlib import Path
+from typing import BinaryIO, Dict, Iterable, Optional
+
+
+def safe_relative_path(path: str) -> str:
+    """Normalize a generated file path, rejecting absolute paths and `..` escapes."""
+    normalized = posixpath.normpath(path.replace("\\", "/")).lstrip("/")
+    if normalized in ("", ".") or normalized == ".." or normalized.startswith("../") or ":" in normalized.split("/")[0]:
+        raise ValueError(f"Unsafe file path: {path!r}")
+    return normalized
+
+
+def temp_suffix() -> str:
+    """Suffix for temporary files that no other process or thread is using."""
+    return f"{os.getpid()}.{uuid.uuid4().hex[:16]}"
+
+
+def write_file_atomic(path: Path, content: str) -> None:
+    """Write a file via a temporary sibling so readers never see partial content."""
+    # Unique per call: concurrent runs in one process may write the same path
+    tmp = path.with_name(f".{path.name}.{temp_suffix()}.tmp")
+    try:
+        tmp.write_text(content, encoding='utf-8')
+        os.replace(tmp, path)
+    finally:
+        tmp.unlink(missing_ok=True)
+
+
+def _write_archive(fileobj: BinaryIO, files: Dict[str, bytes], archive_format: str) -> None:
+    if archive_format == "zip":
+        with zipfile.ZipFile(fileobj, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+            for path, data in files.items():
+                archive.writestr(path, data)
+    else:
+        with tarfile.open(fileobj=fileobj, mode=f"w|{_tar_compression(archive_format)}") as archive:
+            for path, data in files.items():
+                archive.addfile(_tar_info(path, len(data)), io.BytesIO(data))
+
+
+def _tar_compression(archive_format: str) -> str:
+    compressions = {"tar": "", "tar.gz": "gz", "tgz": "gz", "tar.bz2": "bz2", "tar.xz": "xz"}
+    if archive_format not in compressions:
+        raise ValueError(f"Unsupported archive format: {archive_format}")
+    return compressions[archive_format]
+
+
+def _tar_info(path: str, size: int) -> tarfile.TarInfo:
+    info = tarfile.TarInfo(path)
+    info.size = size
+    info.mtime = int(time.time())
+    info.mode = 0o644
+    return info
+
+
+class Workspace:
+    """Destination for the files a run generates."""
+
+    async def write(self, path: str, content: str) -> str:
+        """Store one file and return where it went (shown to the user as 'created')."""
+        raise NotImplementedError
+
+    def discard(self, locations: Iterable[str]) -> None:
+        """Remove files of a run that was cancelled half-way, where the backend allows it."""
+
+    def close(self) -> None:
+        """Finish the workspace, e.g. write an archive's trailer."""
+
+
+class LocalWorkspace(Workspace):
+    """Files on local disk under `root` (today's behavior)."""
+
+    def __init__(self, root="./agentic_code"):
+        self.root = Path(root)
+
+    def _target(self, path: str) -> Path:
+        return self.root / safe_relative_path(path)
+
+    def _write(self, target: Path, content: str) -> None:
+        target.parent.mkdir(parents=True, exist_ok=True)
+        write_file_atomic(target, content)
+
+    async def write(self, path: str, content: str) -> str:
+        target = self._target(path)
+        await asyncio.to_thread(self._write, target, content)
+        return str(target)
+
+    def discard(self, locations: Iterable[str]) -> None:
+        for location in locations:
+            Path(location).unlink(missing_ok=True)
+
+
+def output_workspace(base: Optional[str] = None) -> "LocalWorkspace":
+    """The configured output directory (relative to `base`, if given), deduplicated
+    through `OPEN_SWE_BLOB_STORE` when set."""
+    from .config import config
+    root = os.path.join(base, config.output_dir) if base else config.output_dir
+    if config.blob_store:
+        from .blobstore import BlobStore, DedupWorkspace
+        return DedupWorkspace(root, BlobStore(config.blob_store), config.blob_link_mode)
+    return LocalWorkspace(root)
+
+
+class MemoryWorkspace(Workspace):
+    """An in-memory file tree; nothing touches the disk."""
+
+    def __init__(self):
+        self.files: Dict[str, bytes] = {}
+
+    async def write(self, path: str, content: str) -> str:
+        path = safe_relative_path(path)
+        self.files[path] = content.encode("utf-8")
+        return path
+
+    def discard(self, locations: Iterable[str]) -> None:
+        for location in locations:
+            self.files.pop(location, None)
+
+    def read(self, path: str) -> str:
+        return self.files[safe_relative_path(path)].decode("utf-8")
+
+    def archive(self, archive_format: str = "zip") -> bytes:
+        """The whole tree as a zip (`"zip"`) or tar (`"tar"`, `"tar.gz"`, ...) archive."""
+        buffer = io.BytesIO()
+        _write_archive(buffer, self.files, archive_format)
+        return buffer.getvalue()
+
+
+class ArchiveWorkspace(Workspace):
+    """Streams files into a zip or tar archive as they are generated.
+
+    With no `fileobj` the archive goes to an internal buffer available through
+    `getvalue()` after `close()`. Entries cannot be removed from a streamed
+    archive, so `discard` is a no-op; a cancelled run's archive should be dropped.
+    """
+
+    def __init__(self, fileobj: Optional[BinaryIO] = None, archive_format: str = "zip"):
+        self.fileobj = fileobj if fileobj is not None else io.BytesIO()
+        self.archive_format = archive_format
+        if archive_format == "zip":
+            self._archive = zipfile.ZipFile(self.fileobj, "w", compression=zipfile.ZIP_DEFLATED)
+        else:
+            self._archive = tarfile.open(fileobj=self.fileobj, mode=f"w|{_tar_compression(archive_format)}")
+        self.paths = []
+        self.closed = False
+
+    async def write(self, path: str, content: str) -> str:
+        path = safe_relative_path(path)
+        data = content.encode("utf-8")
+        if self.archive_format == "zip":
+            self._archive.writestr(path, data)
+        else:
+            self._archive.addfile(_tar_info(path, len(data)), io.BytesIO(data))
+        self.paths.append(path)
+        return path
+
+    def close(self) -> None:
+        if not self.closed:
+            self._archive.close()
+            self.closed = True
+
+    def getvalue(self) -> bytes:
+        self.close()
+        return self.fileobj.getvalue()
@@ -1,7 +1,14 @@
 """Test configuration and fixtures."""
 
+import os
+
 import pytest
 
+# `src.llm` builds its Azure clients at import time and they refuse to start without
+# settings; no test calls Azure
+os.environ.setdefault("AZURE_AI_API_KEY", "test-key")
+os.environ.setdefault("AZURE_AI_ENDPOINT", "https://example.invalid/models")
+
 
 @pytest.fixture
 def sample_request():
@@ -0,0 +1,106 @@
+"""Tests for run analytics over telemetry logs."""
+
+import pandas as pd
+import pytest
+
+from src.analytics import (build_reports, call_stats, calls_table, load_events, main, parse_prices, read_log,
+                           runs_table)
+from src.events import FileWritten, LlmCallFinished, RequestClassified, RunFinished, RunStarted
+from src.telemetry import append_records, telemetry_record
+
+DAY = 86400.0
+START = 1_760_000_000.0
+
+
+def _run(run_id, day, request, route, status, calls, stop_reason=None, tokens_used=1000):
+    """Telemetry records of one run; `calls` are (agent, seconds, ttft, output_tokens, cached_tokens)."""
+    at = START + day * DAY
+    events = [RunStarted(run_id=run_id, t=0, request=request),
+              RequestClassified(run_id=run_id, t=0, route=route, score=0.1, reasons=(), source="heuristic")]
+    t = 0.0
+    for agent, seconds, ttft, output_tokens, cached_tokens in calls:
+        t += seconds
+        events.append(LlmCallFinished(run_id=run_id, t=t, agent=agent, model="DeepSeek-R1-0528", ttft=ttft,
+                                      seconds=seconds, tokens=1000 + output_tokens, input_tokens=1000,
+                                      output_tokens=output_tokens, cached_tokens=cached_tokens))
+    events.append(FileWritten(run_id=run_id, t=t, path="a/main.py", location="x", bytes=10))
+    events.append(RunFinished(run_id=run_id, t=t, status=status, stop_reason=stop_reason, files_created=(),
+                              iterations=1, tokens_used=tokens_used))
+    return [telemetry_record(event, at + event.t) for event in events]
+
+
+@pytest.fixture
+def log(tmp_path):
+    path = str(tmp_path / "telemetry.jsonl")
+    append_records(path, _run("r1", 0, "Create a factorial function", "simple", "complete",
+                              [("programmer", 10.0, 2.0, 400, 0)]))
+    append_records(path, _run("r2", 0, "Build a Flask app", "full", "stopped",
+                              [("manager", 2.0, 1.0, 10, 500), ("planner", 20.0, 4.0, 800, 0),
+                               ("programmer", 30.0, 5.0, 1250, 1000)],
+                              stop_reason="token budget exhausted (9000/8000 tokens)", tokens_used=9000))
+    append_records(path, _run("r3", 1, "build a  flask APP", "full", "error", [("manager", 4.0, 1.0, 10, 0)]))
+    return path
+
+
+def test_call_stats_per_agent(log):
+    events = load_events([log])
+    assert set(events["type"]) == {"run_started", "request_classified", "llm_call_finished", "run_finished"}
+
+    stats = call_stats(calls_table(events), by=("agent",))
+    programmer = stats.loc["programmer"]
+    assert programmer["calls"] == 2
+    assert programmer["latency_p50"] == pytest.approx(20.0)
+    # 1650 output tokens over (10 - 2) + (30 - 5) generation seconds
+    assert programmer["tokens_per_second"] == pytest.approx(1650 / 33, abs=1e-3)
+    assert programmer["cache_hit_rate"] == pytest.approx(0.5)
+    assert stats.loc["manager", "calls"] == 2
+
+
+def test_costs_and_run_stats(log):
+    events = load_events([log])
+    calls = calls_table(events, prices={"DeepSeek-R1-0528": (1.0, 2.0)})
+    runs = runs_table(events, calls).set_index("run_id")
+    assert runs.loc["r1", "cost"] == pytest.approx((1000 * 1.0 + 400 * 2.0) / 1e6)
+    assert runs.loc["r2", "route"] == "full" and bool(runs.loc["r2", "budget_exhausted"])
+
+    reports = build_reports(events, window="1D")
+    per_day = reports["runs"]
+    assert per_day["runs"].sum() == 3
+    first_day = per_day.xs("full", level="route").iloc[0]
+    assert first_day["stopped_rate"] == 1.0 and first_day["budget_exhausted_rate"] == 1.0
+
+    # Case and whitespace variants of a request are one row
+    budget = reports["budget"]
+    assert budget.index[0] == "build a flask app"
+    assert budget.iloc[0]["runs"] == 2 and budget.iloc[0]["budget_exhausted"] == 1
+
+
+def test_since_filters_old_records(log):
+    events = load_events([log], since=pd.Timestamp(START + DAY / 2, unit="s", tz="UTC"))
+    assert set(events["run_id"]) == {"r3"}
+
+
+def test_cache_only_parses_appended_records(log, tmp_path):
+    cache = str(tmp_path / "cache")
+    assert read_log(log, cache)["run_id"].nunique() == 3
+
+    append_records(log, _run("r4", 2, "Write a regex", "simple", "complete", [("programmer", 5.0, 1.0, 100, 0)]))
+    with open(log, "a") as f:
+        f.write('{"time": 1760000000.0, "type": "run_fini')  # still being written
+    frame = read_log(log, cache)
+    assert sorted(frame["run_id"].unique()) == ["r1", "r2", "r3", "r4"]
+    uncached = read_log(log)
+    for column in ("time", "type", "run_id"):
+        assert frame[column].astype(object).tolist() == uncached[column].astype(object).tolist()
+
+
+def test_parse_prices():
+    assert parse_prices("Phi-4=0.1/0.4, gpt=2") == {"Phi-4": (0.1, 0.4), "gpt": (2.0, 2.0)}
+
+
+def test_csv_output(log, tmp_path):
+    output = tmp_path / "stats.csv"
+    assert main([log, "--format", "csv", "--output", str(output), "--no-cache"]) == 0
+    calls = pd.read_csv(tmp_path / "stats.calls.csv")
+    assert {"agent", "model", "latency_p95", "cost"} <= set(calls.columns)
+    assert (tmp_path / "stats.runs.csv").exists() and (tmp_path / "stats.budget.csv").exists()
@@ -0,0 +1,31 @@
+"""Tests for the run artifact store."""
+
+from src.artifacts import ArtifactStore, artifact_ref
+
+
+def test_put_returns_content_addressed_reference():
+    store = ArtifactStore()
+    ref = store.put("print('hello')\n")
+
+    assert ref == artifact_ref("print('hello')\n")
+    assert ref.startswith("sha256:")
+    assert store.get(ref) == "print('hello')\n"
+
+
+def test_identical_artifacts_are_stored_once():
+    store = ArtifactStore()
+    first = store.put("x" * 1000)
+    second = store.put("x" * 1000)
+
+    assert first == second
+    assert len(store) == 1
+    assert store.nbytes == 1000
+
+
+def test_large_artifacts_are_kept_compressed():
+    store = ArtifactStore()
+    code = "def total(items):\n    return sum(item.price for item in items)\n" * 100
+    ref = store.put(code)
+
+    assert store.get(ref) == code and ref == artifact_ref(code)
+    assert store.nbytes < len(code) // 10
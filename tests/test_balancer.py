@@ -0,0 +1,197 @@
+"""Tests for load balancing across equivalent endpoints."""
+
+import asyncio
+import types
+
+import pytest
+
+from src import balancer as balancer_module
+from src.balancer import (CLOSED, HALF_OPEN, OPEN, Balancer, BalancedLLM, Endpoint, EndpointSpec, bind,
+                          is_endpoint_failure, lease, parse_endpoints, unbind)
+
+
+class ApiError(Exception):
+    def __init__(self, status_code, message="error"):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def _balancer(*weights, **kwargs):
+    return Balancer("m", [Endpoint(f"e{i}", weight) for i, weight in enumerate(weights)], **kwargs)
+
+
+def test_weighted_least_outstanding_requests():
+    balancer = _balancer(2, 1)
+    picked = [balancer.acquire().name for _ in range(6)]
+    # In flight: four on the endpoint with twice the weight, two on the other
+    assert picked.count("e0") == 4 and picked.count("e1") == 2
+
+    for endpoint in balancer.endpoints:
+        while endpoint.outstanding:
+            balancer.release(endpoint)
+    busy = balancer.acquire()
+    assert balancer.acquire() is not busy
+
+
+def test_circuit_opens_and_recovers_through_a_probe(monkeypatch):
+    clock = types.SimpleNamespace(now=1000.0)
+    monkeypatch.setattr(balancer_module, "time", types.SimpleNamespace(monotonic=lambda: clock.now))
+    balancer = _balancer(1, 1, failure_threshold=2, cooldown=10)
+    bad, good = balancer.endpoints
+    good.outstanding = 5  # so calls go to `bad` while it is in rotation
+
+    for _ in range(2):
+        balancer.release(balancer.acquire(), ApiError(503))
+    assert bad.state == OPEN and balancer.healthy() == 1
+    assert balancer.acquire() is good
+
+    # After the cooldown a single probe goes through; its failure doubles the cooldown
+    clock.now += 10
+    probe = balancer.acquire()
+    assert probe is bad and bad.state == HALF_OPEN and balancer.acquire() is good
+    balancer.release(probe, ConnectionError("reset"))
+    assert bad.state == OPEN and bad.open_until == clock.now + 20
+
+    clock.now += 20
+    balancer.release(balancer.acquire())
+    assert bad.state == CLOSED and bad.failures == 0 and balancer.healthy() == 2
+
+
+def test_client_errors_and_429s_are_not_failures():
+    assert not is_endpoint_failure(ApiError(400)) and not is_endpoint_failure(ApiError(429, "429 rate limit"))
+    assert is_endpoint_failure(ApiError(502)) and is_endpoint_failure(TimeoutError())
+    assert not is_endpoint_failure(asyncio.CancelledError())
+    # Bugs of our own say nothing about the endpoint
+    assert not is_endpoint_failure(KeyError("files")) and not is_endpoint_failure(TypeError())
+
+    balancer = _balancer(1, 1, failure_threshold=1)
+    first = balancer.acquire()
+    balancer.release(first, ApiError(429, "429 rate limit"))
+    assert first.state == CLOSED and first.rate_limited == 1
+    # Calls avoid the rate limited endpoint while it asked us to back off
+    assert {balancer.acquire().name for _ in range(3)} == {next(e.name for e in balancer.endpoints
+                                                               if e is not first)}
+
+
+def test_sticky_routing_keeps_a_run_on_its_endpoint():
+    balancer = _balancer(1, 1, 1, sticky_slack=2)
+    home = balancer.acquire("run")
+    balancer.release(home)
+    assert all(balancer.acquire("run") is home for _ in range(3))
+    # ... until it is more than `sticky_slack` requests busier than the others
+    assert balancer.acquire("run") is not home
+
+    home.state, home.open_until = OPEN, float("inf")
+    assert balancer.acquire("other") is not home
+
+
+def test_balanced_llm_releases_and_fails_over():
+    class FakeLLM:
+        def __init__(self, fail):
+            self.fail = fail
+
+        async def astream(self, messages, **kwargs):
+            if self.fail:
+                raise ApiError(500)
+            yield "ok"
+
+        def invoke(self, messages, **kwargs):
+            return "ok"
+
+    balancer = _balancer(1, 1, failure_threshold=1)
+    llm = BalancedLLM(balancer, {"e0": FakeLLM(True), "e1": FakeLLM(False)})
+
+    async def call():
+        return [chunk async for chunk in llm.astream([])]
+
+    failing, working = balancer.endpoints
+    working.outstanding = 1  # so the first call goes to the failing endpoint
+    with pytest.raises(ApiError):
+        asyncio.run(call())
+    working.outstanding = 0
+    assert failing.state == OPEN and failing.outstanding == 0
+    # Once the failing endpoint is out of rotation every call succeeds
+    assert all(asyncio.run(call()) == ["ok"] for _ in range(3))
+
+    token = bind("run")
+    try:
+        call = lease(llm)
+        assert call.failover and balancer.pinned["run"] is call.endpoint
+        call.release()
+        call.release()
+    finally:
+        unbind(token)
+    assert lease("plain").llm == "plain" and not lease("plain").failover
+
+
+def test_parse_endpoints(tmp_path, monkeypatch):
+    monkeypatch.setenv("WEST_KEY", "secret")
+    assert parse_endpoints("https://a/models*2, https://b/models") == {
+        "*": [EndpointSpec("https://a/models", weight=2.0), EndpointSpec("https://b/models")]}
+    path = tmp_path / "endpoints.json"
+    path.write_text('{"R1": ["https://a", {"endpoint": "https://b", "deployment": "r1-b", '
+                    '"api_key_env": "WEST_KEY", "weight": 3}]}')
+    assert parse_endpoints(str(path)) == {
+        "R1": [EndpointSpec("https://a"), EndpointSpec("https://b", "r1-b", "secret", 3.0)]}
+    assert parse_endpoints("") == {}
+    with pytest.raises(ValueError):
+        Balancer("m", [])
+
+
+class Chunk:
+    def __init__(self, content):
+        self.content = content
+        self.usage_metadata = None
+        self.response_metadata = {}
+
+
+class StreamingLLM:
+    model_name = "m"
+
+    def __init__(self, name):
+        self.endpoint = name
+
+    def stream(self, messages, **kwargs):
+        yield Chunk("<think>x</think>")
+        yield None  # our code fails on this chunk, not the endpoint
+
+    async def astream(self, messages, **kwargs):
+        yield Chunk("answer")
+
+
+def test_local_errors_neither_trip_circuits_nor_fail_over(monkeypatch):
+    pytest.importorskip("langchain_azure_ai")
+    from src import llm as llm_module
+
+    balancer = _balancer(1, 1, failure_threshold=1)
+    llm = BalancedLLM(balancer, {e.name: StreamingLLM(e.name) for e in balancer.endpoints})
+    with pytest.raises(AttributeError):
+        llm_module.stream_rate_limited(llm, [], "manager")
+    assert sum(e.requests for e in balancer.endpoints) == 1
+    assert all(e.state == CLOSED and e.errors == 0 and e.outstanding == 0 for e in balancer.endpoints)
+
+    class BrokenLimiter:
+        def acquire_sync(self, tokens):
+            raise RuntimeError("limiter")
+
+    monkeypatch.setattr(llm_module, "get_rate_limiter", lambda llm: BrokenLimiter())
+    with pytest.raises(RuntimeError):
+        llm_module.stream_rate_limited(llm, [], "manager")
+    assert all(e.outstanding == 0 for e in balancer.endpoints)
+
+
+def test_stream_response_does_not_blame_the_endpoint_for_a_failing_predicate(monkeypatch):
+    pytest.importorskip("langgraph")
+    from src import enhanced_graph
+
+    monkeypatch.setattr(enhanced_graph, "display_agent_status", lambda *args: None)
+    balancer = _balancer(1, 1, failure_threshold=1)
+    llm = BalancedLLM(balancer, {e.name: StreamingLLM(e.name) for e in balancer.endpoints})
+
+    def broken(answer):
+        raise KeyError("files")
+
+    with pytest.raises(KeyError):
+        asyncio.run(enhanced_graph.stream_response(llm, [], "programmer", is_complete=broken))
+    assert sum(e.requests for e in balancer.endpoints) == 1
+    assert all(e.state == CLOSED and e.outstanding == 0 for e in balancer.endpoints)
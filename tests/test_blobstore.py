@@ -0,0 +1,105 @@
+"""Tests for the content-addressed blob store."""
+
+import asyncio
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from src import blobstore
+from src.blobstore import BlobStore, DedupWorkspace, digest
+
+
+def _write(workspace, files):
+    async def scenario():
+        return [await workspace.write(path, content) for path, content in files.items()]
+    return asyncio.run(scenario())
+
+
+def test_identical_files_are_stored_once(tmp_path):
+    store = BlobStore(tmp_path / "blobs")
+    first = DedupWorkspace(tmp_path / "out", store, mode="hardlink")
+    second = DedupWorkspace(tmp_path / "out", store, mode="hardlink")
+    _write(first, {"a/requirements.txt": "flask\n", "a/__init__.py": "", "a/app.py": "print(1)\n"})
+    _write(second, {"b/requirements.txt": "flask\n", "b/__init__.py": ""})
+
+    assert (tmp_path / "out" / "b" / "requirements.txt").read_text() == "flask\n"
+    assert first.bytes_written == len("flask\nprint(1)\n") and second.bytes_written == 0
+    assert second.bytes_deduplicated == len("flask\n")
+    requirements = store.path(digest(b"flask\n"))
+    assert os.path.samefile(requirements, tmp_path / "out" / "a" / "requirements.txt")
+    assert store.stats() == {"blobs": 3, "bytes": 15, "links": 5, "bytes_saved": 6}
+    # Shared content cannot be changed in place through one of its links
+    assert os.stat(tmp_path / "out" / "b" / "requirements.txt").st_mode & 0o222 == 0
+
+
+def test_gc_collects_unreferenced_blobs(tmp_path):
+    store = BlobStore(tmp_path / "blobs")
+    workspace = DedupWorkspace(tmp_path / "out", store, mode="hardlink")
+    locations = _write(workspace, {"p/keep.py": "keep", "p/drop.py": "drop"})
+    workspace.discard(locations[1:])
+
+    # Within the grace period nothing goes
+    assert store.gc(min_age=3600)["removed"] == 0
+    assert store.gc(min_age=0) == {"removed": 1, "bytes_freed": 4, "kept": 1}
+    assert digest(b"keep") in store and digest(b"drop") not in store
+
+    # A collected blob is stored again when it is generated again
+    _write(workspace, {"q/drop.py": "drop"})
+    assert (tmp_path / "out" / "q" / "drop.py").read_text() == "drop"
+
+
+def test_copies_are_independent(tmp_path):
+    store = BlobStore(tmp_path / "blobs")
+    _write(DedupWorkspace(tmp_path / "out", store, mode="copy"), {"a/x.txt": "same", "b/x.txt": "same"})
+    (tmp_path / "out" / "a" / "x.txt").write_text("edited")
+    assert (tmp_path / "out" / "b" / "x.txt").read_text() == "same"
+    assert store.get(digest(b"same")) == b"same"
+
+
+def test_auto_falls_back_to_what_the_filesystem_supports(tmp_path):
+    store = BlobStore(tmp_path / "blobs")
+    blob, written = store.put(b"data")
+    assert written and store.put(b"data") == (blob, False)
+    mode = store.materialize(blob, tmp_path / "x.txt")
+    assert mode in ("reflink", "hardlink", "copy") and (tmp_path / "x.txt").read_bytes() == b"data"
+    # Unsupported modes are not tried again
+    assert store.materialize(blob, tmp_path / "y.txt") == mode
+
+
+def test_concurrent_writes_of_one_path(tmp_path):
+    """Runs in one process (MCP server, daemon) may write the same file at once."""
+    store = BlobStore(tmp_path / "blobs")
+    blob, _ = store.put(b"x" * 100_000)
+    target = tmp_path / "out" / "main.py"
+    target.parent.mkdir()
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        modes = list(pool.map(lambda _: store.materialize(blob, target, "copy"), range(64)))
+    assert modes == ["copy"] * 64 and target.read_bytes() == b"x" * 100_000
+    assert os.listdir(target.parent) == ["main.py"]
+
+
+def test_auto_does_not_hardlink_for_root(tmp_path, monkeypatch):
+    """Root can write through the read-only bits, so an edit would reach every project."""
+    monkeypatch.setattr(blobstore, "_running_as_root", lambda: True)
+    store = BlobStore(tmp_path / "blobs")
+    blob, _ = store.put(b"flask\n")
+    assert store.materialize(blob, tmp_path / "requirements.txt") in ("reflink", "copy")
+    (tmp_path / "requirements.txt").write_text("django\n")
+    assert store.get(blob) == b"flask\n"
+
+
+def test_storing_again_keeps_the_blob_without_touching_its_links(tmp_path):
+    store = BlobStore(tmp_path / "blobs")
+    linked, _ = store.put(b"linked")
+    unlinked, _ = store.put(b"unlinked")
+    store.materialize(linked, tmp_path / "out.txt", "hardlink")
+    old = time.time() - 7200
+    for blob in (linked, unlinked):
+        os.utime(store.path(blob), (old, old))
+
+    assert store.put(b"linked") == (linked, False) and store.put(b"unlinked") == (unlinked, False)
+    # The output's mtime is the blob's; it stays as the run left it
+    assert os.stat(tmp_path / "out.txt").st_mtime == old
+    assert store.gc(min_age=3600)["removed"] == 0
+    assert store.gc(min_age=0)["removed"] == 1 and unlinked not in store
+    assert not list(store.fresh.iterdir())
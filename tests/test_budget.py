@@ -0,0 +1,42 @@
+"""Tests for run budgets and no-progress detection."""
+
+import time
+
+from src.budget import RunBudget, check_progress
+
+
+def test_budget_limits():
+    """Each limit stops the run once reached; 0 disables it."""
+    now = time.monotonic()
+    assert RunBudget(max_iterations=3).exceeded(2, now, 10**9) is None
+    assert "iteration" in RunBudget(max_iterations=3).exceeded(3, now, 0)
+    assert "time" in RunBudget(max_iterations=0, max_seconds=5).exceeded(0, now - 6, 0)
+    assert "token" in RunBudget(max_iterations=0, max_tokens=1000).exceeded(0, now, 1000)
+
+
+def test_normal_run_makes_progress():
+    """manager -> planner -> manager -> programmer -> manager never repeats a fingerprint."""
+    state = {"plan": None, "code_ref": None, "files_created": [], "next": "planner"}
+    assert check_progress(state, "manager") is None
+    state.update(plan="plan", next="manager")
+    assert check_progress(state, "planner") is None
+    state.update(next="programmer")
+    assert check_progress(state, "manager") is None
+    state.update(code_ref="sha256:1", files_created=["a.py"], next="manager")
+    assert check_progress(state, "programmer") is None
+    state.update(next="complete")
+    assert check_progress(state, "manager") is None
+
+
+def test_manager_loop_is_escalated_then_stopped():
+    """Re-planning without progress is overridden first, then the run stops."""
+    state = {"plan": "plan", "code_ref": None, "files_created": [], "next": "planner"}
+    assert check_progress(state, "manager") is None
+    state["next"] = "planner"
+    assert check_progress(state, "manager") is None
+    assert state["next"] == "programmer"
+
+    state = {"plan": "plan", "code_ref": "sha256:1", "files_created": [], "next": "complete", "fingerprints": {}}
+    check_progress(state, "programmer")
+    check_progress(state, "programmer")
+    assert "no progress" in check_progress(state, "programmer")
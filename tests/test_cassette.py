@@ -0,0 +1,77 @@
+"""Tests for LLM record/replay cassettes."""
+
+import asyncio
+
+import pytest
+
+pytest.importorskip("langchain_core")
+
+from langchain_core.messages import AIMessageChunk, HumanMessage  # noqa: E402
+
+from src.cassette import Cassette, RecordingLLM, ReplayLLM  # noqa: E402
+
+
+class FakeStreamingLLM:
+    model_name = "fake"
+
+    async def astream(self, messages, **kwargs):
+        for part in ["<think>hm</think>", "plan", "ner"]:
+            await asyncio.sleep(0.01)
+            yield AIMessageChunk(content=part)
+
+
+async def _collect(llm, messages):
+    return [chunk.content async for chunk in llm.astream(messages)]
+
+
+def test_record_then_replay(tmp_path):
+    """Replayed chunks match the recording, with timings preserved in the cassette."""
+    cassette = Cassette(tmp_path / "run.jsonl.gz")
+    messages = [HumanMessage(content="build it")]
+
+    recorded = asyncio.run(_collect(RecordingLLM(FakeStreamingLLM(), "manager", cassette), messages))
+
+    entry = Cassette(cassette.path).entries()[0]
+    assert entry["agent"] == "manager"
+    assert entry["c"] == recorded
+    assert all(ms >= 5 for ms in entry["t"])
+
+    replay = ReplayLLM("manager", Cassette(cassette.path), speed=0)
+    assert asyncio.run(_collect(replay, messages)) == recorded
+    with pytest.raises(LookupError):
+        asyncio.run(_collect(replay, messages))
+
+
+class FlakyLLM:
+    """Fails its first call mid-stream, like a dropped connection, then succeeds."""
+
+    model_name = "flaky"
+
+    def __init__(self):
+        self.calls = 0
+
+    async def astream(self, messages, **kwargs):
+        self.calls += 1
+        yield AIMessageChunk(content="par")
+        if self.calls == 1:
+            raise ConnectionError("reset")
+        yield AIMessageChunk(content="tial", response_metadata={"finish_reason": "stop"},
+                             usage_metadata={"input_tokens": 7, "output_tokens": 2, "total_tokens": 9})
+
+
+def test_failed_attempts_are_not_replayed_and_usage_is(tmp_path):
+    cassette = Cassette(tmp_path / "run.jsonl.gz")
+    messages = [HumanMessage(content="build it")]
+    recording = RecordingLLM(FlakyLLM(), "planner", cassette)
+    with pytest.raises(ConnectionError):
+        asyncio.run(_collect(recording, messages))
+    asyncio.run(_collect(recording, messages))
+    assert [entry.get("error") for entry in Cassette(cassette.path).entries()] == ["ConnectionError", None]
+
+    async def replay():
+        return [chunk async for chunk in ReplayLLM("planner", Cassette(cassette.path), speed=0).astream(messages)]
+
+    chunks = asyncio.run(replay())
+    assert "".join(chunk.content for chunk in chunks) == "partial"
+    assert chunks[-1].usage_metadata["total_tokens"] == 9
+    assert chunks[-1].response_metadata["finish_reason"] == "stop"
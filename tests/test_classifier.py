@@ -0,0 +1,54 @@
+"""Tests for request complexity classification."""
+
+import json
+
+from src.classifier import FULL, SIMPLE, classify, log_classification, request_features
+
+
+def test_small_self_contained_requests_are_simple(sample_request):
+    for request in (sample_request, "Write a regex to validate email addresses",
+                    "Implement a binary search tree class with insert and delete"):
+        classification = classify(request)
+        assert classification.route == SIMPLE, request
+        assert not classification.uncertain
+
+
+def test_applications_and_multi_file_requests_take_the_full_route():
+    for request in ("Create a Flask web app with user authentication and a SQLite database",
+                    "Create a tool with main.py, utils.py and tests",
+                    "Build a project with three modules:\n- parser\n- evaluator\n- REPL"):
+        assert classify(request).route == FULL, request
+
+
+def test_borderline_requests_are_uncertain_and_default_to_full():
+    classification = classify("Build a todo list app")
+    assert classification.route == FULL and classification.uncertain
+
+    decided = classification.decided(SIMPLE)
+    assert decided.route == SIMPLE and decided.source == "model" and not decided.uncertain
+
+
+def test_existing_repositories_always_take_the_full_route(sample_request):
+    classification = classify(sample_request, repo_path="/some/repo")
+    assert classification.route == FULL
+    assert classification.reasons == ("existing repository",)
+
+
+def test_features():
+    features = request_features("Create app.py and templates/index.html for a small dashboard")
+    assert features["files"] == 2
+    assert features["complex_keywords"] == ["dashboard"]
+    assert features["simple_keywords"] == ["small"]
+    assert request_features("Split it into 4 separate files")["files"] == 4
+
+
+def test_log_records_the_classification_and_outcome(tmp_path, sample_request):
+    path = tmp_path / "logs" / "routing.jsonl"
+    log_classification(str(path), sample_request, classify(sample_request), status="complete", files=2)
+    log_classification(str(path), "Build a todo list app", classify("Build a todo list app"), status="error")
+
+    records = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [r["route"] for r in records] == [SIMPLE, FULL]
+    assert records[0]["request"] == sample_request
+    assert records[0]["outcome"] == {"status": "complete", "files": 2}
+    assert records[1]["uncertain"] is True
@@ -0,0 +1,108 @@
+"""Tests for single-flight coalescing of identical runs."""
+
+import asyncio
+import os
+
+import pytest
+
+from src.coalesce import RunCoalescer, coalesce_key
+from src.events import EventBus, PlanReady, bind, emit, unbind
+from src.workspace import LocalWorkspace, MemoryWorkspace
+
+SETTINGS = {"deployment": "test"}
+
+
+def _key(request, **kwargs):
+    return coalesce_key(request, settings=SETTINGS, **kwargs)
+
+
+class FakeRunner:
+    """Stands in for run_agent: emits a plan, writes one file, returns a state dict."""
+
+    def __init__(self, delay=0.05):
+        self.delay = delay
+        self.calls = 0
+        self.cancelled = 0
+
+    async def __call__(self, request, workspace, events, **kwargs):
+        self.calls += 1
+        token = bind(events)
+        try:
+            await asyncio.sleep(self.delay)
+            await emit(PlanReady, plan="## Plan")
+            location = await workspace.write("app/main.py", f"# {request}\n")
+            return {"plan": "## Plan", "files_created": [location]}
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        finally:
+            unbind(token)
+
+
+def test_key_normalizes_request_text_only():
+    assert _key("Create  a TODO app ") == _key("create a todo app")
+    assert _key("create a todo app") != _key("create a todo app", repo_path="/tmp/repo")
+    assert _key("create a todo app") != coalesce_key("create a todo app", settings={"deployment": "other"})
+
+
+def test_identical_requests_share_one_run_with_separate_outputs():
+    async def scenario():
+        runner = FakeRunner()
+        coalescer = RunCoalescer(runner, key=_key)
+        workspaces = [MemoryWorkspace() for _ in range(3)]
+        buses = [EventBus() for _ in range(3)]
+        plans = [bus.subscribe(types=(PlanReady,)) for bus in buses]
+        results = await asyncio.gather(*(
+            coalescer.run(request, workspace=workspace, events=bus)
+            for request, workspace, bus in zip(["Make app", "make  app", "MAKE APP"], workspaces, buses)
+        ))
+        for bus in buses:
+            bus.close()
+        seen = [[event.plan async for event in plan] for plan in plans]
+        return runner, coalescer, workspaces, results, seen
+
+    runner, coalescer, workspaces, results, seen = asyncio.run(scenario())
+    assert runner.calls == 1 and coalescer.status() == {"in_flight": 0, "waiting": 0, "runs": 1, "coalesced": 2}
+    assert all(result["files_created"] == ["app/main.py"] for result in results)
+    assert all(workspace.read("app/main.py") == "# Make app\n" for workspace in workspaces)
+    assert len({id(result) for result in results}) == 3
+    assert seen == [["## Plan"]] * 3
+
+
+def test_cancelled_follower_leaves_the_leader_running():
+    async def scenario():
+        runner = FakeRunner(delay=0.1)
+        coalescer = RunCoalescer(runner, key=_key)
+        leader = asyncio.create_task(coalescer.run("make app", workspace=MemoryWorkspace()))
+        follower = asyncio.create_task(coalescer.run("make app", workspace=MemoryWorkspace()))
+        await asyncio.sleep(0.02)
+        follower.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await follower
+        result = await leader
+
+        # Once every participant has left, the shared run is cancelled
+        lonely = asyncio.create_task(coalescer.run("other app", workspace=MemoryWorkspace()))
+        await asyncio.sleep(0.02)
+        lonely.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await lonely
+        await asyncio.sleep(0)
+        return runner, coalescer, result
+
+    runner, coalescer, result = asyncio.run(scenario())
+    assert result["files_created"] == ["app/main.py"]
+    assert runner.calls == 2 and runner.cancelled == 1
+    assert coalescer.flights == {}
+
+
+def test_participants_sharing_a_directory_get_one_copy(tmp_path):
+    async def scenario():
+        coalescer = RunCoalescer(FakeRunner(), key=_key, default_workspace=lambda: LocalWorkspace(tmp_path))
+        return coalescer, await asyncio.gather(*(coalescer.run("make app") for _ in range(120)))
+
+    coalescer, results = asyncio.run(scenario())
+    assert coalescer.status()["coalesced"] == 119
+    assert {tuple(result["files_created"]) for result in results} == {(str(tmp_path / "app/main.py"),)}
+    assert (tmp_path / "app/main.py").read_text() == "# make app\n"
+    assert os.listdir(tmp_path / "app") == ["main.py"]
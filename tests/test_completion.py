@@ -0,0 +1,45 @@
+"""Tests for streamed-answer completion predicates."""
+
+from src.completion import JsonDocumentComplete, RoutingTokenComplete, parse_routing_token
+
+
+def _feed(predicate, chunks):
+    """Feed chunks one by one and return how many were consumed before completion."""
+    text = ""
+    for i, chunk in enumerate(chunks, 1):
+        text += chunk
+        if predicate(text):
+            return i
+    return None
+
+
+def test_routing_token_needs_a_boundary():
+    """A routing word is only final once something follows it."""
+    assert _feed(RoutingTokenComplete(), ["plan", "ner", "\n", "extra"]) == 3
+    assert _feed(RoutingTokenComplete(), ["completed", " work"]) is None
+    assert parse_routing_token(' "Programmer".') == "programmer"
+    assert parse_routing_token("maybe planner") is None
+
+
+def test_json_document_complete_ignores_braces_in_strings():
+    """The document is complete when the top-level object closes, not at a brace in a string."""
+    chunks = ['Here:\n```json\n{"files": [{"file_path": "a.py", ', '"file_content": "d = {\\"x\\": 1}"}', '], ',
+              '"folder_name": "demo"}', "\n```\n", "Hope this helps!"]
+    assert _feed(JsonDocumentComplete(), chunks) == 4
+
+
+def test_json_document_complete_skips_braces_in_prose_before_the_fence():
+    """A brace in the explanation before the fence is not the document, however the stream is chunked."""
+    answer = 'Use a cache like {"hits": 0} first.\n\n```json\n{"files": [], "folder_name": "x"}\n```'
+    for size in (1, 5, 7, len(answer)):
+        predicate = JsonDocumentComplete()
+        assert _feed(predicate, [answer[i:i + size] for i in range(0, len(answer), size)])
+        assert answer[predicate.start:predicate.end] == '{"files": [], "folder_name": "x"}'
+    assert JsonDocumentComplete()(' {"files": []}')
+    assert not JsonDocumentComplete()('Done: {"files": []}')
+
+
+def test_json_document_with_trailing_comma_is_still_complete():
+    """Documents the programmer's fallback parser accepts also count as complete."""
+    assert JsonDocumentComplete()('```json\n{"files": [], "folder_name": "x",}')
+
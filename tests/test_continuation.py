@@ -0,0 +1,87 @@
+"""Tests for continuing truncated programmer answers."""
+
+import asyncio
+import json
+
+import pytest
+
+from src.continuation import is_truncated, salvage_files, stitch
+
+DOCUMENT = {
+    "files": [
+        {"file_path": "main.py", "file_content": "print('{not a brace}')\n"},
+        {"file_path": "app/models.py", "file_content": "class Todo:\n    \"\"\"A todo.\"\"\"\n"},
+        {"file_path": "app/views.py", "file_content": "def index():\n    return 'ok'\n"},
+    ],
+    "folder_name": "todo",
+}
+
+
+def _answer(document=DOCUMENT):
+    return "<think>files</think>\n```json\n" + json.dumps(document, indent=2) + "\n```"
+
+
+def test_complete_answer_is_not_truncated():
+    answer = _answer()
+    salvage = salvage_files(answer)
+
+    assert salvage.complete and len(salvage.files) == 3 and salvage.folder_name == "todo"
+    assert not is_truncated(answer, "stop")
+    assert not is_truncated("planner", None)
+
+
+def test_balanced_but_invalid_answer_is_not_continued():
+    """Another call would not fix a document that closed without parsing."""
+    invalid = '```json\n{"files": [{"file_path": "a.py", "file_content": "x = {"}] "folder_name": "todo"}\n```'
+    assert not salvage_files(invalid).complete
+    assert not is_truncated(invalid, "stop") and not is_truncated(invalid, None)
+    assert is_truncated(invalid, "length")
+
+
+def test_truncated_answer_keeps_complete_files_and_stitches_continuation():
+    answer = _answer()
+    cut = answer[:answer.index("app/views.py") + 20]
+    salvage = salvage_files(cut)
+
+    assert is_truncated(cut, None) and is_truncated(cut, "length")
+    assert [f["file_path"] for f in salvage.files] == ["main.py", "app/models.py"]
+    assert cut[:salvage.end].rstrip().endswith("}")
+    assert salvage.folder_name is None
+
+    rest = _answer({"files": [DOCUMENT["files"][2]], "folder_name": "todo"})
+    document = stitch([salvage, salvage_files(rest)])
+    assert document == DOCUMENT
+
+
+def test_every_continuation_replays_all_earlier_parts(monkeypatch):
+    pytest.importorskip("langgraph")
+    from src import enhanced_graph
+    from src.enhanced_graph import StreamResult, continue_truncated
+    from src.state import SimpleState
+
+    monkeypatch.setattr(enhanced_graph.config, "max_continuations", 3)
+    monkeypatch.setattr(enhanced_graph, "display_agent_result", lambda *args: None)
+    first, second, third = (_answer({"files": [f], "folder_name": "todo"}) for f in DOCUMENT["files"])
+    # Two answers cut off inside their second file, then one that completes
+    answers = [part[:part.index("\n  ]")] + f',\n    {{"file_path": "{cut}'
+               for part, cut in ((first, "x"), (second, "y"))]
+    answers.append(third)
+    calls = []
+
+    async def fake_stream_response(llm, messages, agent_name, is_complete=None):
+        calls.append(list(messages))
+        return StreamResult(answers[len(calls)], 10, output_tokens=100, generation_seconds=2.0)
+
+    monkeypatch.setattr(enhanced_graph, "stream_response", fake_stream_response)
+    first_call = StreamResult(answers[0], 10, output_tokens=100, generation_seconds=2.0)
+    result = asyncio.run(continue_truncated(SimpleState(), ["request"], first_call))
+    response = result.text
+
+    # The output rate is over all three calls, not the length of the stitched answer
+    assert len(calls) == 2 and result.tokens == 30 and result.output_rate == 50
+    # The second follow-up still carries the first part and lists the files of both
+    replayed = [m.content for m in calls[1][1::2]]
+    assert replayed[0].endswith("}") and "main.py" in replayed[0] and "app/models.py" in replayed[1]
+    assert "main.py, app/models.py." in calls[1][-1].content
+    assert calls[1][:3] == calls[0]
+    assert json.loads(response.split("```json\n")[1].rstrip("`\n")) == DOCUMENT
@@ -0,0 +1,106 @@
+"""Tests for the warm daemon and the CLI attaching to it."""
+
+import asyncio
+import json
+import os
+import socket
+import stat
+
+from src.coalesce import RunCoalescer
+from src.daemon import Daemon, attach, request
+from src.events import AnswerToken, FileWritten, NodeStarted, RunFinished, ThinkingToken, bind, emit, unbind
+from src.sessions import SessionManager
+from src.workspace import LocalWorkspace
+
+cancelled = []
+
+
+async def fake_run(request, events=None, workspace=None, **kwargs):
+    token = bind(events)
+    try:
+        await emit(NodeStarted, node="programmer")
+        await emit(ThinkingToken, agent="programmer", text="first thought\nsecond")
+        await emit(AnswerToken, agent="programmer", text="## Code")
+        if request == "hang":
+            try:
+                await asyncio.sleep(60)
+            except asyncio.CancelledError:
+                cancelled.append(request)
+                raise
+        location = await workspace.write("app/main.py", f"# {request}\n")
+        await emit(FileWritten, path="app/main.py", location=location, bytes=10)
+        await emit(RunFinished, status="complete", stop_reason=None, files_created=(location,), iterations=1,
+                   tokens_used=10)
+        return {"files_created": [location], "repo_path": kwargs.get("repo_path")}
+    finally:
+        unbind(token)
+
+
+class FakeDaemon(Daemon):
+    def warm_up(self):
+        self.coalescer = RunCoalescer(fake_run)
+        self.sessions = SessionManager(fake_run, max_concurrent=2)
+        self.output_workspace = lambda cwd: LocalWorkspace(os.path.join(cwd, "out"))
+
+
+def _serving(path, scenario):
+    async def main():
+        server = asyncio.create_task(FakeDaemon(str(path), 2).serve())
+        while not path.exists():
+            await asyncio.sleep(0.01)
+        try:
+            return await scenario()
+        finally:
+            assert await asyncio.to_thread(request, "stop", str(path)) == {"stopping": True}
+            await server
+    return asyncio.run(main())
+
+
+def test_cli_attaches_and_streams_the_run(tmp_path, monkeypatch, capsys):
+    path = tmp_path / "daemon" / "d.sock"
+    monkeypatch.chdir(tmp_path)
+
+    async def scenario():
+        # Only this user can reach the socket
+        assert stat.S_IMODE(path.stat().st_mode) == 0o600
+        assert stat.S_IMODE(path.parent.stat().st_mode) == 0o700
+        return await asyncio.to_thread(attach, ["Create", "a", "factorial"], str(path))
+
+    assert _serving(path, scenario) == 0
+    out = capsys.readouterr().out
+    assert "🚀 Running Programmer Agent" in out and "      first thought" in out and "## Code" in out
+    created = tmp_path / "out" / "app" / "main.py"
+    assert created.read_text() == "# Create a factorial\n"
+    assert f"Files created: ['{created}']" in out
+    assert not path.exists()
+
+
+def test_closing_the_client_cancels_its_run(tmp_path):
+    path = tmp_path / "d.sock"
+
+    async def scenario():
+        def hang_up():
+            with socket.socket(socket.AF_UNIX) as sock:
+                sock.connect(str(path))
+                sock.sendall(json.dumps({"request": "hang", "cwd": str(tmp_path)}).encode() + b"\n")
+                with sock.makefile("rb") as f:
+                    # Wait until the run is under way
+                    while json.loads(f.readline())["type"] != "answer_token":
+                        pass
+        await asyncio.to_thread(hang_up)
+        for _ in range(100):
+            if cancelled:
+                break
+            await asyncio.sleep(0.01)
+        return await asyncio.to_thread(request, "status", str(path))
+
+    status = _serving(path, scenario)
+    assert cancelled == ["hang"] and status["active"] == 0 and status["cancelled"] == 1
+
+
+def test_falls_back_without_a_daemon(tmp_path):
+    assert attach(["a", "request"], str(tmp_path / "missing.sock")) is None
+    assert attach([], str(tmp_path / "missing.sock")) is None
+    stale = tmp_path / "stale.sock"
+    stale.touch()
+    assert attach(["a", "request"], str(stale)) is None and request("status", str(stale)) is None
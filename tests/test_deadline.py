@@ -0,0 +1,84 @@
+"""Tests for run deadlines."""
+
+import asyncio
+import time
+import types
+
+import pytest
+
+from src.deadline import Deadline, bind, current_deadline, token_cap, unbind
+
+
+def test_deadline_counts_down():
+    deadline = Deadline.after(60)
+    assert 59 < deadline.remaining() <= 60
+    assert not deadline.passed
+
+    expired = Deadline(time.monotonic() - 1)
+    assert expired.passed
+    assert expired.remaining() == 0.0
+
+
+def test_token_cap_fits_the_remaining_time():
+    assert token_cap(10, 40, 8192) == 400
+    assert token_cap(1000, 40, 8192) == 8192
+    # Some answer is always allowed, never more than the configured maximum
+    assert token_cap(0, 40, 8192) == 256
+    assert token_cap(0, 40, 100) == 100
+    # No known output rate: no cap
+    assert token_cap(5, 0, 8192) == 8192
+
+
+def test_bound_deadline_reaches_child_tasks():
+    async def scenario():
+        assert current_deadline() is None
+        deadline = Deadline.after(30)
+        token = bind(deadline)
+        try:
+            child = await asyncio.create_task(_current())
+        finally:
+            unbind(token)
+        return deadline, child, current_deadline()
+
+    deadline, child, after = asyncio.run(scenario())
+    assert child is deadline
+    assert after is None
+
+
+async def _current():
+    return current_deadline()
+
+
+class TimingOutLLM:
+    """Streams a little, then fails like an SDK read timeout."""
+
+    model_name = "timeout-test"
+
+    def __init__(self, stall=0.0):
+        self.stall = stall
+
+    async def astream(self, messages, **kwargs):
+        yield types.SimpleNamespace(content="partial answer")
+        await asyncio.sleep(self.stall)
+        raise TimeoutError("read timed out")
+
+
+def test_only_the_runs_own_deadline_degrades_a_call(monkeypatch):
+    pytest.importorskip("langgraph")
+    from src import enhanced_graph
+
+    monkeypatch.setattr(enhanced_graph, "display_agent_status", lambda *args: None)
+    # Without a deadline an upstream timeout is an error, not a degraded answer
+    with pytest.raises(TimeoutError):
+        asyncio.run(enhanced_graph.stream_response(TimingOutLLM(), [], "programmer"))
+
+    async def under_deadline():
+        token = bind(Deadline.after(0.2))
+        try:
+            return await enhanced_graph.stream_response(TimingOutLLM(stall=5), [], "programmer")
+        finally:
+            unbind(token)
+
+    result = asyncio.run(under_deadline())
+    assert result.finish_reason == "deadline" and "cut_at_deadline" in result.degraded
+    assert result.text == "partial answer"
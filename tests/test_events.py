@@ -0,0 +1,63 @@
+"""Tests for run events, fan-out and backpressure."""
+
+import asyncio
+
+from src.events import (AnswerToken, EventBus, NodeStarted, PlanReady, RunFinished, ThinkingToken, bind, emit,
+                        unbind)
+
+
+async def _collect(subscription):
+    return [event async for event in subscription]
+
+
+def test_fan_out_filters_and_ends_on_close():
+    async def scenario():
+        bus = EventBus(run_id="r1")
+        everything = bus.subscribe()
+        plans_only = bus.subscribe(types=(PlanReady,))
+        readers = [asyncio.create_task(_collect(s)) for s in (everything, plans_only)]
+
+        token = bind(bus)
+        try:
+            await emit(NodeStarted, node="planner")
+            await emit(AnswerToken, agent="planner", text="## Plan")
+            await emit(PlanReady, plan="## Plan")
+            await emit(RunFinished, status="complete", stop_reason=None, files_created=("a.py",),
+                       iterations=2, tokens_used=10)
+        finally:
+            unbind(token)
+        await emit(PlanReady, plan="not bound, not delivered")
+        bus.close()
+        return await asyncio.gather(*readers)
+
+    everything, plans_only = asyncio.run(scenario())
+    assert [e.type for e in everything] == ["node_started", "answer_token", "plan_ready", "run_finished"]
+    assert [e.plan for e in plans_only] == ["## Plan"]
+    assert everything[0].run_id == "r1"
+    assert everything[-1].to_dict()["files_created"] == ("a.py",)
+
+
+def test_slow_subscriber_applies_backpressure_unless_lossy():
+    async def scenario():
+        bus = EventBus()
+        strict = bus.subscribe(maxsize=2)
+        lossy = bus.subscribe(maxsize=2, lossy=True)
+        tokens = [bus.make(ThinkingToken, agent="manager", text=str(i)) for i in range(4)]
+
+        for event in tokens[:2]:
+            await bus.publish(event)
+        blocked = asyncio.create_task(bus.publish(tokens[2]))
+        await asyncio.sleep(0.01)
+        assert not blocked.done()  # the strict subscriber's queue is full
+
+        await strict.queue.get()
+        await asyncio.wait_for(blocked, 1)
+        assert lossy.dropped == 1 and lossy.queue.qsize() == 2
+
+        # Leaving releases a publisher waiting on the subscriber
+        blocked = asyncio.create_task(bus.publish(tokens[3]))
+        await asyncio.sleep(0.01)
+        bus.unsubscribe(strict)
+        await asyncio.wait_for(blocked, 1)
+
+    asyncio.run(scenario())
@@ -0,0 +1,80 @@
+"""Tests for the load-testing harness."""
+
+import asyncio
+import types
+
+import pytest
+
+pytest.importorskip("langchain_core")
+
+from src import loadtest  # noqa: E402
+from src.loadtest import StandInRateLimitError, StandInServer, format_report, percentile, run_load  # noqa: E402
+from src.ratelimit import is_rate_limit_error, retry_after_seconds  # noqa: E402
+
+
+def test_stand_in_server_enforces_its_quota(monkeypatch):
+    clock = types.SimpleNamespace(now=1000.0)
+    monkeypatch.setattr(loadtest, "time", types.SimpleNamespace(monotonic=lambda: clock.now))
+    server = StandInServer(quota_rpm=2)
+    server.admit()
+    clock.now += 20
+    server.admit()
+    with pytest.raises(StandInRateLimitError) as rejected:
+        server.admit()
+    # Looks like the Azure client's 429, retry-after pointing at the oldest call leaving the window
+    assert is_rate_limit_error(rejected.value) and retry_after_seconds(rejected.value) == 40
+    assert (server.requests, server.rejected) == (3, 1)
+
+    clock.now += 41
+    server.admit()
+    assert len(server.calls) == 2
+
+    random_429s = StandInServer(error_rate=1.0)
+    with pytest.raises(StandInRateLimitError):
+        random_429s.admit()
+    assert random_429s.rejected == 1 and not random_429s.calls
+
+
+def test_percentile_picks_the_nearest_rank():
+    values = list(range(100, 0, -1))
+    assert percentile(values, 0) == 1 and percentile(values, 100) == 100
+    assert percentile(values, 99) == 99 and percentile([3, 1, 2], 50) == 2
+    assert percentile([], 95) == 0.0
+
+
+def _smoke(monkeypatch, routing, target="graph", runs=3):
+    pytest.importorskip("langgraph")
+    from src import enhanced_graph
+
+    monkeypatch.setattr(enhanced_graph.config, "trace_dir", "")
+    server = StandInServer(ttft=0.0, tokens_per_second=1e6, thinking_tokens=5,
+                           answer_tokens={"manager": 1, "planner": 5, "programmer": 5})
+    return asyncio.run(run_load(runs=runs, concurrency=runs, rate=0.0, target=target, server=server,
+                                routing=routing))
+
+
+def test_run_load_smoke(monkeypatch):
+    report = _smoke(monkeypatch, "full")
+    assert report["completed"] == 3 and report["errors"] == 0, report["error_samples"]
+    # manager, planner, manager, programmer, manager
+    assert report["llm"]["requests"] == 15 and report["llm"]["rejected_429"] == 0
+    latency = report["latency_seconds"]
+    assert 0 < latency["p50"] <= latency["p95"] <= latency["p99"] <= latency["max"]
+
+    text = format_report(report)
+    assert "Target: graph (full routing)  runs: 3/3 ok, 0 failed" in text
+    assert "arrival rate: all at once/s" in text and "LLM calls: 15" in text
+
+
+def test_run_load_with_routing_takes_the_one_call_route(monkeypatch):
+    report = _smoke(monkeypatch, "auto")
+    assert report["completed"] == 3 and report["llm"]["requests"] == 3
+
+
+def test_run_load_through_the_mcp_tool_coalesces_identical_requests(monkeypatch):
+    """The mcp target goes through the server's tool, so identical requests share one run."""
+    pytest.importorskip("mcp")
+    report = _smoke(monkeypatch, "full", target="mcp", runs=20)
+    assert report["completed"] == 20 and report["errors"] == 0, report["error_samples"]
+    # Sessions wait for a slot before they coalesce, so each batch of slots shares a run
+    assert report["llm"]["requests"] % 5 == 0 and report["llm"]["requests"] < 5 * 20
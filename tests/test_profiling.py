@@ -0,0 +1,50 @@
+"""Tests for the per-node run profiler."""
+
+import asyncio
+
+from src.profiling import GRAPH, RunProfiler
+
+
+def test_node_time_and_allocations_are_attributed(tmp_path):
+    """Samples and allocations made inside a wrapped node are reported under its name."""
+    profiler = RunProfiler(interval=0.001)
+
+    async def planner(state):
+        state["blob"] = [str(i) * 20 for i in range(20_000)]
+        deadline = asyncio.get_running_loop().time() + 0.05
+        while asyncio.get_running_loop().time() < deadline:
+            sum(range(1000))
+        return state
+
+    profiler.start()
+    asyncio.run(profiler.wrap("planner", planner)({}))
+    profiler.stop()
+
+    report = profiler.report()
+    node = report["nodes"]["planner"]
+    assert node["calls"] == 1
+    assert node["cpu_samples"] > 0
+    assert node["peak_traced_bytes"] > 400_000
+    assert node["top_allocations"]
+    assert set(report["nodes"]) <= {"planner", GRAPH}
+
+    paths = profiler.write_report(tmp_path)
+    assert [p.suffix for p in paths] == [".json", ".txt"]
+    assert "planner" in paths[1].read_text()
+
+
+def test_waiting_on_the_network_is_not_cpu_time():
+    """Samples of the loop idling in its selector are counted apart from CPU samples."""
+    profiler = RunProfiler(interval=0.001)
+
+    async def manager(state):
+        await asyncio.sleep(0.1)
+        return state
+
+    profiler.start()
+    asyncio.run(profiler.wrap("manager", manager)({}))
+    profiler.stop()
+
+    node = profiler.report()["nodes"]["manager"]
+    assert node["idle_samples"] > 20
+    assert node["cpu_samples"] < node["idle_samples"] / 4
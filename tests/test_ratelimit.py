@@ -0,0 +1,83 @@
+"""Tests for the client-side rate limiter."""
+
+import asyncio
+import time
+
+from src.ratelimit import RateLimiter, estimate_tokens, is_rate_limit_error, retry_after_seconds
+
+
+def test_unlimited_limiter_admits_immediately():
+    """A limiter without quotas never delays callers."""
+    limiter = RateLimiter("test")
+    assert asyncio.run(limiter.acquire(10_000)) == 10_000
+    assert limiter.snapshot()["delayed"] == 0
+
+
+def test_requests_queue_in_arrival_order():
+    """Once the burst is spent, later callers wait progressively longer."""
+    limiter = RateLimiter("test", requests_per_minute=60)
+    delays = [limiter._reserve(1) for _ in range(62)]
+    assert delays[:60] == [0.0] * 60
+    assert 0 < delays[60] < delays[61]
+
+
+def test_token_quota_and_settle():
+    """Over-estimated tokens are returned to the bucket."""
+    limiter = RateLimiter("test", tokens_per_minute=1000)
+    assert limiter._reserve(1000) == 0.0
+    assert limiter._reserve(100) > 0
+    limiter.settle(1000, 200)
+    assert limiter._reserve(500) == 0.0
+
+
+def test_cancelled_waiter_gives_its_reservation_back():
+    """A queued caller that is cancelled (run cancelled, deadline hit) does not keep its quota."""
+    limiter = RateLimiter("test", requests_per_minute=60, tokens_per_minute=1000)
+
+    async def scenario():
+        assert await limiter.acquire(1000) == 1000
+        waiter = asyncio.create_task(limiter.acquire(600))
+        await asyncio.sleep(0.01)
+        waiter.cancel()
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            pass
+
+    asyncio.run(scenario())
+    assert limiter.tokens.level > -1 and limiter.snapshot()["queue_depth"] == 0
+    limiter.settle(1000, 0)
+    assert limiter._reserve(900) == 0.0
+
+
+def test_rate_limited_feedback_blocks_and_backs_off():
+    """A 429 pauses admissions and lowers the admission rate until calls succeed."""
+    limiter = RateLimiter("test", requests_per_minute=600)
+    limiter.on_rate_limited(retry_after=0.05)
+    assert limiter.scale < 1.0
+    assert limiter._reserve(1) >= 0.04
+
+    start = time.monotonic()
+    asyncio.run(limiter.acquire(1))
+    assert time.monotonic() - start >= 0.04
+    assert limiter.snapshot()["rate_limited"] == 1
+
+    for _ in range(20):
+        limiter.on_success()
+    assert limiter.scale == 1.0
+
+
+def test_estimate_and_error_helpers():
+    """Token estimates and 429 detection."""
+
+    class Response:
+        status_code = 429
+        headers = {"retry-after": "3"}
+
+    class RateLimitError(Exception):
+        response = Response()
+
+    assert estimate_tokens(["a" * 400], max_output_tokens=100) == 200
+    assert is_rate_limit_error(RateLimitError("Too many requests"))
+    assert retry_after_seconds(RateLimitError()) == 3.0
+    assert not is_rate_limit_error(ValueError("boom"))
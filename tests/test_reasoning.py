@@ -0,0 +1,88 @@
+"""Tests for bounded handling of reasoning traces."""
+
+import gzip
+import os
+import time
+
+from src.reasoning import ReasoningTrace, ThinkingPreview, ThinkingSplitter, prune_traces
+
+
+def _split(chunks):
+    splitter = ThinkingSplitter()
+    thinking, answer = "", ""
+    for chunk in chunks:
+        t, a = splitter.feed(chunk)
+        thinking, answer = thinking + t, answer + a
+    t, a = splitter.flush()
+    return thinking + t, answer + a, splitter
+
+
+def test_splitter_handles_tags_across_chunks():
+    text = "<think>step one\nstep two</think>\n## Plan\n1. a < b"
+    expected = ("step one\nstep two", "\n## Plan\n1. a < b")
+    for size in (1, 2, 3, 5, 8, len(text)):
+        thinking, answer, splitter = _split([text[i:i + size] for i in range(0, len(text), size)])
+        assert (thinking, answer) == expected
+        assert splitter.saw_thinking and not splitter.in_thinking and splitter.chars == len(text)
+
+    thinking, answer, splitter = _split(["no thinking <thi", "s is fine"])
+    assert (thinking, answer) == ("", "no thinking <this is fine") and not splitter.saw_thinking
+
+    # Cut off while thinking: nothing counts as answer
+    thinking, answer, splitter = _split(["<think>hmm", " still</th"])
+    assert (thinking, answer) == ("hmm still</th", "") and splitter.in_thinking
+
+
+def test_preview_shows_the_first_lines():
+    preview = ThinkingPreview(max_lines=3, max_line_chars=100)
+    assert preview.feed("first") == []
+    assert preview.feed(" line\n\nthird\n" + "x" * 10_000) == ["first line", "third"]
+    assert len(preview._line) == 100
+    assert preview.feed("\n") == ["... (truncated)"]
+    assert preview.feed("more\nlines\n") == []
+
+
+def test_trace_spills_to_gzip_and_keeps_a_bounded_tail(tmp_path):
+    path = tmp_path / "traces" / "run.thinking.txt.gz"
+    trace = ReasoningTrace(str(path), tail_chars=10)
+    trace.begin("planner")
+    trace.write("a" * 100_000)
+    trace.begin("programmer")
+    trace.write("")
+    trace.write("0123456789end")
+    assert trace.tail == "3456789end" and trace.chars == 100_013
+    trace.close()
+    trace.close()
+
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        assert f.read() == "\n=== planner ===\n" + "a" * 100_000 + "\n=== programmer ===\n0123456789end"
+    assert path.stat().st_size < 1000
+
+    # Small writes are batched; the file only appears once they are flushed, off the caller's thread
+    path = tmp_path / "traces" / "small.thinking.txt.gz"
+    trace = ReasoningTrace(str(path))
+    trace.begin("manager")
+    trace.write("short")
+    assert not path.exists()
+    trace.close()
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        assert f.read() == "\n=== manager ===\nshort"
+
+    # Without a path only the tail is kept
+    trace = ReasoningTrace(tail_chars=4)
+    trace.write("thinking")
+    assert trace.tail == "king" and not list(tmp_path.glob("*.gz"))
+
+
+def test_prune_traces_by_age_then_total_size(tmp_path):
+    now = time.time()
+    for i, age_days in enumerate([30, 3, 2, 1]):
+        path = tmp_path / f"run{i}.thinking.txt.gz"
+        path.write_bytes(b"x" * 100)
+        os.utime(path, (now - age_days * 86400, now - age_days * 86400))
+    (tmp_path / "notes.txt").write_bytes(b"x" * 1000)
+
+    assert prune_traces(str(tmp_path), max_age=7 * 86400) == {"removed": 1, "bytes_freed": 100, "kept": 3}
+    assert prune_traces(str(tmp_path), max_bytes=150)["removed"] == 2
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["notes.txt", "run3.thinking.txt.gz"]
+    assert prune_traces(str(tmp_path / "missing"), max_age=1)["removed"] == 0
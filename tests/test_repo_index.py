@@ -0,0 +1,72 @@
+"""Tests for the repository context index."""
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from src.repo_index import RepoIndex
+
+
+def _write(root, relpath, content):
+    path = root / relpath
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(content)
+    return path
+
+
+def test_index_symbols_imports_and_incremental_update(tmp_path):
+    """Symbols and imports are parsed once; untouched files are not re-read."""
+    repo = tmp_path / "repo"
+    _write(repo, "app/__init__.py", "")
+    _write(repo, "app/billing.py", '"""Invoice totals."""\nfrom .money import Money\n\n'
+                                   'class Invoice:\n    def total(self):\n        """Sum lines."""\n')
+    _write(repo, "app/money.py", '"""Money type."""\nclass Money:\n    pass\n')
+
+    index = RepoIndex(repo, cache_dir=tmp_path / "cache")
+    assert index.update()["changed"] == 3
+    entry = index.files["app/billing.py"]
+    assert entry["summary"] == "Invoice totals."
+    assert [s["name"] for s in entry["symbols"]] == ["Invoice", "Invoice.total"]
+    assert index.imports_of("app/billing.py") == ["app/money.py"]
+
+    reloaded = RepoIndex(repo, cache_dir=tmp_path / "cache")
+    assert reloaded.update() == {"files": 3, "changed": 0, "touched": 0, "removed": 0}
+
+    os.utime(repo / "app/money.py")
+    assert reloaded.update()["changed"] == 0
+    _write(repo, "app/money.py", '"""Currency amounts."""\n')
+    assert reloaded.update()["changed"] == 1
+
+
+def test_retrieve_ranks_relevant_files_within_budget(tmp_path):
+    """The best matching file comes first and the budget is respected."""
+    repo = tmp_path / "repo"
+    _write(repo, "invoices.py", '"""Invoice handling."""\ndef send_invoice():\n    pass\n')
+    _write(repo, "users.py", '"""User accounts."""\ndef create_user():\n    pass\n')
+    for i in range(20):
+        _write(repo, f"pkg/invoice_{i}.py", '"""Invoice helper."""\n' + "x = 1\n" * 200)
+
+    index = RepoIndex(repo, cache_dir=tmp_path / "cache")
+    index.update()
+    assert index.rank("send the invoice")[0][1] == "invoices.py"
+
+    context = index.retrieve("invoice", token_budget=300)
+    assert "invoices.py" in context
+    assert "users.py" not in context
+    assert len(context) // 4 <= 300
+
+
+def test_context_is_safe_for_concurrent_runs(tmp_path):
+    """Runs share one index per root; updates must not race retrievals."""
+    repo = tmp_path / "repo"
+    _write(repo, "invoices.py", '"""Invoice handling."""\ndef send_invoice():\n    pass\n')
+    index = RepoIndex(repo, cache_dir=tmp_path / "cache")
+
+    def run(i):
+        path = _write(repo, f"pkg/invoice_{i}.py", '"""Invoice helper."""\n')
+        context = index.context("invoice", token_budget=300)
+        path.unlink()
+        return context
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        contexts = list(pool.map(run, range(64)))
+    assert all("invoices.py" in context for context in contexts)
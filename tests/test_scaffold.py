@@ -0,0 +1,40 @@
+"""Tests for local boilerplate generation."""
+
+import json
+
+from src.scaffold import estimate_tokens_saved, python_requirements, scaffold_files
+
+
+def test_python_project_scaffold():
+    files = {
+        "main.py": "import os\nimport requests\nimport yaml\nfrom app.models import Todo\nfrom . import x\n",
+        "app/models.py": "from sklearn.linear_model import LinearRegression\nimport app.db\n",
+        "app/db.py": "import sqlite3\n",
+        "tests/test_models.py": "import pytest\n",
+    }
+    scaffold = scaffold_files(files, plan="# Plan\n\nA todo app with a tiny model.\n\n1. Step", project_name="todo_app")
+
+    assert python_requirements(files) == ["pytest", "PyYAML", "requests", "scikit-learn"]
+    assert scaffold["requirements.txt"] == "pytest\nPyYAML\nrequests\nscikit-learn\n"
+    assert scaffold["app/__init__.py"] == ""
+    assert "tests/__init__.py" not in scaffold
+    assert "__pycache__/" in scaffold[".gitignore"]
+    readme = scaffold["README.md"]
+    assert readme.startswith("# Todo App\n\nA todo app with a tiny model.")
+    assert "python main.py" in readme and "- `requirements.txt`" in readme
+    assert estimate_tokens_saved(scaffold) > 0
+
+
+def test_node_project_and_existing_files_are_kept():
+    files = {
+        "index.js": "const express = require('express');\nconst fs = require('fs');\nimport x from './x';\n",
+        "lib/db.js": "import { Client } from '@scope/pg/client';\n",
+        "README.md": "# Mine\n",
+    }
+    scaffold = scaffold_files(files, project_name="My API")
+
+    package = json.loads(scaffold["package.json"])
+    assert package["name"] == "my-api" and package["scripts"]["start"] == "node index.js"
+    assert package["dependencies"] == {"@scope/pg": "latest", "express": "latest"}
+    assert "node_modules/" in scaffold[".gitignore"]
+    assert "README.md" not in scaffold
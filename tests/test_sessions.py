@@ -0,0 +1,61 @@
+"""Tests for concurrent agent sessions."""
+
+import asyncio
+
+from src.sessions import CANCELLED, COMPLETE, ERROR, SessionManager
+
+
+def test_concurrency_is_bounded_and_counted():
+    """Only `max_concurrent` sessions run at once; the rest are queued."""
+    running = []
+    peak = []
+
+    async def runner(request):
+        running.append(request)
+        peak.append(len(running))
+        await asyncio.sleep(0.02)
+        running.remove(request)
+        return {"files_created": [request]}
+
+    async def main():
+        manager = SessionManager(runner, max_concurrent=2)
+        pending = [asyncio.create_task(manager.run(f"r{i}")) for i in range(5)]
+        await asyncio.sleep(0.005)
+        status = manager.status()
+        sessions = await asyncio.gather(*pending)
+        return status, sessions, manager.status()
+
+    during, sessions, after = asyncio.run(main())
+    assert max(peak) == 2
+    assert (during["active"], during["queued"]) == (2, 3)
+    assert [s.status for s in sessions] == [COMPLETE] * 5
+    assert sessions[3].result == {"files_created": ["r3"]}
+    assert after["completed"] == 5 and after["active"] == 0
+
+
+def test_cancelling_the_caller_cancels_the_run():
+    """A cancelled caller stops its run; other sessions are unaffected."""
+    cleaned_up = asyncio.Event()
+
+    async def runner(request):
+        if request == "boom":
+            raise ValueError("bad request")
+        try:
+            await asyncio.sleep(10)
+        finally:
+            cleaned_up.set()
+
+    async def main():
+        manager = SessionManager(runner, max_concurrent=2, cancel_timeout=1)
+        caller = asyncio.create_task(manager.run("slow"))
+        await asyncio.sleep(0.01)
+        caller.cancel()
+        await asyncio.wait_for(cleaned_up.wait(), 1)
+        await asyncio.sleep(0)
+        failed = await manager.run("boom")
+        return manager, failed
+
+    manager, failed = asyncio.run(main())
+    assert failed.status == ERROR and failed.error == "bad request"
+    assert manager.status()["cancelled"] == 1
+    assert manager.sessions["s1"].status == CANCELLED
@@ -0,0 +1,34 @@
+"""Tests for the compact run state."""
+
+import pytest
+
+pytest.importorskip("langgraph")
+
+from src.state import STATE_REDUCERS, SimpleState  # noqa: E402
+
+
+def test_evolve_merges_updates_and_shares_the_rest():
+    state = SimpleState(request="Create a todo app", fingerprints={})
+    plan_ref = state.artifacts.put("## Plan")
+    planned = state.evolve({"plan_ref": plan_ref, "next": "manager", "tokens_used": 100})
+    coded = planned.evolve({"files_created": ["a.py", "b.py"], "tokens_used": 50, "iterations": 1})
+    coded = coded.evolve({"files_created": ["b.py", "c.py"]})
+
+    assert set(STATE_REDUCERS) == {"files_created", "iterations", "tokens_used", "scaffold_tokens_saved",
+                                   "degraded"}
+    assert coded.files_created == ("a.py", "b.py", "c.py")
+    assert coded.tokens_used == 150 and coded.iterations == 1
+    assert coded.plan == "## Plan" and coded["plan"] == "## Plan"
+    # Earlier states are untouched; unchanged fields are shared, not copied
+    assert state.plan is None and state.files_created == () and planned.files_created == ()
+    assert coded.artifacts is state.artifacts and coded.fingerprints is state.fingerprints
+
+
+def test_mapping_access_and_no_shared_defaults():
+    first, second = SimpleState(), SimpleState()
+    assert first.artifacts is not second.artifacts
+    assert first.get("stop_reason") is None and first.get("missing", 1) == 1
+    with pytest.raises(KeyError):
+        first["missing"]
+    with pytest.raises(AttributeError):
+        first.undeclared = 1
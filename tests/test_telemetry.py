@@ -0,0 +1,61 @@
+"""Tests for the telemetry log sink."""
+
+import asyncio
+import gzip
+import json
+
+from src.events import AnswerToken, EventBus, LlmCallFinished, PlanReady, RunFinished, RunStarted, bind, emit, unbind
+from src.telemetry import start_telemetry
+
+
+async def _run(bus, finish=True):
+    token = bind(bus)
+    try:
+        await emit(RunStarted, request="factorial")
+        await emit(AnswerToken, agent="planner", text="## Plan")
+        await emit(PlanReady, plan="## Plan")
+        await emit(LlmCallFinished, agent="planner", model="m", ttft=0.1, seconds=1.0, tokens=30,
+                   input_tokens=20, output_tokens=10, cached_tokens=5)
+        if finish:
+            await emit(RunFinished, status="complete", stop_reason=None, files_created=(), iterations=1,
+                       tokens_used=30)
+    finally:
+        unbind(token)
+
+
+def _records(path, opener=open):
+    with opener(path, "rt", encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+def test_run_events_are_appended_without_tokens(tmp_path):
+    path = str(tmp_path / "logs" / "telemetry.jsonl")
+
+    async def scenario():
+        for _ in range(2):
+            bus = EventBus()
+            telemetry = start_telemetry(bus, path)
+            await _run(bus)
+            assert await telemetry == 4
+
+    asyncio.run(scenario())
+    records = _records(path)
+    assert [r["type"] for r in records[:4]] == ["run_started", "plan_ready", "llm_call_finished", "run_finished"]
+    assert len(records) == 8 and len({r["run_id"] for r in records}) == 2
+    assert records[1]["plan"] == len("## Plan")
+    assert records[2]["cached_tokens"] == 5 and records[2]["time"] > 0
+
+
+def test_cancelled_run_keeps_its_records_and_gzip_logs(tmp_path):
+    path = str(tmp_path / "telemetry.jsonl.gz")
+
+    async def scenario():
+        bus = EventBus()
+        telemetry = start_telemetry(bus, path)
+        await _run(bus, finish=False)
+        await asyncio.sleep(0)
+        telemetry.cancel()
+        await asyncio.gather(telemetry, return_exceptions=True)
+
+    asyncio.run(scenario())
+    assert [r["type"] for r in _records(path, gzip.open)] == ["run_started", "plan_ready", "llm_call_finished"]
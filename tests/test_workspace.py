@@ -0,0 +1,86 @@
+"""Tests for output workspaces."""
+
+import asyncio
+import io
+import json
+import os
+import tarfile
+import zipfile
+
+import pytest
+
+from src.workspace import ArchiveWorkspace, LocalWorkspace, MemoryWorkspace, safe_relative_path
+
+
+def test_safe_relative_path():
+    """Generated paths cannot escape the workspace."""
+    assert safe_relative_path("app/./templates/index.html") == "app/templates/index.html"
+    assert safe_relative_path("/app/main.py") == "app/main.py"
+    for bad in ["../secrets", "app/../../x", "", "C:/windows"]:
+        with pytest.raises(ValueError):
+            safe_relative_path(bad)
+
+
+def test_local_workspace_writes_and_discards(tmp_path):
+    """The local backend writes real files and can roll them back."""
+    workspace = LocalWorkspace(tmp_path)
+    location = asyncio.run(workspace.write("demo/pkg/main.py", "print('hi')\n"))
+    assert (tmp_path / "demo/pkg/main.py").read_text() == "print('hi')\n"
+    assert list((tmp_path / "demo/pkg").iterdir()) == [tmp_path / "demo/pkg/main.py"]
+    workspace.discard([location])
+    assert not (tmp_path / "demo/pkg/main.py").exists()
+
+
+def test_concurrent_writes_of_one_path(tmp_path):
+    """Runs in one process (MCP server, daemon) may write the same file at once."""
+    workspace = LocalWorkspace(tmp_path)
+
+    async def scenario():
+        return await asyncio.gather(*(workspace.write("app/main.py", f"# {i}\n" * 10_000) for i in range(64)))
+
+    assert set(asyncio.run(scenario())) == {str(tmp_path / "app/main.py")}
+    assert len(set((tmp_path / "app/main.py").read_text().splitlines())) == 1
+    assert os.listdir(tmp_path / "app") == ["main.py"]
+
+
+def test_memory_workspace_archives():
+    """The in-memory backend hands the project out as zip or tar bytes."""
+    workspace = MemoryWorkspace()
+    asyncio.run(workspace.write("demo/main.py", "x = 1\n"))
+    asyncio.run(workspace.write("demo/README.md", "# Demo\n"))
+    assert workspace.read("demo/main.py") == "x = 1\n"
+
+    with zipfile.ZipFile(io.BytesIO(workspace.archive("zip"))) as archive:
+        assert sorted(archive.namelist()) == ["demo/README.md", "demo/main.py"]
+    with tarfile.open(fileobj=io.BytesIO(workspace.archive("tar.gz"))) as archive:
+        assert archive.extractfile("demo/main.py").read() == b"x = 1\n"
+
+
+@pytest.mark.parametrize("archive_format", ["zip", "tar.gz"])
+def test_archive_workspace_streams(archive_format):
+    """Files are streamed into the archive as they are written."""
+    workspace = ArchiveWorkspace(archive_format=archive_format)
+    asyncio.run(workspace.write("demo/main.py", "x = 1\n"))
+    data = workspace.getvalue()
+    if archive_format == "zip":
+        assert zipfile.ZipFile(io.BytesIO(data)).read("demo/main.py") == b"x = 1\n"
+    else:
+        assert tarfile.open(fileobj=io.BytesIO(data)).extractfile("demo/main.py").read() == b"x = 1\n"
+
+
+def test_unsafe_generated_path_skips_only_that_file(monkeypatch):
+    """A path the workspace rejects does not cost the other files or the scaffold."""
+    pytest.importorskip("langgraph")
+    from src import enhanced_graph
+    from src.state import SimpleState
+
+    monkeypatch.setattr(enhanced_graph, "display_agent_result", lambda *args: None)
+    workspace = MemoryWorkspace()
+    files = [{"file_path": "main.py", "file_content": "import flask\n"},
+             {"file_path": "../../etc/cron.d/x", "file_content": "* * * * * boom\n"},
+             {"file_path": "app/models.py", "file_content": "class Todo: ...\n"}]
+    response = "```json\n" + json.dumps({"folder_name": "todo", "files": files}) + "\n```"
+    created, _ = asyncio.run(enhanced_graph.write_files(SimpleState(workspace=workspace), response, 0.0))
+
+    assert {"todo/main.py", "todo/app/models.py", "todo/requirements.txt"} <= set(created)
+    assert not any("cron" in path for path in workspace.files)